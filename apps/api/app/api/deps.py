@@ -4,13 +4,35 @@ from jose import JWTError, jwt
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.principal_cache import Principal, principal_cache
 from app.db.deps import get_db
-from app.models import User, UserRole
+from app.models import EmployeeProfile, User, UserRole
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+def _load_principal(db: Session, user_id: int) -> Principal | None:
+    row = (
+        db.query(User, EmployeeProfile)
+        .outerjoin(EmployeeProfile, EmployeeProfile.user_id == User.id)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if not row:
+        return None
+    user, profile = row
+    return Principal(
+        id=user.id,
+        email=user.email,
+        role=user.role,
+        is_active=bool(user.is_active),
+        nome=profile.nome if profile else None,
+        genero=profile.genero if profile else None,
+        auth_generation=int(user.auth_generation or 0),
+    )
+
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> Principal:
     credentials_exception = HTTPException(status_code=401, detail="Token inválido")
     try:
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
@@ -21,13 +43,33 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
     except (JWTError, ValueError):
         raise credentials_exception
 
-    user = db.get(User, user_id)
-    if not user or not user.is_active:
+    principal, fresh = principal_cache.get(user_id)
+    if principal is not None and not fresh:
+        # Other workers bump users.auth_generation on admin writes; an unchanged generation keeps the entry.
+        # Fresh entries skip the check, so the TTL bounds how long another worker's change goes unseen.
+        generation = db.query(User.auth_generation).filter(User.id == user_id).scalar()
+        if generation is not None and int(generation) == principal.auth_generation:
+            principal_cache.put(principal)
+        else:
+            principal = None
+
+    if principal is None:
+        principal = _load_principal(db, user_id)
+        if principal:
+            principal_cache.put(principal)
+
+    if not principal or not principal.is_active:
         raise credentials_exception
-    return user
+    return principal
 
 
-def require_admin(current_user: User = Depends(get_current_user)) -> User:
+def require_admin(current_user: Principal = Depends(get_current_user)) -> Principal:
     if current_user.role != UserRole.admin:
         raise HTTPException(status_code=403, detail="Acesso negado")
     return current_user
+
+
+def bump_auth_generation(db: Session, user_id: int) -> None:
+    db.query(User).filter(User.id == user_id).update(
+        {User.auth_generation: User.auth_generation + 1}, synchronize_session=False
+    )
@@ -0,0 +1,42 @@
+import base64
+from datetime import datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def clamp_limit(limit: int, max_limit: int = 500) -> int:
+    return max(1, min(int(limit), max_limit))
+
+
+def encode_cursor(*values: datetime | int) -> str:
+    raw = "|".join(v.isoformat() if isinstance(v, datetime) else str(v) for v in values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *kinds: type) -> tuple:
+    try:
+        padded = cursor + "=" * ((4 - (len(cursor) % 4)) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        parts = raw.split("|")
+        if len(parts) != len(kinds):
+            raise ValueError(cursor)
+        return tuple(datetime.fromisoformat(p) if kind is datetime else kind(p) for p, kind in zip(parts, kinds))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def after_desc(columns: list, values: tuple):
+    """Keyset filter for rows strictly after `values` when ordering by `columns` descending."""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal_prefix, column < values[i]))
+    return or_(*clauses)
+
+
+def set_next_cursor(response: Response, next_cursor: str | None) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -1,22 +1,60 @@
+import csv
 import json
+import logging
 import re
-import base64
 import secrets
-from datetime import datetime, timedelta, timezone
-from zoneinfo import ZoneInfo
-
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta
+from typing import Literal
+
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, aliased
 
-from app.api.deps import require_admin
-from app.core.security import hash_password
+from app.api.deps import bump_auth_generation, require_admin
+from app.api.pagination import after_desc, clamp_limit, decode_cursor, encode_cursor, set_next_cursor
+from app.audit_search import motivo_contains_clause
+from app.banco_horas import (
+    ajustar_banco_horas,
+    extrato_banco_horas,
+    fmt_saldo_hhmm,
+    periodo_extrato,
+    ultimo_dia_fechado,
+)
+from app.core.config import settings
+from app.core.config_cache import config_cache
+from app.core.kdf import kdf_executor
+from app.core.principal_cache import Principal, principal_cache
+from app.core.security import hash_password, pairing_code_lookup_id
+from app.core.timeutil import (
+    SP_TZ,
+    sp_date_of,
+    sp_date_to_utc_naive_end_exclusive,
+    sp_date_to_utc_naive_start,
+    to_utc_naive,
+    utc_naive_to_sp,
+)
 from app.db.deps import get_db
+from app.db.session import SessionLocal
+from app.distancia import claim_distancia_job, create_distancia_job, job_status, run_distancia_job
+from app.export import iter_csv, iter_xlsx
+from app.geofence import site_index_cache
+from app.idempotency import IDEMPOTENCY_KEY_HEADER, commit_with_key, find_replay, request_hash, schedule_purge
+from app.jornada import compute_jornada_from_pontos, fmt_hhmm, load_jornada_dia, recompute_jornada_dia
 from app.models import (
+    BancoHorasConfig,
     ConfigLocal,
     DevicePairingCode,
+    DistanciaRecomputeJob,
     EmployeeAuthPolicy,
     EmployeeProfile,
     EmployeeDevice,
+    Local,
+    LocalFuncionario,
     Ponto,
     PontoCorrectionConfig,
     JornadaValidationConfig,
@@ -26,26 +64,37 @@ from app.models import (
     User,
     UserRole,
 )
+from app.punch_state import punch_state_cache
 from app.schemas import (
     AdminPontoCreate,
     AdminPontoDelete,
     AdminPontoUpdate,
+    BancoHorasAdminOut,
+    BancoHorasConfigOut,
+    BancoHorasConfigUpsert,
     ConfigLocalOut,
     ConfigLocalUpsert,
     EmployeeCreate,
     EmployeeAuthPolicyOut,
     EmployeeAuthPolicyUpsert,
     DevicePairingCodeOut,
+    DistanciaRecomputeCreate,
+    DistanciaRecomputeJobOut,
     EmployeeDeviceOut,
+    EmployeeImportOut,
+    EmployeeImportRowResult,
     EmployeeOut,
     EmployeeUpdate,
     JornadaValidationConfigOut,
     JornadaValidationConfigUpsert,
     JornadaDiaAdminOut,
     JornadaDiaOut,
-    JornadaSegmentOut,
+    JornadaMesFuncionarioOut,
+    JornadaMesOut,
+    LocalFuncionariosSet,
+    LocalOut,
+    LocalUpsert,
     PontoAdminOut,
-    PontoAdminAuditOut,
     PontoAdminAuditPageOut,
     PontoCorrectionConfigOut,
     PontoCorrectionConfigUpsert,
@@ -53,26 +102,8 @@ from app.schemas import (
 )
 
 
-SP_TZ = ZoneInfo("America/Sao_Paulo")
-
 _TIME_RE = re.compile(r"^(\d{2}):(\d{2})$")
-
-
-def _utc_naive_to_sp(dt: datetime) -> datetime:
-    return dt.replace(tzinfo=timezone.utc).astimezone(SP_TZ)
-
-
-def _sp_date_to_utc_naive_start(date_str: str) -> datetime:
-    return datetime.fromisoformat(date_str).replace(tzinfo=SP_TZ).astimezone(timezone.utc).replace(tzinfo=None)
-
-
-def _sp_date_to_utc_naive_end_exclusive(date_str: str) -> datetime:
-    return (
-        (datetime.fromisoformat(date_str) + timedelta(days=1))
-        .replace(tzinfo=SP_TZ)
-        .astimezone(timezone.utc)
-        .replace(tzinfo=None)
-    )
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{2})$")
 
 
 def _sp_datetime_to_utc_naive(date_str: str, time_str: str) -> datetime:
@@ -86,17 +117,11 @@ def _sp_datetime_to_utc_naive(date_str: str, time_str: str) -> datetime:
 
     base = datetime.fromisoformat(date_str)
     dt_sp = base.replace(hour=hh, minute=mm, second=0, microsecond=0, tzinfo=SP_TZ)
-    return dt_sp.astimezone(timezone.utc).replace(tzinfo=None)
+    return to_utc_naive(dt_sp)
 
 
 def _get_correction_window_days(db: Session) -> int:
-    row = db.query(PontoCorrectionConfig).filter(PontoCorrectionConfig.id == 1).first()
-    if not row:
-        row = PontoCorrectionConfig(id=1, window_days=30, updated_at=datetime.utcnow())
-        db.add(row)
-        db.commit()
-        db.refresh(row)
-    return int(row.window_days)
+    return config_cache.get(db).correction_window_days
 
 
 def _assert_within_correction_window(target_utc_naive: datetime, window_days: int) -> None:
@@ -120,188 +145,79 @@ def _ponto_to_audit_snapshot(p: Ponto) -> dict:
         "lng": p.lng,
         "accuracy_m": p.accuracy_m,
         "distancia_m": p.distancia_m,
+        "local_id": p.local_id,
     }
 
 
-def _encode_audit_cursor(created_at_utc_naive: datetime, audit_id: int) -> str:
-    raw = f"{created_at_utc_naive.isoformat()}|{audit_id}".encode("utf-8")
-    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
-
-
-def _decode_audit_cursor(cursor: str) -> tuple[datetime, int]:
-    try:
-        padded = cursor + "=" * ((4 - (len(cursor) % 4)) % 4)
-        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
-        created_at_str, audit_id_str = raw.split("|", 1)
-        created_at = datetime.fromisoformat(created_at_str)
-        audit_id = int(audit_id_str)
-        return created_at, audit_id
-    except Exception:
-        raise HTTPException(status_code=400, detail="Cursor inválido")
-
 
-def _get_jornada_validation_config(db: Session) -> JornadaValidationConfig:
-    row = db.query(JornadaValidationConfig).filter(JornadaValidationConfig.id == 1).first()
-    if not row:
-        row = JornadaValidationConfig(id=1, intervalo_exige_4_batidas_blocking=False, updated_at=datetime.utcnow())
-        db.add(row)
-        db.commit()
-        db.refresh(row)
-    return row
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
-def _fmt_hhmm(total_seconds: int) -> str:
-    total_seconds = max(0, int(total_seconds))
-    h = total_seconds // 3600
-    m = (total_seconds % 3600) // 60
-    return f"{h:02d}:{m:02d}"
-
-
-def _compute_jornada_from_pontos(date_str: str, pontos: list[Ponto]) -> tuple[int, list[JornadaSegmentOut], list[str]]:
-    alertas: list[str] = []
-    segmentos: list[JornadaSegmentOut] = []
-    total_trabalhado_segundos = 0
-
-    pontos_sorted = sorted(pontos, key=lambda p: p.registrado_em)
-
-    has_intervalo = any(p.tipo.value in ("intervalo_inicio", "intervalo_fim") for p in pontos_sorted)
-
-    work_start: datetime | None = None
-    break_start: datetime | None = None
-    intervalo_segundos_atual = 0
-
-    for p in pontos_sorted:
-        ts = p.registrado_em
-        tipo = p.tipo.value
-
-        if tipo == "entrada":
-            if work_start is not None:
-                alertas.append("Entrada duplicada (já havia uma entrada aberta)")
-                continue
-            if break_start is not None:
-                alertas.append("Entrada com intervalo aberto (sequência inválida)")
-                break_start = None
-            work_start = ts
-            continue
-
-        if tipo == "intervalo_inicio":
-            if work_start is None:
-                alertas.append("Início de intervalo sem entrada")
-                continue
-            if break_start is not None:
-                alertas.append("Início de intervalo duplicado (intervalo já estava aberto)")
-                continue
-            break_start = ts
-            continue
-
-        if tipo == "intervalo_fim":
-            if break_start is None:
-                alertas.append("Fim de intervalo sem início de intervalo")
-                continue
-            if ts <= break_start:
-                alertas.append("Fim de intervalo anterior ao início (horário inválido)")
-                break_start = None
-                continue
-
-            segundos = int((ts - break_start).total_seconds())
-            intervalo_segundos_atual += max(0, segundos)
-            segmentos.append(
-                JornadaSegmentOut(
-                    tipo="intervalo",
-                    inicio=_utc_naive_to_sp(break_start),
-                    fim=_utc_naive_to_sp(ts),
-                    segundos=segundos,
-                )
-            )
-            break_start = None
-            continue
-
-        if tipo == "saida":
-            if work_start is None:
-                alertas.append("Saída sem entrada")
-                continue
-            if break_start is not None:
-                alertas.append("Saída com intervalo aberto (intervalo não finalizado)")
-                break_start = None
-
-            if ts <= work_start:
-                alertas.append("Saída anterior à entrada (horário inválido)")
-                work_start = None
-                intervalo_segundos_atual = 0
-                continue
-
-            segundos_brutos = int((ts - work_start).total_seconds())
-            segundos_trabalho = max(0, segundos_brutos - intervalo_segundos_atual)
-
-            segmentos.append(
-                JornadaSegmentOut(
-                    tipo="trabalho",
-                    inicio=_utc_naive_to_sp(work_start),
-                    fim=_utc_naive_to_sp(ts),
-                    segundos=segundos_trabalho,
-                )
-            )
-            total_trabalhado_segundos += segundos_trabalho
-
-            work_start = None
-            break_start = None
-            intervalo_segundos_atual = 0
-            continue
-
-        alertas.append(f"Tipo de ponto desconhecido: {tipo}")
+@router.get("/me", response_model=UserMe)
+def me(current_user: Principal = Depends(require_admin)):
+    return UserMe(id=current_user.id, email=current_user.email, role=current_user.role.value)
 
-    if break_start is not None:
-        alertas.append("Intervalo iniciado e não finalizado")
-    if work_start is not None:
-        alertas.append("Entrada registrada, mas sem saída")
 
-    if not pontos_sorted:
-        alertas.append("Nenhum ponto registrado no dia")
+@router.get("/auth-cache", response_model=dict)
+def get_auth_cache_stats(_admin: Principal = Depends(require_admin)):
+    return principal_cache.stats()
 
-    if has_intervalo and len(pontos_sorted) != 4:
-        alertas.append("Intervalo exige exatamente 4 batidas no dia (entrada, intervalo início, intervalo fim, saída)")
 
-    return total_trabalhado_segundos, segmentos, alertas
+@router.get("/kdf", response_model=dict)
+def get_kdf_stats(_admin: Principal = Depends(require_admin)):
+    return kdf_executor.stats()
 
 
-@router.get("/me", response_model=UserMe)
-def me(current_user: User = Depends(require_admin)):
-    return UserMe(id=current_user.id, email=current_user.email, role=current_user.role.value)
+@router.get("/punch-cache", response_model=dict)
+def get_punch_cache_stats(_admin: Principal = Depends(require_admin)):
+    return punch_state_cache.stats()
 
 
 @router.get("/funcionarios", response_model=list[EmployeeOut])
 def list_employees(
+    limit: int = 200,
+    cursor: str | None = None,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
-    rows = (
-        db.query(User, EmployeeProfile)
+    limit = clamp_limit(limit)
+    # List endpoints select plain columns and write the body with orjson, skipping a model per row.
+    q = (
+        db.query(User.id, User.email, EmployeeProfile.nome, EmployeeProfile.genero, User.is_active)
         .join(EmployeeProfile, EmployeeProfile.user_id == User.id)
         .filter(User.role == UserRole.employee)
-        .order_by(User.id.desc())
-        .limit(200)
-        .all()
     )
-
-    return [
-        EmployeeOut(id=user.id, email=user.email, nome=profile.nome, genero=profile.genero, is_active=user.is_active)
-        for user, profile in rows
-    ]
+    if cursor:
+        q = q.filter(after_desc([User.id], decode_cursor(cursor, int)))
+
+    rows = q.order_by(User.id.desc()).limit(limit).all()
+    response = ORJSONResponse(
+        [
+            {"id": id_, "email": email, "nome": nome, "genero": genero, "is_active": is_active}
+            for id_, email, nome, genero, is_active in rows
+        ]
+    )
+    if len(rows) == limit:
+        set_next_cursor(response, encode_cursor(rows[-1].id))
+    return response
 
 
 @router.post("/funcionarios", response_model=EmployeeOut)
 def create_employee(
     payload: EmployeeCreate,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
+    # Hash before the first query so no pooled connection is held while waiting on the KDF executor.
+    password_hash = kdf_executor.run(hash_password, payload.password)
+
     existing = db.query(User).filter(User.email == payload.email).first()
     if existing:
         raise HTTPException(status_code=400, detail="E-mail já cadastrado")
 
-    user = User(email=payload.email, password_hash=hash_password(payload.password), role=UserRole.employee)
+    user = User(email=payload.email, password_hash=password_hash, role=UserRole.employee)
     db.add(user)
     db.flush()
 
@@ -313,13 +229,155 @@ def create_employee(
     return EmployeeOut(id=user.id, email=user.email, nome=profile.nome, genero=profile.genero, is_active=user.is_active)
 
 
+_EMPLOYEE_IMPORT_MAX_ROWS = 5000
+_EMPLOYEE_IMPORT_COLUMNS = ("email", "password", "nome", "genero")
+
+
+def _parse_employee_import(body: bytes, content_type: str) -> list[dict]:
+    try:
+        text_body = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Arquivo deve estar em UTF-8")
+
+    if "csv" in content_type:
+        lines = text_body.splitlines()
+        if not lines:
+            raise HTTPException(status_code=400, detail="Arquivo vazio")
+        # Spreadsheets exported in pt-BR usually separate columns with ';'.
+        delimiter = ";" if lines[0].count(";") > lines[0].count(",") else ","
+        reader = csv.DictReader(lines, delimiter=delimiter)
+        missing = [c for c in _EMPLOYEE_IMPORT_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            raise HTTPException(status_code=400, detail=f"Colunas obrigatórias ausentes: {', '.join(missing)}")
+        rows = [{k: (v or "").strip() for k, v in r.items() if k in _EMPLOYEE_IMPORT_COLUMNS} for r in reader]
+    else:
+        try:
+            rows = json.loads(text_body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON inválido")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Envie uma lista de funcionários")
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="Nenhum funcionário para importar")
+    if len(rows) > _EMPLOYEE_IMPORT_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {_EMPLOYEE_IMPORT_MAX_ROWS} funcionários por importação")
+    return rows
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in exc.errors())
+
+
+def _import_employees(db: Session, rows: list, response: Response) -> EmployeeImportOut:
+    results: list[EmployeeImportRowResult] = []
+    valid: list[tuple[EmployeeImportRowResult, EmployeeCreate]] = []
+    seen: set[str] = set()
+    for linha, raw in enumerate(rows, start=1):
+        email = raw.get("email") if isinstance(raw, dict) else None
+        result = EmployeeImportRowResult(linha=linha, email=str(email) if email else None, ok=False)
+        results.append(result)
+        try:
+            item = EmployeeCreate.model_validate(raw)
+        except ValidationError as exc:
+            result.detail = _validation_detail(exc)
+            continue
+        result.email = item.email
+        if item.email in seen:
+            result.detail = "E-mail repetido no arquivo"
+            continue
+        seen.add(item.email)
+        result.ok = True
+        valid.append((result, item))
+
+    if valid:
+        existing = {e for (e,) in db.query(User.email).filter(User.email.in_([i.email for _, i in valid])).all()}
+        for result, item in valid:
+            if item.email in existing:
+                result.ok = False
+                result.detail = "E-mail já cadastrado"
+
+    rejected = sum(1 for r in results if not r.ok)
+    if rejected:
+        # All or nothing: the admin fixes the file and sends it again.
+        response.status_code = 422
+        return EmployeeImportOut(created=0, rejected=rejected, results=results)
+
+    password_hashes = kdf_executor.map(
+        hash_password,
+        [item.password for _, item in valid],
+        settings.password_hash_workers or kdf_executor.workers // 2,
+    )
+    now = datetime.utcnow()
+    try:
+        user_ids = db.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [
+                {
+                    "email": item.email,
+                    "password_hash": password_hash,
+                    "role": UserRole.employee,
+                    "is_active": True,
+                    "created_at": now,
+                }
+                for (_, item), password_hash in zip(valid, password_hashes)
+            ],
+        ).all()
+        db.execute(
+            insert(EmployeeProfile),
+            [
+                {"user_id": user_id, "nome": item.nome, "genero": item.genero}
+                for (_, item), user_id in zip(valid, user_ids)
+            ],
+        )
+        db.execute(
+            insert(EmployeeAuthPolicy),
+            [
+                {
+                    "employee_user_id": user_id,
+                    "allow_password_login": True,
+                    "allow_face_login": False,
+                    "updated_at": now,
+                }
+                for user_id in user_ids
+            ],
+        )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="E-mail já cadastrado (importação concorrente). Envie novamente.")
+
+    for (result, _), user_id in zip(valid, user_ids):
+        result.id = user_id
+    return EmployeeImportOut(created=len(valid), rejected=0, results=results)
+
+
+def _import_employees_in_session(rows: list, response: Response) -> EmployeeImportOut:
+    # Opened on the thread that uses it: a dependency session would be created on another threadpool thread.
+    with SessionLocal() as db:
+        return _import_employees(db, rows, response)
+
+
+@router.post("/funcionarios/import", response_model=EmployeeImportOut)
+async def import_employees(
+    request: Request,
+    response: Response,
+    _admin: Principal = Depends(require_admin),
+):
+    rows = _parse_employee_import(await request.body(), request.headers.get("content-type", ""))
+    # Hashing and inserts block; keep them off the event loop.
+    return await run_in_threadpool(_import_employees_in_session, rows, response)
+
+
 @router.put("/funcionarios/{employee_user_id}", response_model=EmployeeOut)
 def update_employee(
     employee_user_id: int,
     payload: EmployeeUpdate,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
+    password_hash = kdf_executor.run(hash_password, payload.password) if payload.password else None
+
     user = db.get(User, employee_user_id)
     if not user or user.role != UserRole.employee:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
@@ -329,8 +387,8 @@ def update_employee(
         raise HTTPException(status_code=400, detail="E-mail já cadastrado")
 
     user.email = payload.email
-    if payload.password:
-        user.password_hash = hash_password(payload.password)
+    if password_hash:
+        user.password_hash = password_hash
 
     profile = db.query(EmployeeProfile).filter(EmployeeProfile.user_id == user.id).first()
     if not profile:
@@ -340,7 +398,9 @@ def update_employee(
         profile.nome = payload.nome
         profile.genero = payload.genero
 
+    bump_auth_generation(db, user.id)
     db.commit()
+    principal_cache.invalidate(user.id)
     db.refresh(user)
     return EmployeeOut(id=user.id, email=user.email, nome=profile.nome, genero=profile.genero, is_active=user.is_active)
 
@@ -349,7 +409,7 @@ def update_employee(
 def deactivate_employee(
     employee_user_id: int,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     user = db.get(User, employee_user_id)
     if not user or user.role != UserRole.employee:
@@ -358,9 +418,10 @@ def deactivate_employee(
     if not user.is_active:
         return {"ok": True, "deactivated": False}
 
+    now = datetime.utcnow()
     user.is_active = False
+    user.deactivated_at = now
 
-    now = datetime.utcnow()
     active_devices = (
         db.query(EmployeeDevice)
         .filter(EmployeeDevice.employee_user_id == user.id)
@@ -370,7 +431,9 @@ def deactivate_employee(
     for d in active_devices:
         d.revoked_at = now
 
+    bump_auth_generation(db, user.id)
     db.commit()
+    principal_cache.invalidate(user.id)
     return {"ok": True, "deactivated": True}
 
 
@@ -389,7 +452,7 @@ def _get_employee_policy(db: Session, employee_user_id: int) -> EmployeeAuthPoli
 def get_employee_auth_policy(
     employee_user_id: int,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     employee = db.get(User, employee_user_id)
     if not employee or employee.role != UserRole.employee:
@@ -399,7 +462,7 @@ def get_employee_auth_policy(
     return EmployeeAuthPolicyOut(
         allow_password_login=row.allow_password_login,
         allow_face_login=row.allow_face_login,
-        updated_at=_utc_naive_to_sp(row.updated_at),
+        updated_at=utc_naive_to_sp(row.updated_at),
     )
 
 
@@ -408,22 +471,26 @@ def upsert_employee_auth_policy(
     employee_user_id: int,
     payload: EmployeeAuthPolicyUpsert,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     employee = db.get(User, employee_user_id)
     if not employee or employee.role != UserRole.employee:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
 
-    row = _get_employee_policy(db, employee.id)
+    # _get_employee_policy may commit (expiring `employee`), and the response repeats what was written,
+    # so neither the user nor the policy is read again.
+    row = _get_employee_policy(db, employee_user_id)
+    updated_at = datetime.utcnow()
     row.allow_password_login = payload.allow_password_login
     row.allow_face_login = payload.allow_face_login
-    row.updated_at = datetime.utcnow()
+    row.updated_at = updated_at
+    bump_auth_generation(db, employee_user_id)
     db.commit()
-    db.refresh(row)
+    principal_cache.invalidate(employee_user_id)
     return EmployeeAuthPolicyOut(
-        allow_password_login=row.allow_password_login,
-        allow_face_login=row.allow_face_login,
-        updated_at=_utc_naive_to_sp(row.updated_at),
+        allow_password_login=payload.allow_password_login,
+        allow_face_login=payload.allow_face_login,
+        updated_at=utc_naive_to_sp(updated_at),
     )
 
 
@@ -431,7 +498,7 @@ def upsert_employee_auth_policy(
 def create_device_pairing_code(
     employee_user_id: int,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     employee = db.get(User, employee_user_id)
     if not employee or employee.role != UserRole.employee:
@@ -450,26 +517,30 @@ def create_device_pairing_code(
             detail="Funcionário já possui um dispositivo ativo. Revogue o dispositivo atual antes de cadastrar um novo.",
         )
 
-    now = datetime.utcnow()
-
+    # Checks first, so a bad id does not take a KDF slot; nothing written yet, so release the connection meanwhile.
+    db.rollback()
     code = secrets.token_urlsafe(9)
+    code_hash = kdf_executor.run(hash_password, code)
+
+    now = datetime.utcnow()
     expires_at = now + timedelta(minutes=10)
 
     row = DevicePairingCode(
-        employee_user_id=employee.id,
-        code_hash=hash_password(code),
+        employee_user_id=employee_user_id,
+        code_hash=code_hash,
+        code_lookup=pairing_code_lookup_id(code),
         expires_at=expires_at,
     )
     db.add(row)
     db.commit()
-    return DevicePairingCodeOut(code=code, expires_at=_utc_naive_to_sp(expires_at))
+    return DevicePairingCodeOut(code=code, expires_at=utc_naive_to_sp(expires_at))
 
 
 @router.get("/funcionarios/{employee_user_id}/device", response_model=EmployeeDeviceOut | None)
 def get_employee_active_device(
     employee_user_id: int,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     employee = db.get(User, employee_user_id)
     if not employee or employee.role != UserRole.employee:
@@ -488,7 +559,7 @@ def get_employee_active_device(
     return EmployeeDeviceOut(
         device_id=row.device_id,
         device_name=row.device_name,
-        created_at=_utc_naive_to_sp(row.created_at),
+        created_at=utc_naive_to_sp(row.created_at),
     )
 
 
@@ -496,7 +567,7 @@ def get_employee_active_device(
 def revoke_employee_active_device(
     employee_user_id: int,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     employee = db.get(User, employee_user_id)
     if not employee or employee.role != UserRole.employee:
@@ -521,7 +592,7 @@ def revoke_employee_active_device(
 def upsert_config_local(
     payload: ConfigLocalUpsert,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     row = db.query(ConfigLocal).filter(ConfigLocal.id == 1).first()
     if not row:
@@ -540,35 +611,156 @@ def upsert_config_local(
         row.updated_at = datetime.utcnow()
 
     db.commit()
+    config_cache.invalidate()
     db.refresh(row)
     return ConfigLocalOut(
         local_lat=row.local_lat,
         local_lng=row.local_lng,
         raio_m=row.raio_m,
-        updated_at=_utc_naive_to_sp(row.updated_at),
+        updated_at=utc_naive_to_sp(row.updated_at),
     )
 
 
-@router.get("/pontos-correction-config", response_model=PontoCorrectionConfigOut)
-def get_pontos_correction_config(
+def _local_out(row: Local, user_ids: list[int]) -> LocalOut:
+    return LocalOut(
+        id=row.id,
+        nome=row.nome,
+        lat=row.lat,
+        lng=row.lng,
+        raio_m=row.raio_m,
+        is_active=row.is_active,
+        user_ids=sorted(user_ids),
+        updated_at=utc_naive_to_sp(row.updated_at),
+    )
+
+
+def _local_user_ids(db: Session, local_id: int) -> list[int]:
+    return [uid for (uid,) in db.query(LocalFuncionario.user_id).filter(LocalFuncionario.local_id == local_id).all()]
+
+
+@router.get("/locais", response_model=list[LocalOut])
+def list_locais(
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
-    row = db.query(PontoCorrectionConfig).filter(PontoCorrectionConfig.id == 1).first()
+    user_ids: dict[int, list[int]] = {}
+    for local_id, uid in db.query(LocalFuncionario.local_id, LocalFuncionario.user_id).all():
+        user_ids.setdefault(local_id, []).append(uid)
+    rows = db.query(Local).order_by(Local.nome.asc(), Local.id.asc()).all()
+    return [_local_out(r, user_ids.get(r.id, [])) for r in rows]
+
+
+@router.post("/locais", response_model=LocalOut)
+def create_local(
+    payload: LocalUpsert,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    now = datetime.utcnow()
+    row = Local(
+        nome=payload.nome,
+        lat=payload.lat,
+        lng=payload.lng,
+        raio_m=payload.raio_m,
+        is_active=payload.is_active,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(row)
+    db.commit()
+    site_index_cache.invalidate()
+    db.refresh(row)
+    return _local_out(row, [])
+
+
+@router.put("/locais/{local_id}", response_model=LocalOut)
+def update_local(
+    local_id: int,
+    payload: LocalUpsert,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    row = db.query(Local).filter(Local.id == local_id).first()
     if not row:
-        row = PontoCorrectionConfig(id=1, window_days=30, updated_at=datetime.utcnow())
-        db.add(row)
-        db.commit()
-        db.refresh(row)
+        raise HTTPException(status_code=404, detail="Local não encontrado")
+
+    row.nome = payload.nome
+    row.lat = payload.lat
+    row.lng = payload.lng
+    row.raio_m = payload.raio_m
+    row.is_active = payload.is_active
+    row.updated_at = datetime.utcnow()
+    db.commit()
+    site_index_cache.invalidate()
+    db.refresh(row)
+    return _local_out(row, _local_user_ids(db, row.id))
+
+
+@router.delete("/locais/{local_id}", response_model=dict)
+def deactivate_local(
+    local_id: int,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    row = db.query(Local).filter(Local.id == local_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Local não encontrado")
 
-    return PontoCorrectionConfigOut(window_days=row.window_days, updated_at=_utc_naive_to_sp(row.updated_at))
+    row.is_active = False
+    row.updated_at = datetime.utcnow()
+    db.commit()
+    site_index_cache.invalidate()
+    return {"ok": True}
+
+
+@router.put("/locais/{local_id}/funcionarios", response_model=LocalOut)
+def set_local_funcionarios(
+    local_id: int,
+    payload: LocalFuncionariosSet,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    row = db.query(Local).filter(Local.id == local_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Local não encontrado")
+
+    user_ids = set(payload.user_ids)
+    if user_ids:
+        found = {
+            uid
+            for (uid,) in db.query(User.id).filter(User.id.in_(user_ids), User.role == UserRole.employee).all()
+        }
+        missing = sorted(user_ids - found)
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Funcionário não encontrado: {missing[0]}")
+
+    db.query(LocalFuncionario).filter(LocalFuncionario.local_id == local_id).delete(synchronize_session=False)
+    db.add_all([LocalFuncionario(local_id=local_id, user_id=uid) for uid in user_ids])
+    # Moves the stamp other workers revalidate their site index against.
+    row.updated_at = datetime.utcnow()
+    db.commit()
+    site_index_cache.invalidate()
+    db.refresh(row)
+    return _local_out(row, list(user_ids))
+
+
+@router.get("/pontos-correction-config", response_model=PontoCorrectionConfigOut)
+def get_pontos_correction_config(
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    cfg = config_cache.get(db)
+    return PontoCorrectionConfigOut(
+        window_days=cfg.correction_window_days,
+        updated_at=utc_naive_to_sp(cfg.correction_updated_at or datetime.utcnow()),
+    )
 
 
 @router.put("/pontos-correction-config", response_model=PontoCorrectionConfigOut)
 def upsert_pontos_correction_config(
     payload: PontoCorrectionConfigUpsert,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     row = db.query(PontoCorrectionConfig).filter(PontoCorrectionConfig.id == 1).first()
     if not row:
@@ -579,19 +771,20 @@ def upsert_pontos_correction_config(
         row.updated_at = datetime.utcnow()
 
     db.commit()
+    config_cache.invalidate()
     db.refresh(row)
-    return PontoCorrectionConfigOut(window_days=row.window_days, updated_at=_utc_naive_to_sp(row.updated_at))
+    return PontoCorrectionConfigOut(window_days=row.window_days, updated_at=utc_naive_to_sp(row.updated_at))
 
 
 @router.get("/jornada-validation-config", response_model=JornadaValidationConfigOut)
 def get_jornada_validation_config(
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
-    row = _get_jornada_validation_config(db)
+    cfg = config_cache.get(db)
     return JornadaValidationConfigOut(
-        intervalo_exige_4_batidas_blocking=bool(row.intervalo_exige_4_batidas_blocking),
-        updated_at=_utc_naive_to_sp(row.updated_at),
+        intervalo_exige_4_batidas_blocking=cfg.intervalo_exige_4_batidas_blocking,
+        updated_at=utc_naive_to_sp(cfg.jornada_validation_updated_at or datetime.utcnow()),
     )
 
 
@@ -599,7 +792,7 @@ def get_jornada_validation_config(
 def upsert_jornada_validation_config(
     payload: JornadaValidationConfigUpsert,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     row = db.query(JornadaValidationConfig).filter(JornadaValidationConfig.id == 1).first()
     if not row:
@@ -614,10 +807,56 @@ def upsert_jornada_validation_config(
         row.updated_at = datetime.utcnow()
 
     db.commit()
+    config_cache.invalidate()
     db.refresh(row)
     return JornadaValidationConfigOut(
         intervalo_exige_4_batidas_blocking=bool(row.intervalo_exige_4_batidas_blocking),
-        updated_at=_utc_naive_to_sp(row.updated_at),
+        updated_at=utc_naive_to_sp(row.updated_at),
+    )
+
+
+@router.get("/banco-horas-config", response_model=BancoHorasConfigOut)
+def get_banco_horas_config(
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    cfg = config_cache.get(db)
+    return BancoHorasConfigOut(
+        carga_diaria_minutos=cfg.carga_diaria_minutos,
+        dias_semana=sorted(cfg.dias_semana),
+        updated_at=utc_naive_to_sp(cfg.banco_horas_updated_at or datetime.utcnow()),
+    )
+
+
+@router.put("/banco-horas-config", response_model=BancoHorasConfigOut)
+def upsert_banco_horas_config(
+    payload: BancoHorasConfigUpsert,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    # Applies to days not closed yet; closed days keep the expected time they were closed with.
+    dias_semana = ",".join(str(d) for d in sorted(set(payload.dias_semana)))
+    row = db.query(BancoHorasConfig).filter(BancoHorasConfig.id == 1).first()
+    if not row:
+        row = BancoHorasConfig(
+            id=1,
+            carga_diaria_minutos=payload.carga_diaria_minutos,
+            dias_semana=dias_semana,
+            updated_at=datetime.utcnow(),
+        )
+        db.add(row)
+    else:
+        row.carga_diaria_minutos = payload.carga_diaria_minutos
+        row.dias_semana = dias_semana
+        row.updated_at = datetime.utcnow()
+
+    db.commit()
+    config_cache.invalidate()
+    db.refresh(row)
+    return BancoHorasConfigOut(
+        carga_diaria_minutos=row.carga_diaria_minutos,
+        dias_semana=sorted(set(payload.dias_semana)),
+        updated_at=utc_naive_to_sp(row.updated_at),
     )
 
 
@@ -626,45 +865,67 @@ def list_pontos_admin(
     user_id: int,
     start: str | None = None,
     end: str | None = None,
+    limit: int = 200,
+    cursor: str | None = None,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     q = (
-        db.query(Ponto, User, EmployeeProfile)
+        db.query(
+            Ponto.id,
+            Ponto.tipo,
+            Ponto.registrado_em,
+            Ponto.lat,
+            Ponto.lng,
+            Ponto.accuracy_m,
+            Ponto.distancia_m,
+            Ponto.local_id,
+            User.email,
+            EmployeeProfile.nome,
+        )
+        .select_from(Ponto)
         .join(User, User.id == Ponto.user_id)
         .outerjoin(EmployeeProfile, EmployeeProfile.user_id == User.id)
         .filter(Ponto.user_id == user_id)
     )
 
     if start:
-        q = q.filter(Ponto.registrado_em >= _sp_date_to_utc_naive_start(start))
+        q = q.filter(Ponto.registrado_em >= sp_date_to_utc_naive_start(start))
     if end:
-        q = q.filter(Ponto.registrado_em < _sp_date_to_utc_naive_end_exclusive(end))
-
-    rows = q.order_by(Ponto.registrado_em.desc()).limit(200).all()
-
-    return [
-        PontoAdminOut(
-            id=p.id,
-            user_id=u.id,
-            email=u.email,
-            nome=profile.nome if profile else u.email,
-            tipo=p.tipo.value,
-            registrado_em=_utc_naive_to_sp(p.registrado_em),
-            lat=p.lat,
-            lng=p.lng,
-            accuracy_m=p.accuracy_m,
-            distancia_m=p.distancia_m,
-        )
-        for p, u, profile in rows
-    ]
+        q = q.filter(Ponto.registrado_em < sp_date_to_utc_naive_end_exclusive(end))
+    if cursor:
+        q = q.filter(after_desc([Ponto.registrado_em, Ponto.id], decode_cursor(cursor, datetime, int)))
+
+    limit = clamp_limit(limit)
+    rows = q.order_by(Ponto.registrado_em.desc(), Ponto.id.desc()).limit(limit).all()
+    response = ORJSONResponse(
+        [
+            {
+                "id": id_,
+                "tipo": tipo,
+                "registrado_em": utc_naive_to_sp(registrado_em),
+                "lat": lat,
+                "lng": lng,
+                "accuracy_m": accuracy_m,
+                "distancia_m": distancia_m,
+                "local_id": local_id,
+                "user_id": user_id,
+                "email": email,
+                "nome": nome if nome is not None else email,
+            }
+            for id_, tipo, registrado_em, lat, lng, accuracy_m, distancia_m, local_id, email, nome in rows
+        ]
+    )
+    if len(rows) == limit:
+        set_next_cursor(response, encode_cursor(rows[-1].registrado_em, rows[-1].id))
+    return response
 
 
 @router.get("/pontos/last", response_model=PontoAdminOut)
 def get_last_ponto_admin(
     user_id: int,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     row = (
         db.query(Ponto, User, EmployeeProfile)
@@ -684,14 +945,190 @@ def get_last_ponto_admin(
         email=u.email,
         nome=profile.nome if profile else u.email,
         tipo=p.tipo.value,
-        registrado_em=_utc_naive_to_sp(p.registrado_em),
+        registrado_em=utc_naive_to_sp(p.registrado_em),
         lat=p.lat,
         lng=p.lng,
         accuracy_m=p.accuracy_m,
         distancia_m=p.distancia_m,
+        local_id=p.local_id,
+    )
+
+
+_PONTOS_EXPORT_HEADER = [
+    "id",
+    "user_id",
+    "email",
+    "nome",
+    "tipo",
+    "registrado_em",
+    "lat",
+    "lng",
+    "accuracy_m",
+    "distancia_m",
+]
+
+
+@router.get("/pontos/export")
+def export_pontos_admin(
+    format: Literal["csv", "xlsx"] = "csv",
+    user_id: int | None = None,
+    start: str | None = None,
+    end: str | None = None,
+    tipo: str | None = None,
+    _admin: Principal = Depends(require_admin),
+):
+    try:
+        start_dt = sp_date_to_utc_naive_start(start) if start else None
+        end_dt = sp_date_to_utc_naive_end_exclusive(end) if end else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Data inválida. Use YYYY-MM-DD")
+    tipo_enum = None
+    if tipo:
+        try:
+            tipo_enum = PontoTipo(tipo)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Tipo inválido")
+
+    def rows():
+        # The request-scoped session is closed before the body is streamed, so the generator owns its own.
+        db = SessionLocal()
+        try:
+            q = (
+                db.query(
+                    Ponto.id,
+                    Ponto.user_id,
+                    User.email,
+                    EmployeeProfile.nome,
+                    Ponto.tipo,
+                    Ponto.registrado_em,
+                    Ponto.lat,
+                    Ponto.lng,
+                    Ponto.accuracy_m,
+                    Ponto.distancia_m,
+                )
+                .join(User, User.id == Ponto.user_id)
+                .outerjoin(EmployeeProfile, EmployeeProfile.user_id == User.id)
+            )
+            if user_id is not None:
+                q = q.filter(Ponto.user_id == user_id)
+            if start_dt:
+                q = q.filter(Ponto.registrado_em >= start_dt)
+            if end_dt:
+                q = q.filter(Ponto.registrado_em < end_dt)
+            if tipo_enum:
+                q = q.filter(Ponto.tipo == tipo_enum)
+
+            for r in q.order_by(Ponto.registrado_em, Ponto.id).yield_per(1000):
+                yield [
+                    r.id,
+                    r.user_id,
+                    r.email,
+                    r.nome or r.email,
+                    r.tipo.value,
+                    utc_naive_to_sp(r.registrado_em).strftime("%Y-%m-%d %H:%M:%S"),
+                    r.lat,
+                    r.lng,
+                    r.accuracy_m,
+                    r.distancia_m,
+                ]
+        finally:
+            db.close()
+
+    filename = "pontos"
+    if start:
+        filename += f"_{start}"
+    if end:
+        filename += f"_{end}"
+
+    if format == "xlsx":
+        return StreamingResponse(
+            iter_xlsx(_PONTOS_EXPORT_HEADER, rows()),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f'attachment; filename="{filename}.xlsx"'},
+        )
+    return StreamingResponse(
+        iter_csv(_PONTOS_EXPORT_HEADER, rows()),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'},
     )
 
 
+def _distancia_job_out(job: DistanciaRecomputeJob) -> DistanciaRecomputeJobOut:
+    return DistanciaRecomputeJobOut(
+        id=job.id,
+        local_id=job.local_id,
+        status=job_status(job),
+        total=job.total,
+        processed=job.processed,
+        last_ponto_id=job.last_ponto_id,
+        error=job.error,
+        created_at=utc_naive_to_sp(job.created_at),
+        updated_at=utc_naive_to_sp(job.updated_at),
+        finished_at=utc_naive_to_sp(job.finished_at) if job.finished_at else None,
+    )
+
+
+def _run_distancia_job_background(job_id: int) -> None:
+    # Runs after the response is sent, so it cannot use the request-scoped session.
+    db = SessionLocal()
+    try:
+        run_distancia_job(db, job_id)
+    except Exception:
+        logger.exception("Recalculo de distancia_m falhou (job %s)", job_id)
+    finally:
+        db.close()
+
+
+@router.post("/pontos/recompute-distancia", response_model=DistanciaRecomputeJobOut)
+def start_recompute_distancia(
+    payload: DistanciaRecomputeCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    job = create_distancia_job(db, payload.local_id)
+    if not job:
+        if payload.local_id is None:
+            raise HTTPException(status_code=404, detail="Local de trabalho não configurado")
+        raise HTTPException(status_code=404, detail="Local não encontrado")
+
+    background_tasks.add_task(_run_distancia_job_background, job.id)
+    return _distancia_job_out(job)
+
+
+@router.get("/pontos/recompute-distancia/{job_id}", response_model=DistanciaRecomputeJobOut)
+def get_recompute_distancia(
+    job_id: int,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    job = db.get(DistanciaRecomputeJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Recálculo não encontrado")
+    return _distancia_job_out(job)
+
+
+@router.post("/pontos/recompute-distancia/{job_id}/resume", response_model=DistanciaRecomputeJobOut)
+def resume_recompute_distancia(
+    job_id: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    # The UPDATE decides which request resumes the job, so two concurrent resumes cannot run it twice.
+    if not claim_distancia_job(db, job_id):
+        job = db.get(DistanciaRecomputeJob, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Recálculo não encontrado")
+        if job.status == "done":
+            raise HTTPException(status_code=409, detail="Recálculo já concluído")
+        raise HTTPException(status_code=409, detail="Recálculo em andamento")
+
+    job = db.get(DistanciaRecomputeJob, job_id)
+    background_tasks.add_task(_run_distancia_job_background, job.id)
+    return _distancia_job_out(job)
+
+
 @router.get("/pontos/audit", response_model=PontoAdminAuditPageOut)
 def list_pontos_audit(
     user_id: int | None = None,
@@ -703,16 +1140,30 @@ def list_pontos_audit(
     limit: int = 200,
     cursor: str | None = None,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
-    limit = max(1, min(int(limit), 500))
+    limit = clamp_limit(limit)
 
     employee_u = aliased(User)
     admin_u = aliased(User)
     profile = aliased(EmployeeProfile)
 
     q = (
-        db.query(PontoAdminAudit, employee_u, profile, admin_u)
+        db.query(
+            PontoAdminAudit.id,
+            PontoAdminAudit.action,
+            PontoAdminAudit.ponto_id,
+            PontoAdminAudit.employee_user_id,
+            employee_u.email,
+            profile.nome,
+            PontoAdminAudit.admin_user_id,
+            admin_u.email,
+            PontoAdminAudit.motivo,
+            PontoAdminAudit.before_json,
+            PontoAdminAudit.after_json,
+            PontoAdminAudit.created_at,
+        )
+        .select_from(PontoAdminAudit)
         .join(employee_u, employee_u.id == PontoAdminAudit.employee_user_id)
         .outerjoin(profile, profile.user_id == employee_u.id)
         .join(admin_u, admin_u.id == PontoAdminAudit.admin_user_id)
@@ -734,67 +1185,72 @@ def list_pontos_audit(
     if motivo_contains:
         termo = motivo_contains.strip()
         if termo:
-            q = q.filter(PontoAdminAudit.motivo.ilike(f"%{termo}%"))
+            q = q.filter(motivo_contains_clause(db, termo))
     if start:
-        q = q.filter(PontoAdminAudit.created_at >= _sp_date_to_utc_naive_start(start))
+        q = q.filter(PontoAdminAudit.created_at >= sp_date_to_utc_naive_start(start))
     if end:
-        q = q.filter(PontoAdminAudit.created_at < _sp_date_to_utc_naive_end_exclusive(end))
+        q = q.filter(PontoAdminAudit.created_at < sp_date_to_utc_naive_end_exclusive(end))
 
     if cursor:
-        cursor_created_at, cursor_id = _decode_audit_cursor(cursor)
         q = q.filter(
-            (PontoAdminAudit.created_at < cursor_created_at)
-            | ((PontoAdminAudit.created_at == cursor_created_at) & (PontoAdminAudit.id < cursor_id))
+            after_desc([PontoAdminAudit.created_at, PontoAdminAudit.id], decode_cursor(cursor, datetime, int))
         )
 
     rows = q.order_by(PontoAdminAudit.created_at.desc(), PontoAdminAudit.id.desc()).limit(limit).all()
 
-    out_items: list[PontoAdminAuditOut] = []
-    for audit, emp, emp_profile, adm in rows:
-        before = None
-        after = None
-        try:
-            if audit.before_json:
-                before = json.loads(audit.before_json)
-        except Exception:
-            before = None
-        try:
-            if audit.after_json:
-                after = json.loads(audit.after_json)
-        except Exception:
-            after = None
-
-        out_items.append(
-            PontoAdminAuditOut(
-                id=audit.id,
-                action=audit.action.value,
-                ponto_id=audit.ponto_id,
-                employee_user_id=emp.id,
-                employee_email=emp.email,
-                employee_nome=emp_profile.nome if emp_profile else emp.email,
-                admin_user_id=adm.id,
-                admin_email=adm.email,
-                motivo=audit.motivo,
-                before=before,
-                after=after,
-                created_at=_utc_naive_to_sp(audit.created_at),
-            )
-        )
+    # before_json/after_json are only ever written by json.dumps of a snapshot dict, so they go into the
+    # body as they are stored instead of being parsed and encoded again.
+    items = [
+        {
+            "id": id_,
+            "action": action,
+            "ponto_id": ponto_id,
+            "employee_user_id": employee_user_id,
+            "employee_email": employee_email,
+            "employee_nome": employee_nome if employee_nome is not None else employee_email,
+            "admin_user_id": admin_user_id,
+            "admin_email": admin_email,
+            "motivo": motivo,
+            "before": orjson.Fragment(before_json) if before_json else None,
+            "after": orjson.Fragment(after_json) if after_json else None,
+            "created_at": utc_naive_to_sp(created_at),
+        }
+        for (
+            id_,
+            action,
+            ponto_id,
+            employee_user_id,
+            employee_email,
+            employee_nome,
+            admin_user_id,
+            admin_email,
+            motivo,
+            before_json,
+            after_json,
+            created_at,
+        ) in rows
+    ]
 
     next_cursor = None
     if len(rows) == limit:
-        last_audit = rows[-1][0]
-        next_cursor = _encode_audit_cursor(last_audit.created_at, last_audit.id)
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
 
-    return PontoAdminAuditPageOut(items=out_items, next_cursor=next_cursor)
+    return ORJSONResponse({"items": items, "next_cursor": next_cursor})
 
 
 @router.post("/pontos", response_model=PontoAdminOut)
 def admin_create_ponto(
     payload: AdminPontoCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin),
+    admin_user: Principal = Depends(require_admin),
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_KEY_HEADER),
 ):
+    fingerprint = request_hash("POST /admin/pontos", payload)
+    replay = find_replay(db, admin_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
     employee = db.get(User, payload.user_id)
     if not employee or employee.role != UserRole.employee:
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
@@ -813,9 +1269,12 @@ def admin_create_ponto(
         distancia_m=payload.distancia_m,
     )
     db.add(row)
-    db.commit()
-    db.refresh(row)
+    db.flush()
+    date_str = sp_date_of(row.registrado_em)
+    jornada = recompute_jornada_dia(db, employee.id, date_str)
+    ajustar_banco_horas(db, employee.id, date_str, jornada.total_trabalhado_segundos if jornada else 0)
 
+    # Ponto, audit and idempotency key commit together, so a retry can never see one without the others.
     audit = PontoAdminAudit(
         action=PontoAdminAuditAction.create,
         ponto_id=row.id,
@@ -826,30 +1285,44 @@ def admin_create_ponto(
         after_json=json.dumps(_ponto_to_audit_snapshot(row), ensure_ascii=False),
     )
     db.add(audit)
-    db.commit()
 
     profile = db.query(EmployeeProfile).filter(EmployeeProfile.user_id == employee.id).first()
-    return PontoAdminOut(
+    out = PontoAdminOut(
         id=row.id,
         user_id=employee.id,
         email=employee.email,
         nome=profile.nome if profile else employee.email,
         tipo=row.tipo.value,
-        registrado_em=_utc_naive_to_sp(row.registrado_em),
+        registrado_em=utc_naive_to_sp(row.registrado_em),
         lat=row.lat,
         lng=row.lng,
         accuracy_m=row.accuracy_m,
         distancia_m=row.distancia_m,
+        local_id=row.local_id,
     )
+    replay = commit_with_key(db, admin_user.id, idempotency_key, fingerprint, out.model_dump_json())
+    if replay:
+        return replay
+    punch_state_cache.invalidate(employee.id, sp_date_of(target_dt))
+    if idempotency_key:
+        schedule_purge(background_tasks)
+    return out
 
 
 @router.put("/pontos/{ponto_id}", response_model=PontoAdminOut)
 def admin_update_ponto(
     ponto_id: int,
     payload: AdminPontoUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin),
+    admin_user: Principal = Depends(require_admin),
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_KEY_HEADER),
 ):
+    fingerprint = request_hash(f"PUT /admin/pontos/{ponto_id}", payload)
+    replay = find_replay(db, admin_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
     row = db.get(Ponto, ponto_id)
     if not row:
         raise HTTPException(status_code=404, detail="Ponto não encontrado")
@@ -859,6 +1332,7 @@ def admin_update_ponto(
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
 
     before = _ponto_to_audit_snapshot(row)
+    before_date = sp_date_of(row.registrado_em)
 
     target_dt = _sp_datetime_to_utc_naive(payload.date, payload.time)
     window_days = _get_correction_window_days(db)
@@ -871,8 +1345,11 @@ def admin_update_ponto(
     row.accuracy_m = payload.accuracy_m
     row.distancia_m = payload.distancia_m
 
-    db.commit()
-    db.refresh(row)
+    db.flush()
+    for date_str in sorted({before_date, sp_date_of(row.registrado_em)}):
+        jornada = recompute_jornada_dia(db, employee.id, date_str)
+        # Only the corrected days and the checkpoints after them change in the hours bank.
+        ajustar_banco_horas(db, employee.id, date_str, jornada.total_trabalhado_segundos if jornada else 0)
 
     audit = PontoAdminAudit(
         action=PontoAdminAuditAction.update,
@@ -884,30 +1361,45 @@ def admin_update_ponto(
         after_json=json.dumps(_ponto_to_audit_snapshot(row), ensure_ascii=False),
     )
     db.add(audit)
-    db.commit()
 
     profile = db.query(EmployeeProfile).filter(EmployeeProfile.user_id == employee.id).first()
-    return PontoAdminOut(
+    out = PontoAdminOut(
         id=row.id,
         user_id=employee.id,
         email=employee.email,
         nome=profile.nome if profile else employee.email,
         tipo=row.tipo.value,
-        registrado_em=_utc_naive_to_sp(row.registrado_em),
+        registrado_em=utc_naive_to_sp(row.registrado_em),
         lat=row.lat,
         lng=row.lng,
         accuracy_m=row.accuracy_m,
         distancia_m=row.distancia_m,
+        local_id=row.local_id,
     )
+    replay = commit_with_key(db, admin_user.id, idempotency_key, fingerprint, out.model_dump_json())
+    if replay:
+        return replay
+    for date_str in {before_date, sp_date_of(target_dt)}:
+        punch_state_cache.invalidate(employee.id, date_str)
+    if idempotency_key:
+        schedule_purge(background_tasks)
+    return out
 
 
 @router.delete("/pontos/{ponto_id}")
 def admin_delete_ponto(
     ponto_id: int,
     payload: AdminPontoDelete,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    admin_user: User = Depends(require_admin),
+    admin_user: Principal = Depends(require_admin),
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_KEY_HEADER),
 ):
+    fingerprint = request_hash(f"DELETE /admin/pontos/{ponto_id}", payload)
+    replay = find_replay(db, admin_user.id, idempotency_key, fingerprint)
+    if replay:
+        return replay
+
     row = db.get(Ponto, ponto_id)
     if not row:
         raise HTTPException(status_code=404, detail="Ponto não encontrado")
@@ -920,8 +1412,11 @@ def admin_delete_ponto(
     _assert_within_correction_window(row.registrado_em, window_days)
 
     before = _ponto_to_audit_snapshot(row)
+    before_date = sp_date_of(row.registrado_em)
     db.delete(row)
-    db.commit()
+    db.flush()
+    jornada = recompute_jornada_dia(db, employee.id, before_date)
+    ajustar_banco_horas(db, employee.id, before_date, jornada.total_trabalhado_segundos if jornada else 0)
 
     audit = PontoAdminAudit(
         action=PontoAdminAuditAction.delete,
@@ -933,8 +1428,13 @@ def admin_delete_ponto(
         after_json=None,
     )
     db.add(audit)
-    db.commit()
 
+    replay = commit_with_key(db, admin_user.id, idempotency_key, fingerprint, json.dumps({"ok": True}))
+    if replay:
+        return replay
+    punch_state_cache.invalidate(employee.id, before_date)
+    if idempotency_key:
+        schedule_purge(background_tasks)
     return {"ok": True}
 
 
@@ -943,7 +1443,7 @@ def jornada_do_dia_admin(
     user_id: int,
     date: str,
     db: Session = Depends(get_db),
-    _admin: User = Depends(require_admin),
+    _admin: Principal = Depends(require_admin),
 ):
     user = db.get(User, user_id)
     if not user or user.role != UserRole.employee:
@@ -951,22 +1451,10 @@ def jornada_do_dia_admin(
 
     profile = db.query(EmployeeProfile).filter(EmployeeProfile.user_id == user.id).first()
 
-    start_dt = _sp_date_to_utc_naive_start(date)
-    end_dt = _sp_date_to_utc_naive_end_exclusive(date)
-    pontos = (
-        db.query(Ponto)
-        .filter(Ponto.user_id == user.id)
-        .filter(Ponto.registrado_em >= start_dt)
-        .filter(Ponto.registrado_em < end_dt)
-        .all()
-    )
+    total_s, segmentos, alertas, batidas, has_intervalo = load_jornada_dia(db, user.id, date)
 
-    total_s, segmentos, alertas = _compute_jornada_from_pontos(date, pontos)
-
-    cfg = _get_jornada_validation_config(db)
-    if bool(cfg.intervalo_exige_4_batidas_blocking):
-        has_intervalo = any(p.tipo.value in ("intervalo_inicio", "intervalo_fim") for p in pontos)
-        if has_intervalo and len(pontos) != 4:
+    if config_cache.get(db).intervalo_exige_4_batidas_blocking:
+        if has_intervalo and batidas != 4:
             raise HTTPException(
                 status_code=422,
                 detail="Intervalo exige exatamente 4 batidas no dia (entrada, intervalo início, intervalo fim, saída)",
@@ -978,7 +1466,115 @@ def jornada_do_dia_admin(
         nome=profile.nome if profile else user.email,
         data=date,
         total_trabalhado_segundos=total_s,
-        total_trabalhado_hhmm=_fmt_hhmm(total_s),
+        total_trabalhado_hhmm=fmt_hhmm(total_s),
         segmentos=segmentos,
         alertas=alertas,
     )
+
+
+@router.get("/banco-horas", response_model=BancoHorasAdminOut)
+def banco_de_horas_admin(
+    user_id: int,
+    start: str | None = None,
+    end: str | None = None,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    user = db.get(User, user_id)
+    if not user or user.role != UserRole.employee:
+        raise HTTPException(status_code=404, detail="Funcionário não encontrado")
+    try:
+        inicio, fim = periodo_extrato(start, end)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    profile = db.query(EmployeeProfile).filter(EmployeeProfile.user_id == user.id).first()
+    nome = profile.nome if profile else user.email
+    email = user.email
+
+    ate = ultimo_dia_fechado()
+    saldo, saldo_anterior, dias = extrato_banco_horas(db, user_id, config_cache.get(db), inicio, fim)
+    return BancoHorasAdminOut(
+        user_id=user_id,
+        email=email,
+        nome=nome,
+        ate=ate.isoformat(),
+        saldo_segundos=saldo,
+        saldo_hhmm=fmt_saldo_hhmm(saldo),
+        inicio=inicio.isoformat(),
+        fim=fim.isoformat(),
+        saldo_anterior_segundos=saldo_anterior,
+        dias=dias,
+    )
+
+
+@router.get("/jornada/mes", response_model=JornadaMesOut)
+def jornada_do_mes_admin(
+    month: str,
+    user_id: int | None = None,
+    db: Session = Depends(get_db),
+    _admin: Principal = Depends(require_admin),
+):
+    m = _MONTH_RE.match(month)
+    if not m or not (1 <= int(m.group(2)) <= 12):
+        raise HTTPException(status_code=400, detail="Mês inválido. Use YYYY-MM")
+
+    first_day = datetime(int(m.group(1)), int(m.group(2)), 1)
+    next_month_first_day = (first_day + timedelta(days=32)).replace(day=1)
+    last_day = min(next_month_first_day - timedelta(days=1), datetime.now(tz=SP_TZ).replace(tzinfo=None))
+    dias_do_mes = [
+        (first_day + timedelta(days=i)).date().isoformat() for i in range((last_day - first_day).days + 1)
+    ]
+
+    employees_q = (
+        db.query(User, EmployeeProfile)
+        .outerjoin(EmployeeProfile, EmployeeProfile.user_id == User.id)
+        .filter(User.role == UserRole.employee)
+    )
+    pontos_q = (
+        db.query(Ponto)
+        .filter(Ponto.data_local >= first_day.date())
+        .filter(Ponto.data_local < next_month_first_day.date())
+    )
+    if user_id is not None:
+        employees_q = employees_q.filter(User.id == user_id)
+        pontos_q = pontos_q.filter(Ponto.user_id == user_id)
+
+    pontos_por_dia: dict[int, dict[str, list[Ponto]]] = {}
+    for p in pontos_q.order_by(Ponto.user_id, Ponto.data_local, Ponto.registrado_em).all():
+        data = p.data_local.isoformat()
+        pontos_por_dia.setdefault(p.user_id, {}).setdefault(data, []).append(p)
+
+    funcionarios: list[JornadaMesFuncionarioOut] = []
+    for user, profile in employees_q.order_by(User.id).all():
+        dias_com_ponto = pontos_por_dia.get(user.id, {})
+        if not user.is_active and not dias_com_ponto:
+            continue
+
+        dias: list[JornadaDiaOut] = []
+        total_mes = 0
+        for data in dias_do_mes:
+            total_s, segmentos, alertas = compute_jornada_from_pontos(data, dias_com_ponto.get(data, []))
+            total_mes += total_s
+            dias.append(
+                JornadaDiaOut(
+                    data=data,
+                    total_trabalhado_segundos=total_s,
+                    total_trabalhado_hhmm=fmt_hhmm(total_s),
+                    segmentos=segmentos,
+                    alertas=alertas,
+                )
+            )
+
+        funcionarios.append(
+            JornadaMesFuncionarioOut(
+                user_id=user.id,
+                email=user.email,
+                nome=profile.nome if profile else user.email,
+                total_trabalhado_segundos=total_mes,
+                total_trabalhado_hhmm=fmt_hhmm(total_mes),
+                dias=dias,
+            )
+        )
+
+    return JornadaMesOut(month=month, funcionarios=funcionarios)
@@ -1,7 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.core.security import create_access_token, verify_password
+from app.core.kdf import kdf_executor
+from app.core.security import (
+    create_access_token,
+    device_secret_needs_upgrade,
+    hash_device_secret,
+    verify_device_secret,
+    verify_password,
+)
 from app.db.deps import get_db
 from app.models import EmployeeAuthPolicy, EmployeeDevice, User, UserRole
 from app.schemas import DeviceLoginRequest, LoginRequest, Token
@@ -30,10 +37,13 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
         policy = _get_employee_policy(db, user.id)
         if not policy.allow_password_login:
             raise HTTPException(status_code=403, detail="Login por senha desabilitado para este funcionário")
-    if not verify_password(payload.password, user.password_hash):
+    user_id, role, password_hash = user.id, user.role, user.password_hash
+    # Return the connection to the pool before waiting on the KDF executor: a login burst must not exhaust it.
+    db.rollback()
+    if not kdf_executor.run(verify_password, payload.password, password_hash):
         raise HTTPException(status_code=401, detail="Credenciais inválidas")
 
-    token = create_access_token(subject=str(user.id), role=user.role.value)
+    token = create_access_token(subject=str(user_id), role=role.value)
     return Token(access_token=token)
 
 
@@ -51,8 +61,20 @@ def device_login(payload: DeviceLoginRequest, db: Session = Depends(get_db)):
     if not policy.allow_face_login:
         raise HTTPException(status_code=403, detail="Login por reconhecimento facial desabilitado para este funcionário")
 
-    if not verify_password(payload.device_secret, device.device_secret_hash):
+    # HMAC secrets verify in microseconds; only legacy pbkdf2 hashes go through the KDF executor.
+    needs_upgrade = device_secret_needs_upgrade(device.device_secret_hash)
+    if needs_upgrade:
+        secret_hash = device.device_secret_hash
+        db.rollback()
+        valid = kdf_executor.run(verify_device_secret, payload.device_secret, secret_hash)
+    else:
+        valid = verify_device_secret(payload.device_secret, device.device_secret_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Dispositivo não cadastrado")
 
+    if needs_upgrade:
+        device.device_secret_hash = hash_device_secret(payload.device_secret)
+        db.commit()
+
     token = create_access_token(subject=str(user.id), role=user.role.value)
     return Token(access_token=token)
@@ -0,0 +1,90 @@
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.config_cache import config_cache
+from app.core.kdf import kdf_executor
+from app.core.metrics import REGISTRY, format_value, render_family
+from app.core.principal_cache import principal_cache
+from app.db.session import engine
+from app.geofence import site_index_cache
+from app.punch_state import punch_state_cache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(tags=["metrics"])
+
+
+def _pool_lines() -> list[str]:
+    pool = engine.pool
+    lines: list[str] = []
+    # Only QueuePool reports all of these; other pool classes simply expose fewer gauges.
+    for attr, help_text in (
+        ("size", "Tamanho configurado do pool de conexões."),
+        ("checkedout", "Conexões em uso."),
+        ("checkedin", "Conexões ociosas no pool."),
+        ("overflow", "Conexões acima do tamanho do pool."),
+    ):
+        fn = getattr(pool, attr, None)
+        if callable(fn):
+            lines += render_family(f"pontofacil_db_pool_{attr}", "gauge", help_text, (), {(): fn()})
+    return lines
+
+
+def _kdf_lines() -> list[str]:
+    stats = kdf_executor.stats()
+    name = "pontofacil_kdf_duration_seconds"
+    lines = [f"# HELP {name} Duração das derivações de senha no executor KDF.", f"# TYPE {name} histogram"]
+    for bound, count in stats["latency_buckets"].items():
+        lines.append(f'{name}_bucket{{le="{format_value(bound)}"}} {count}')
+    lines.append(f'{name}_bucket{{le="+Inf"}} {stats["completed"]}')
+    lines.append(f"{name}_sum {format_value(stats['latency_seconds_sum'])}")
+    lines.append(f"{name}_count {stats['completed']}")
+    lines += render_family(
+        "pontofacil_kdf_wait_seconds_total", "counter", "Tempo na fila do executor KDF.", (),
+        {(): stats["wait_seconds_sum"]},
+    )
+    lines += render_family(
+        "pontofacil_kdf_rejected_total", "counter", "Derivações recusadas com 503 (fila cheia).", (),
+        {(): stats["rejected"]},
+    )
+    lines += render_family(
+        "pontofacil_kdf_in_flight", "gauge", "Derivações em execução ou na fila.", (), {(): stats["in_flight"]}
+    )
+    return lines
+
+
+def _cache_lines() -> list[str]:
+    caches = {
+        "principal": principal_cache.stats(),
+        "punch_state": punch_state_cache.stats(),
+        "config": config_cache.stats(),
+        "site_index": site_index_cache.stats(),
+    }
+    lookups: dict[tuple, float] = {}
+    for cache, stats in caches.items():
+        for result in ("hits", "misses", "revalidations", "loads", "stale"):
+            if result in stats:
+                lookups[(cache, result)] = stats[result]
+    return render_family(
+        "pontofacil_cache_lookups_total", "counter", "Consultas aos caches em memória por resultado.",
+        ("cache", "result"), lookups,
+    )
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(authorization: str | None = Header(default=None)):
+    if settings.metrics_token:
+        expected = f"Bearer {settings.metrics_token}"
+        if not authorization or not secrets.compare_digest(authorization, expected):
+            raise HTTPException(status_code=401, detail="Não autorizado")
+
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines += metric.collect()
+    lines += _pool_lines()
+    lines += _kdf_lines()
+    lines += _cache_lines()
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=CONTENT_TYPE)
@@ -1,54 +1,67 @@
-import math
-from datetime import datetime, timedelta, timezone
-from zoneinfo import ZoneInfo
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from functools import partial
 
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.api.deps import get_current_user
+from app.api.pagination import after_desc, clamp_limit, decode_cursor, encode_cursor, set_next_cursor
+from app.banco_horas import (
+    ajustar_banco_horas,
+    extrato_banco_horas,
+    fmt_saldo_hhmm,
+    periodo_extrato,
+    schedule_fechamento,
+    ultimo_dia_fechado,
+)
+from app.core.config import settings
+from app.core.config_cache import config_cache
+from app.core.metrics import punch_results
+from app.core.principal_cache import Principal
+from app.core.timeutil import (
+    SP_TZ,
+    sp_date_of,
+    sp_date_to_utc_naive_end_exclusive,
+    sp_date_to_utc_naive_start,
+    to_utc_naive,
+    utc_naive_to_sp,
+)
 from app.db.deps import get_db
-from app.models import ConfigLocal, EmployeeDevice, JornadaValidationConfig, Ponto, PontoTipo, User, UserRole
-from app.schemas import JornadaDiaOut, JornadaSegmentOut, PontoAutoCreate, PontoCreate, PontoOut
-
-
-SP_TZ = ZoneInfo("America/Sao_Paulo")
-
-
-def _utc_naive_to_sp(dt: datetime) -> datetime:
-    return dt.replace(tzinfo=timezone.utc).astimezone(SP_TZ)
-
-
-def _sp_date_to_utc_naive_start(date_str: str) -> datetime:
-    return datetime.fromisoformat(date_str).replace(tzinfo=SP_TZ).astimezone(timezone.utc).replace(tzinfo=None)
-
-
-def _sp_date_to_utc_naive_end_exclusive(date_str: str) -> datetime:
-    return (
-        (datetime.fromisoformat(date_str) + timedelta(days=1))
-        .replace(tzinfo=SP_TZ)
-        .astimezone(timezone.utc)
-        .replace(tzinfo=None)
-    )
+from app.geofence import GeofenceResult, check_geofence
+from app.idempotency import IDEMPOTENCY_KEY_HEADER, commit_with_key, find_replay, request_hash, schedule_purge
+from app.jornada import fmt_hhmm, load_jornada_dia, recompute_jornada_dia
+from app.models import EmployeeDevice, Ponto, PontoTipo, UserRole
+from app.punch_state import PunchState, load_punch_state, punch_state_cache
+from app.schemas import (
+    BancoHorasOut,
+    JornadaDiaOut,
+    PontoAutoCreate,
+    PontoBatchCreate,
+    PontoBatchItemResult,
+    PontoBatchOut,
+    PontoCreate,
+    PontoOut,
+)
 
 
 def _get_last_ponto_in_sp_day(db: Session, user_id: int, date_str: str) -> Ponto | None:
-    start_dt = _sp_date_to_utc_naive_start(date_str)
-    end_dt = _sp_date_to_utc_naive_end_exclusive(date_str)
     return (
         db.query(Ponto)
         .filter(Ponto.user_id == user_id)
-        .filter(Ponto.registrado_em >= start_dt)
-        .filter(Ponto.registrado_em < end_dt)
+        .filter(Ponto.data_local == date.fromisoformat(date_str))
         .order_by(Ponto.registrado_em.desc())
         .first()
     )
 
 
-def _strict_next_tipo_from_last(last: Ponto | None) -> str:
-    if not last:
+def _strict_next_tipo_from_last(last_tipo: str | None) -> str:
+    if not last_tipo:
         return "entrada"
 
-    last_tipo = last.tipo.value
     next_map = {
         "entrada": "intervalo_inicio",
         "intervalo_inicio": "intervalo_fim",
@@ -56,354 +69,459 @@ def _strict_next_tipo_from_last(last: Ponto | None) -> str:
     }
     return next_map.get(last_tipo, "")
 
-router = APIRouter(prefix="/pontos", tags=["pontos"])
 
+def _expected_tipo_detail(expected: str) -> str:
+    if expected == "entrada":
+        return "A próxima batida deve ser ENTRADA"
+    if expected == "intervalo_inicio":
+        return "A próxima batida deve ser INÍCIO DO INTERVALO"
+    if expected == "intervalo_fim":
+        return "A próxima batida deve ser FIM DO INTERVALO"
+    if expected == "saida":
+        return "A próxima batida deve ser SAÍDA"
+    return "Sequência de batidas inválida"
 
-def _assert_employee_device(db: Session, employee_user_id: int, device_id: str | None) -> None:
-    if not device_id:
-        raise HTTPException(status_code=401, detail="Dispositivo não identificado")
 
-    row = (
-        db.query(EmployeeDevice)
-        .filter(EmployeeDevice.employee_user_id == employee_user_id)
-        .filter(EmployeeDevice.device_id == device_id)
-        .filter(EmployeeDevice.revoked_at.is_(None))
-        .first()
+def _geofence_detail(geofence: GeofenceResult) -> str:
+    if geofence.distancia_m is None:
+        return (
+            "ADVERTÊNCIA: tentativa de registro de ponto fora do local permitido. "
+            "Nenhum local de trabalho próximo. Aproxime-se do local de trabalho e tente novamente."
+        )
+    return (
+        "ADVERTÊNCIA: tentativa de registro de ponto fora do local permitido. "
+        f"Distância aproximada: {round(geofence.distancia_m)}m. Raio permitido: {geofence.raio_m}m. "
+        "Aproxime-se do local de trabalho e tente novamente."
     )
-    if not row:
-        raise HTTPException(status_code=403, detail="Este celular não está cadastrado para este funcionário")
-
 
-def _fmt_hhmm(total_seconds: int) -> str:
-    total_seconds = max(0, int(total_seconds))
-    h = total_seconds // 3600
-    m = (total_seconds % 3600) // 60
-    return f"{h:02d}:{m:02d}"
-
-
-def _compute_jornada_from_pontos(date_str: str, pontos: list[Ponto]) -> tuple[int, list[JornadaSegmentOut], list[str]]:
-    alertas: list[str] = []
-    segmentos: list[JornadaSegmentOut] = []
-    total_trabalhado_segundos = 0
-
-    pontos_sorted = sorted(pontos, key=lambda p: p.registrado_em)
-
-    has_intervalo = any(p.tipo.value in ("intervalo_inicio", "intervalo_fim") for p in pontos_sorted)
-
-    work_start: datetime | None = None
-    break_start: datetime | None = None
-    intervalo_segundos_atual = 0
-
-    for p in pontos_sorted:
-        ts = p.registrado_em
-        tipo = p.tipo.value
-
-        if tipo == "entrada":
-            if work_start is not None:
-                alertas.append("Entrada duplicada (já havia uma entrada aberta)")
-                continue
-            if break_start is not None:
-                alertas.append("Entrada com intervalo aberto (sequência inválida)")
-                break_start = None
-            work_start = ts
-            continue
-
-        if tipo == "intervalo_inicio":
-            if work_start is None:
-                alertas.append("Início de intervalo sem entrada")
-                continue
-            if break_start is not None:
-                alertas.append("Início de intervalo duplicado (intervalo já estava aberto)")
-                continue
-            break_start = ts
-            continue
-
-        if tipo == "intervalo_fim":
-            if break_start is None:
-                alertas.append("Fim de intervalo sem início de intervalo")
-                continue
-            if ts <= break_start:
-                alertas.append("Fim de intervalo anterior ao início (horário inválido)")
-                break_start = None
-                continue
-
-            segundos = int((ts - break_start).total_seconds())
-            intervalo_segundos_atual += max(0, segundos)
-            segmentos.append(
-                JornadaSegmentOut(
-                    tipo="intervalo",
-                    inicio=_utc_naive_to_sp(break_start),
-                    fim=_utc_naive_to_sp(ts),
-                    segundos=segundos,
-                )
-            )
-            break_start = None
-            continue
+router = APIRouter(prefix="/pontos", tags=["pontos"])
 
-        if tipo == "saida":
-            if work_start is None:
-                alertas.append("Saída sem entrada")
-                continue
-            if break_start is not None:
-                alertas.append("Saída com intervalo aberto (intervalo não finalizado)")
-                break_start = None
-
-            if ts <= work_start:
-                alertas.append("Saída anterior à entrada (horário inválido)")
-                work_start = None
-                intervalo_segundos_atual = 0
-                continue
-
-            segundos_brutos = int((ts - work_start).total_seconds())
-            segundos_trabalho = max(0, segundos_brutos - intervalo_segundos_atual)
-
-            segmentos.append(
-                JornadaSegmentOut(
-                    tipo="trabalho",
-                    inicio=_utc_naive_to_sp(work_start),
-                    fim=_utc_naive_to_sp(ts),
-                    segundos=segundos_trabalho,
-                )
-            )
-            total_trabalhado_segundos += segundos_trabalho
 
-            work_start = None
-            break_start = None
-            intervalo_segundos_atual = 0
-            continue
+_SAIDA_JA_REGISTRADA = "Você já registrou a saída hoje. Se precisar corrigir, fale com o administrador."
 
-        alertas.append(f"Tipo de ponto desconhecido: {tipo}")
 
-    if break_start is not None:
-        alertas.append("Intervalo iniciado e não finalizado")
-    if work_start is not None:
-        alertas.append("Entrada registrada, mas sem saída")
+def _tipo_error(state: PunchState, tipo: str) -> HTTPException | None:
+    if state.last_tipo == "saida":
+        return HTTPException(status_code=422, detail=_SAIDA_JA_REGISTRADA)
+    expected = _strict_next_tipo_from_last(state.last_tipo)
+    if tipo != expected:
+        return HTTPException(status_code=422, detail=_expected_tipo_detail(expected))
+    return None
 
-    if not pontos_sorted:
-        alertas.append("Nenhum ponto registrado no dia")
 
-    if has_intervalo and len(pontos_sorted) != 4:
-        alertas.append("Intervalo exige exatamente 4 batidas no dia (entrada, intervalo início, intervalo fim, saída)")
+def _auto_error(state: PunchState, now_utc_naive: datetime) -> HTTPException | None:
+    if state.last_at:
+        delta_s = (now_utc_naive - state.last_at).total_seconds()
+        if delta_s >= 0 and delta_s < 15:
+            return HTTPException(status_code=409, detail="Aguarde 15 segundos antes de bater o ponto novamente")
+    if state.last_tipo == "saida":
+        return HTTPException(status_code=422, detail=_SAIDA_JA_REGISTRADA)
+    if not _strict_next_tipo_from_last(state.last_tipo):
+        return HTTPException(status_code=422, detail="Sequência de batidas inválida")
+    return None
+
+
+def _checked_punch_state(
+    db: Session,
+    user_id: int,
+    date_str: str,
+    check: Callable[[PunchState], HTTPException | None],
+    endpoint: str,
+    refresh: bool = False,
+) -> PunchState:
+    cached = None if refresh else punch_state_cache.get(user_id, date_str)
+    if cached is not None and check(cached) is None:
+        return cached
+
+    # The cache may be behind another worker's punch, so a rejection is only final once the database agrees.
+    state = load_punch_state(db, user_id, date_str)
+    if cached is not None and state != cached:
+        punch_state_cache.mark_stale(user_id, date_str)
+    punch_state_cache.put(user_id, date_str, state)
+    error = check(state)
+    if error:
+        punch_results.inc(endpoint, "cooldown" if error.status_code == 409 else "sequence")
+        raise error
+    return state
+
+
+def _write_punch(db: Session, user_id: int, date_str: str, state: PunchState, row: Ponto) -> PunchState:
+    db.add(row)
+    db.flush()
+    jornada = recompute_jornada_dia(db, user_id, date_str, known_version=state.version, check_version=True)
+    # Flushing here runs the versioned UPDATE (or the INSERT of a new day), so a stale cached state fails
+    # before anything else is written.
+    db.flush()
+    return PunchState(last_tipo=row.tipo.value, last_at=row.registrado_em, batidas=jornada.batidas, version=jornada.version)
 
-    return total_trabalhado_segundos, segmentos, alertas
 
+def _assert_employee_device(db: Session, employee_user_id: int, device_id: str | None, endpoint: str) -> None:
+    if not device_id:
+        punch_results.inc(endpoint, "device")
+        raise HTTPException(status_code=401, detail="Dispositivo não identificado")
 
-def _get_jornada_validation_config(db: Session) -> JornadaValidationConfig:
-    row = db.query(JornadaValidationConfig).filter(JornadaValidationConfig.id == 1).first()
+    row = (
+        db.query(EmployeeDevice)
+        .filter(EmployeeDevice.employee_user_id == employee_user_id)
+        .filter(EmployeeDevice.device_id == device_id)
+        .filter(EmployeeDevice.revoked_at.is_(None))
+        .first()
+    )
     if not row:
-        row = JornadaValidationConfig(id=1, intervalo_exige_4_batidas_blocking=False, updated_at=datetime.utcnow())
-        db.add(row)
-        db.commit()
-        db.refresh(row)
-    return row
+        punch_results.inc(endpoint, "device")
+        raise HTTPException(status_code=403, detail="Este celular não está cadastrado para este funcionário")
 
 
 @router.post("", response_model=PontoOut)
 def create_ponto(
     payload: PontoCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     x_device_id: str | None = Header(default=None, alias="X-Device-Id"),
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_KEY_HEADER),
 ):
     if current_user.role == UserRole.admin:
         raise HTTPException(status_code=403, detail="Administrador não registra ponto")
 
-    _assert_employee_device(db, current_user.id, x_device_id)
+    _assert_employee_device(db, current_user.id, x_device_id, "pontos")
+
+    fingerprint = request_hash("POST /pontos", payload)
+    replay = find_replay(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        punch_results.inc("pontos", "replayed")
+        return replay
 
     now_sp = datetime.now(tz=SP_TZ)
     date_str = now_sp.date().isoformat()
-    last = _get_last_ponto_in_sp_day(db, current_user.id, date_str)
-
-    if last and last.tipo.value == "saida":
-        raise HTTPException(
-            status_code=422,
-            detail="Você já registrou a saída hoje. Se precisar corrigir, fale com o administrador.",
+    check = partial(_tipo_error, tipo=payload.tipo)
+    state = _checked_punch_state(db, current_user.id, date_str, check, "pontos")
+
+    geofence = check_geofence(db, current_user.id, payload.lat, payload.lng)
+    if not geofence.allowed:
+        punch_results.inc("pontos", "geofence")
+        raise HTTPException(status_code=403, detail=_geofence_detail(geofence))
+
+    for attempt in range(2):
+        row = Ponto(
+            user_id=current_user.id,
+            tipo=PontoTipo(payload.tipo),
+            registrado_em=to_utc_naive(now_sp),
+            lat=payload.lat,
+            lng=payload.lng,
+            accuracy_m=payload.accuracy_m,
+            distancia_m=geofence.distancia_m,
+            local_id=geofence.local_id,
         )
-
-    expected = _strict_next_tipo_from_last(last)
-    if payload.tipo != expected:
-        if expected == "entrada":
-            raise HTTPException(status_code=422, detail="A próxima batida deve ser ENTRADA")
-        if expected == "intervalo_inicio":
-            raise HTTPException(status_code=422, detail="A próxima batida deve ser INÍCIO DO INTERVALO")
-        if expected == "intervalo_fim":
-            raise HTTPException(status_code=422, detail="A próxima batida deve ser FIM DO INTERVALO")
-        if expected == "saida":
-            raise HTTPException(status_code=422, detail="A próxima batida deve ser SAÍDA")
-        raise HTTPException(status_code=422, detail="Sequência de batidas inválida")
-
-    config = db.query(ConfigLocal).filter(ConfigLocal.id == 1).first()
-    distancia_m = None
-    if config:
-        distancia_m = _haversine_distance_m(payload.lat, payload.lng, config.local_lat, config.local_lng)
-        if distancia_m > config.raio_m:
-            raise HTTPException(
-                status_code=403,
-                detail=(
-                    "ADVERTÊNCIA: tentativa de registro de ponto fora do local permitido. "
-                    f"Distância aproximada: {round(distancia_m)}m. Raio permitido: {config.raio_m}m. "
-                    "Aproxime-se do local de trabalho e tente novamente."
-                ),
-            )
-
-    row = Ponto(
-        user_id=current_user.id,
-        tipo=PontoTipo(payload.tipo),
-        lat=payload.lat,
-        lng=payload.lng,
-        accuracy_m=payload.accuracy_m,
-        distancia_m=distancia_m,
-    )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-
-    return PontoOut(
+        try:
+            new_state = _write_punch(db, current_user.id, date_str, state, row)
+            break
+        except (StaleDataError, IntegrityError):
+            # Another worker punched this day after the state was cached: check again against the database.
+            db.rollback()
+            punch_state_cache.mark_stale(current_user.id, date_str)
+            if attempt:
+                raise
+            state = _checked_punch_state(db, current_user.id, date_str, check, "pontos", refresh=True)
+
+    out = PontoOut(
         id=row.id,
         tipo=row.tipo.value,
-        registrado_em=_utc_naive_to_sp(row.registrado_em),
+        registrado_em=utc_naive_to_sp(row.registrado_em),
         lat=row.lat,
         lng=row.lng,
         accuracy_m=row.accuracy_m,
         distancia_m=row.distancia_m,
+        local_id=row.local_id,
     )
+    replay = commit_with_key(db, current_user.id, idempotency_key, fingerprint, out.model_dump_json())
+    if replay:
+        punch_results.inc("pontos", "replayed")
+        punch_state_cache.invalidate(current_user.id, date_str)
+        return replay
+    punch_results.inc("pontos", "accepted")
+    punch_state_cache.put(current_user.id, date_str, new_state)
+    # First punch of the day: the days before it are over, so write them to the hours bank ledger.
+    if new_state.batidas == 1:
+        schedule_fechamento(background_tasks, current_user.id)
+    if idempotency_key:
+        schedule_purge(background_tasks)
+    return out
 
 
 @router.post("/auto", response_model=PontoOut)
 def create_ponto_auto(
     payload: PontoAutoCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     x_device_id: str | None = Header(default=None, alias="X-Device-Id"),
+    idempotency_key: str | None = Header(default=None, alias=IDEMPOTENCY_KEY_HEADER),
 ):
     if current_user.role == UserRole.admin:
         raise HTTPException(status_code=403, detail="Administrador não registra ponto")
 
-    _assert_employee_device(db, current_user.id, x_device_id)
+    _assert_employee_device(db, current_user.id, x_device_id, "auto")
+
+    fingerprint = request_hash("POST /pontos/auto", payload)
+    replay = find_replay(db, current_user.id, idempotency_key, fingerprint)
+    if replay:
+        punch_results.inc("auto", "replayed")
+        return replay
 
     now_sp = datetime.now(tz=SP_TZ)
     date_str = now_sp.date().isoformat()
-    last = _get_last_ponto_in_sp_day(db, current_user.id, date_str)
-
-    if last:
-        now_utc_naive = datetime.utcnow()
-        delta_s = (now_utc_naive - last.registrado_em).total_seconds()
-        if delta_s >= 0 and delta_s < 15:
-            raise HTTPException(status_code=409, detail="Aguarde 15 segundos antes de bater o ponto novamente")
-
-    if last and last.tipo.value == "saida":
-        raise HTTPException(
-            status_code=422,
-            detail="Você já registrou a saída hoje. Se precisar corrigir, fale com o administrador.",
+    now_utc_naive = to_utc_naive(now_sp)
+    # Only a stored key was answered by the replay above. A new key still gets the cooldown: the app makes one
+    # per tap, so a double tap must not turn into the next tipo.
+    check = partial(_auto_error, now_utc_naive=now_utc_naive)
+    state = _checked_punch_state(db, current_user.id, date_str, check, "auto")
+
+    geofence = check_geofence(db, current_user.id, payload.lat, payload.lng)
+    if not geofence.allowed:
+        punch_results.inc("auto", "geofence")
+        raise HTTPException(status_code=403, detail=_geofence_detail(geofence))
+
+    for attempt in range(2):
+        row = Ponto(
+            user_id=current_user.id,
+            tipo=PontoTipo(_strict_next_tipo_from_last(state.last_tipo)),
+            registrado_em=now_utc_naive,
+            lat=payload.lat,
+            lng=payload.lng,
+            accuracy_m=payload.accuracy_m,
+            distancia_m=geofence.distancia_m,
+            local_id=geofence.local_id,
         )
-
-    next_tipo = _strict_next_tipo_from_last(last)
-    if not next_tipo:
-        raise HTTPException(status_code=422, detail="Sequência de batidas inválida")
-
-    config = db.query(ConfigLocal).filter(ConfigLocal.id == 1).first()
-    distancia_m = None
-    if config:
-        distancia_m = _haversine_distance_m(payload.lat, payload.lng, config.local_lat, config.local_lng)
-        if distancia_m > config.raio_m:
-            raise HTTPException(
-                status_code=403,
-                detail=(
-                    "ADVERTÊNCIA: tentativa de registro de ponto fora do local permitido. "
-                    f"Distância aproximada: {round(distancia_m)}m. Raio permitido: {config.raio_m}m. "
-                    "Aproxime-se do local de trabalho e tente novamente."
-                ),
-            )
-
-    row = Ponto(
-        user_id=current_user.id,
-        tipo=PontoTipo(next_tipo),
-        lat=payload.lat,
-        lng=payload.lng,
-        accuracy_m=payload.accuracy_m,
-        distancia_m=distancia_m,
-    )
-    db.add(row)
-    db.commit()
-    db.refresh(row)
-
-    return PontoOut(
+        try:
+            new_state = _write_punch(db, current_user.id, date_str, state, row)
+            break
+        except (StaleDataError, IntegrityError):
+            db.rollback()
+            punch_state_cache.mark_stale(current_user.id, date_str)
+            if attempt:
+                raise
+            state = _checked_punch_state(db, current_user.id, date_str, check, "auto", refresh=True)
+
+    out = PontoOut(
         id=row.id,
         tipo=row.tipo.value,
-        registrado_em=_utc_naive_to_sp(row.registrado_em),
+        registrado_em=utc_naive_to_sp(row.registrado_em),
         lat=row.lat,
         lng=row.lng,
         accuracy_m=row.accuracy_m,
         distancia_m=row.distancia_m,
+        local_id=row.local_id,
     )
+    replay = commit_with_key(db, current_user.id, idempotency_key, fingerprint, out.model_dump_json())
+    if replay:
+        punch_results.inc("auto", "replayed")
+        punch_state_cache.invalidate(current_user.id, date_str)
+        return replay
+    punch_results.inc("auto", "accepted")
+    punch_state_cache.put(current_user.id, date_str, new_state)
+    if new_state.batidas == 1:
+        schedule_fechamento(background_tasks, current_user.id)
+    if idempotency_key:
+        schedule_purge(background_tasks)
+    return out
+
+
+@router.post("/batch", response_model=PontoBatchOut)
+def create_pontos_batch(
+    payload: PontoBatchCreate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    x_device_id: str | None = Header(default=None, alias="X-Device-Id"),
+):
+    if current_user.role == UserRole.admin:
+        raise HTTPException(status_code=403, detail="Administrador não registra ponto")
+
+    _assert_employee_device(db, current_user.id, x_device_id, "batch")
+
+    now_utc_naive = datetime.utcnow()
+    min_dt = now_utc_naive - timedelta(hours=settings.ponto_batch_max_age_hours)
+    max_dt = now_utc_naive + timedelta(minutes=5)
+
+    # Last ponto per SP day, updated as items of this batch are accepted.
+    last_by_day: dict[str, Ponto | None] = {}
+    results: list[PontoBatchItemResult] = []
+    accepted: list[tuple[int, Ponto]] = []
+
+    for index, item in enumerate(payload.items):
+        registrado_sp = item.registrado_em
+        if registrado_sp.tzinfo is None:
+            registrado_sp = registrado_sp.replace(tzinfo=SP_TZ)
+        registrado_utc = to_utc_naive(registrado_sp)
+
+        if registrado_utc < min_dt or registrado_utc > max_dt:
+            punch_results.inc("batch", "window")
+            results.append(
+                PontoBatchItemResult(index=index, ok=False, status_code=422, detail="Horário da batida fora do permitido")
+            )
+            continue
+
+        date_str = registrado_sp.astimezone(SP_TZ).date().isoformat()
+        if date_str not in last_by_day:
+            last_by_day[date_str] = _get_last_ponto_in_sp_day(db, current_user.id, date_str)
+        last = last_by_day[date_str]
+
+        if last and registrado_utc <= last.registrado_em:
+            punch_results.inc("batch", "sequence")
+            results.append(
+                PontoBatchItemResult(
+                    index=index, ok=False, status_code=422, detail="Horário anterior à última batida registrada"
+                )
+            )
+            continue
+
+        if last and item.tipo is None and (registrado_utc - last.registrado_em).total_seconds() < 15:
+            punch_results.inc("batch", "cooldown")
+            results.append(
+                PontoBatchItemResult(
+                    index=index,
+                    ok=False,
+                    status_code=409,
+                    detail="Aguarde 15 segundos antes de bater o ponto novamente",
+                )
+            )
+            continue
 
+        if last and last.tipo.value == "saida":
+            punch_results.inc("batch", "sequence")
+            results.append(
+                PontoBatchItemResult(
+                    index=index,
+                    ok=False,
+                    status_code=422,
+                    detail=_SAIDA_JA_REGISTRADA,
+                )
+            )
+            continue
 
-def _haversine_distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
-    r = 6371000.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lng2 - lng1)
+        expected = _strict_next_tipo_from_last(last.tipo.value if last else None)
+        tipo = item.tipo if item.tipo is not None else expected
+        if not expected or tipo != expected:
+            punch_results.inc("batch", "sequence")
+            results.append(
+                PontoBatchItemResult(index=index, ok=False, status_code=422, detail=_expected_tipo_detail(expected))
+            )
+            continue
 
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    return 2 * r * math.asin(math.sqrt(a))
+        geofence = check_geofence(db, current_user.id, item.lat, item.lng)
+        if not geofence.allowed:
+            punch_results.inc("batch", "geofence")
+            results.append(
+                PontoBatchItemResult(index=index, ok=False, status_code=403, detail=_geofence_detail(geofence))
+            )
+            continue
+
+        row = Ponto(
+            user_id=current_user.id,
+            tipo=PontoTipo(tipo),
+            registrado_em=registrado_utc,
+            lat=item.lat,
+            lng=item.lng,
+            accuracy_m=item.accuracy_m,
+            distancia_m=geofence.distancia_m,
+            local_id=geofence.local_id,
+        )
+        db.add(row)
+        last_by_day[date_str] = row
+        accepted.append((index, row))
+        results.append(PontoBatchItemResult(index=index, ok=True, status_code=200))
+
+    db.flush()
+    accepted_dates = sorted({sp_date_of(row.registrado_em) for _, row in accepted})
+    for date_str in accepted_dates:
+        jornada = recompute_jornada_dia(db, current_user.id, date_str)
+        # Offline punches can land on days the hours bank already closed.
+        ajustar_banco_horas(db, current_user.id, date_str, jornada.total_trabalhado_segundos if jornada else 0)
+    for index, row in accepted:
+        results[index].ponto = PontoOut(
+            id=row.id,
+            tipo=row.tipo.value,
+            registrado_em=utc_naive_to_sp(row.registrado_em),
+            lat=row.lat,
+            lng=row.lng,
+            accuracy_m=row.accuracy_m,
+            distancia_m=row.distancia_m,
+            local_id=row.local_id,
+        )
+    db.commit()
+    for date_str in accepted_dates:
+        punch_state_cache.invalidate(current_user.id, date_str)
+    if accepted:
+        punch_results.inc("batch", "accepted", amount=len(accepted))
+
+    return PontoBatchOut(accepted=len(accepted), rejected=len(results) - len(accepted), results=results)
 
 
 @router.get("/me", response_model=list[PontoOut])
 def list_my_pontos(
     start: str | None = None,
     end: str | None = None,
+    limit: int = 200,
+    cursor: str | None = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
-    q = db.query(Ponto).filter(Ponto.user_id == current_user.id)
+    # Columns instead of entities and orjson instead of PontoOut: the rows already have the response's types,
+    # so building and re-validating a model per row was most of the time spent on a 500-row page.
+    q = db.query(
+        Ponto.id,
+        Ponto.tipo,
+        Ponto.registrado_em,
+        Ponto.lat,
+        Ponto.lng,
+        Ponto.accuracy_m,
+        Ponto.distancia_m,
+        Ponto.local_id,
+    ).filter(Ponto.user_id == current_user.id)
 
     if start:
-        q = q.filter(Ponto.registrado_em >= _sp_date_to_utc_naive_start(start))
+        q = q.filter(Ponto.registrado_em >= sp_date_to_utc_naive_start(start))
     if end:
-        q = q.filter(Ponto.registrado_em < _sp_date_to_utc_naive_end_exclusive(end))
-
-    rows = q.order_by(Ponto.registrado_em.desc()).limit(200).all()
-
-    return [
-        PontoOut(
-            id=r.id,
-            tipo=r.tipo.value,
-            registrado_em=_utc_naive_to_sp(r.registrado_em),
-            lat=r.lat,
-            lng=r.lng,
-            accuracy_m=r.accuracy_m,
-            distancia_m=r.distancia_m,
-        )
-        for r in rows
-    ]
+        q = q.filter(Ponto.registrado_em < sp_date_to_utc_naive_end_exclusive(end))
+    if cursor:
+        q = q.filter(after_desc([Ponto.registrado_em, Ponto.id], decode_cursor(cursor, datetime, int)))
+
+    limit = clamp_limit(limit)
+    rows = q.order_by(Ponto.registrado_em.desc(), Ponto.id.desc()).limit(limit).all()
+
+    response = ORJSONResponse(
+        [
+            {
+                "id": id_,
+                "tipo": tipo,
+                "registrado_em": utc_naive_to_sp(registrado_em),
+                "lat": lat,
+                "lng": lng,
+                "accuracy_m": accuracy_m,
+                "distancia_m": distancia_m,
+                "local_id": local_id,
+            }
+            for id_, tipo, registrado_em, lat, lng, accuracy_m, distancia_m, local_id in rows
+        ]
+    )
+    if len(rows) == limit:
+        set_next_cursor(response, encode_cursor(rows[-1].registrado_em, rows[-1].id))
+    return response
 
 
 @router.get("/jornada", response_model=JornadaDiaOut)
 def jornada_do_dia(
     date: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ):
     if current_user.role == UserRole.admin:
         raise HTTPException(status_code=403, detail="Administrador não possui jornada")
 
-    start_dt = _sp_date_to_utc_naive_start(date)
-    end_dt = _sp_date_to_utc_naive_end_exclusive(date)
-    pontos = (
-        db.query(Ponto)
-        .filter(Ponto.user_id == current_user.id)
-        .filter(Ponto.registrado_em >= start_dt)
-        .filter(Ponto.registrado_em < end_dt)
-        .all()
-    )
+    total_s, segmentos, alertas, batidas, has_intervalo = load_jornada_dia(db, current_user.id, date)
 
-    total_s, segmentos, alertas = _compute_jornada_from_pontos(date, pontos)
-
-    cfg = _get_jornada_validation_config(db)
-    if bool(cfg.intervalo_exige_4_batidas_blocking):
-        has_intervalo = any(p.tipo.value in ("intervalo_inicio", "intervalo_fim") for p in pontos)
-        if has_intervalo and len(pontos) != 4:
+    if config_cache.get(db).intervalo_exige_4_batidas_blocking:
+        if has_intervalo and batidas != 4:
             raise HTTPException(
                 status_code=422,
                 detail="Intervalo exige exatamente 4 batidas no dia (entrada, intervalo início, intervalo fim, saída)",
@@ -412,7 +530,34 @@ def jornada_do_dia(
     return JornadaDiaOut(
         data=date,
         total_trabalhado_segundos=total_s,
-        total_trabalhado_hhmm=_fmt_hhmm(total_s),
+        total_trabalhado_hhmm=fmt_hhmm(total_s),
         segmentos=segmentos,
         alertas=alertas,
     )
+
+
+@router.get("/banco-horas", response_model=BancoHorasOut)
+def banco_de_horas(
+    start: str | None = None,
+    end: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+):
+    if current_user.role == UserRole.admin:
+        raise HTTPException(status_code=403, detail="Administrador não possui banco de horas")
+    try:
+        inicio, fim = periodo_extrato(start, end)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    ate = ultimo_dia_fechado()
+    saldo, saldo_anterior, dias = extrato_banco_horas(db, current_user.id, config_cache.get(db), inicio, fim)
+    return BancoHorasOut(
+        ate=ate.isoformat(),
+        saldo_segundos=saldo,
+        saldo_hhmm=fmt_saldo_hhmm(saldo),
+        inicio=inicio.isoformat(),
+        fim=fim.isoformat(),
+        saldo_anterior_segundos=saldo_anterior,
+        dias=dias,
+    )
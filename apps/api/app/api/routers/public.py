@@ -1,80 +1,117 @@
-from datetime import datetime, timezone
-from zoneinfo import ZoneInfo
+from datetime import datetime
 
 import secrets
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
-from app.core.security import hash_password, verify_password
+from app.core.config_cache import config_cache
+from app.core.principal_cache import Principal
+from app.core.kdf import kdf_executor
+from app.core.security import hash_device_secret, pairing_code_lookup_id, verify_password
+from app.core.timeutil import utc_naive_to_sp
 from app.db.deps import get_db
-from app.models import ConfigLocal, DevicePairingCode, EmployeeDevice, User, UserRole
+from app.models import DevicePairingCode, EmployeeDevice, User, UserRole
 from app.schemas import ConfigLocalOut, PairDeviceRequest, PairDeviceResponse, UserMe
 
-
-SP_TZ = ZoneInfo("America/Sao_Paulo")
-
-
-def _utc_naive_to_sp(dt: datetime) -> datetime:
-    return dt.replace(tzinfo=timezone.utc).astimezone(SP_TZ)
-
 router = APIRouter(tags=["public"])
 
 
 @router.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
 
 @router.get("/config-local", response_model=ConfigLocalOut | None)
 def get_config_local(db: Session = Depends(get_db)):
-    row = db.query(ConfigLocal).filter(ConfigLocal.id == 1).first()
+    row = config_cache.get(db).local
     if not row:
         return None
     return ConfigLocalOut(
         local_lat=row.local_lat,
         local_lng=row.local_lng,
         raio_m=row.raio_m,
-        updated_at=_utc_naive_to_sp(row.updated_at),
+        updated_at=utc_naive_to_sp(row.updated_at),
     )
 
 
 @router.get("/me", response_model=UserMe)
-def me(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def me(db: Session = Depends(get_db), current_user: Principal = Depends(get_current_user)):
     nome: str | None = None
     genero: str | None = None
-    if current_user.role == UserRole.employee and current_user.employee_profile:
-        nome = current_user.employee_profile.nome
-        genero = current_user.employee_profile.genero
+    if current_user.role == UserRole.employee:
+        nome = current_user.nome
+        genero = current_user.genero
     return UserMe(id=current_user.id, email=current_user.email, role=current_user.role.value, nome=nome, genero=genero)
 
 
+def _first_matching_hash(code: str, code_hashes: list[str]) -> int | None:
+    for index, code_hash in enumerate(code_hashes):
+        if verify_password(code, code_hash):
+            return index
+    return None
+
+
 @router.post("/pair-device", response_model=PairDeviceResponse)
 def pair_device(payload: PairDeviceRequest, db: Session = Depends(get_db)):
     now = datetime.utcnow()
 
-    # Since we store only a hash, we need to find candidates not expired and verify.
-    candidates = (
-        db.query(DevicePairingCode)
+    # Keyed lookup: one indexed query and at most one hash verification.
+    matched: tuple[int, int] | None = None
+    candidate = (
+        db.query(DevicePairingCode.id, DevicePairingCode.employee_user_id, DevicePairingCode.code_hash)
+        .filter(DevicePairingCode.code_lookup == pairing_code_lookup_id(payload.code))
         .filter(DevicePairingCode.expires_at > now)
         .filter(DevicePairingCode.consumed_at.is_(None))
-        .order_by(DevicePairingCode.id.desc())
-        .limit(50)
-        .all()
+        .first()
     )
+    if candidate:
+        # Nothing written yet: release the connection while the KDF executor runs.
+        db.rollback()
+        if kdf_executor.run(verify_password, payload.code, candidate.code_hash):
+            matched = (candidate.id, candidate.employee_user_id)
 
-    matched: DevicePairingCode | None = None
-    for c in candidates:
-        if verify_password(payload.code, c.code_hash):
-            matched = c
-            break
+    if not matched:
+        # Codes generated before code_lookup existed have no lookup id; scan those until they expire.
+        legacy_candidates = (
+            db.query(DevicePairingCode.id, DevicePairingCode.employee_user_id, DevicePairingCode.code_hash)
+            .filter(DevicePairingCode.code_lookup.is_(None))
+            .filter(DevicePairingCode.expires_at > now)
+            .filter(DevicePairingCode.consumed_at.is_(None))
+            .order_by(DevicePairingCode.id.desc())
+            .limit(50)
+            .all()
+        )
+        if legacy_candidates:
+            db.rollback()
+            index = kdf_executor.run(_first_matching_hash, payload.code, [c.code_hash for c in legacy_candidates])
+            if index is not None:
+                matched = (legacy_candidates[index].id, legacy_candidates[index].employee_user_id)
 
     if not matched:
         raise HTTPException(status_code=404, detail="QR code inválido ou expirado")
+    code_id, employee_user_id = matched
+
+    # The code was read before the verification released the connection: consume it only if it is still unused and
+    # unexpired, so two devices racing on the same code cannot both pair.
+    consumed = db.execute(
+        update(DevicePairingCode)
+        .where(
+            DevicePairingCode.id == code_id,
+            DevicePairingCode.consumed_at.is_(None),
+            DevicePairingCode.expires_at > now,
+        )
+        .values(consumed_at=now, consumed_by_device_id=payload.device_id)
+    )
+    if consumed.rowcount != 1:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="QR code inválido ou expirado")
 
-    employee = db.get(User, matched.employee_user_id)
+    employee = db.get(User, employee_user_id)
     if not employee or employee.role != UserRole.employee or not employee.is_active:
+        db.rollback()
         raise HTTPException(status_code=404, detail="Funcionário não encontrado")
 
     # Enforce 1 active device per employee: revoke any previous.
@@ -93,13 +130,9 @@ def pair_device(payload: PairDeviceRequest, db: Session = Depends(get_db)):
         employee_user_id=employee.id,
         device_id=payload.device_id,
         device_name=payload.device_name,
-        device_secret_hash=hash_password(device_secret),
+        device_secret_hash=hash_device_secret(device_secret),
     )
     db.add(row)
-
-    matched.consumed_at = now
-    matched.consumed_by_device_id = payload.device_id
-
     db.commit()
 
     return PairDeviceResponse(device_secret=device_secret, employee_user_id=employee.id)
@@ -0,0 +1,59 @@
+from sqlalchemy import Integer, column, func, text
+from sqlalchemy.orm import Session
+
+from app.models import PontoAdminAudit
+
+FTS_TABLE = "ponto_admin_audit_fts"
+PG_TRGM_INDEX = "ix_ponto_admin_audit_motivo_trgm"
+# Trigram indexes cannot answer shorter terms.
+_MIN_INDEXED_TERM = 3
+# Above this many matches the id list costs more than scanning created_at until one page is filled.
+_FTS_MAX_ID_LIST = 20_000
+
+_backend: str | None = None
+
+
+def _detect_backend(db: Session) -> str:
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        sql = db.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).scalar()
+        # Without remove_diacritics (SQLite < 3.45) the index would be accent-sensitive; LIKE below is not.
+        return "fts5" if sql and "remove_diacritics" in sql else "like"
+    if dialect == "postgresql":
+        found = db.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": PG_TRGM_INDEX}).first()
+        return "trigram" if found else "like"
+    return "like"
+
+
+def search_backend(db: Session) -> str:
+    global _backend
+    if _backend is None:
+        _backend = _detect_backend(db)
+    return _backend
+
+
+def _like_pattern(termo: str) -> str:
+    escaped = termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def motivo_contains_clause(db: Session, termo: str):
+    backend = search_backend(db)
+    if backend == "fts5" and len(termo) >= _MIN_INDEXED_TERM:
+        # A quoted phrase on a trigram FTS5 table is a case-insensitive substring match.
+        match = '"' + termo.replace('"', '""') + '"'
+        hits = db.execute(
+            text(f"SELECT COUNT(*) FROM (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match LIMIT :cap)"),
+            {"match": match, "cap": _FTS_MAX_ID_LIST},
+        ).scalar()
+        if hits < _FTS_MAX_ID_LIST:
+            matches = text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :motivo_match").bindparams(
+                motivo_match=match
+            )
+            return PontoAdminAudit.id.in_(matches.columns(column("rowid", Integer)))
+    if db.get_bind().dialect.name in ("sqlite", "postgresql"):
+        # Folded like the indexes: "sao" and "são" find the same rows on every path, short terms included.
+        return func.f_unaccent(PontoAdminAudit.motivo).ilike(func.f_unaccent(_like_pattern(termo)), escape="\\")
+    return PontoAdminAudit.motivo.ilike(_like_pattern(termo), escape="\\")
@@ -0,0 +1,312 @@
+import logging
+from datetime import date, datetime, timedelta
+
+from fastapi import BackgroundTasks
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config_cache import ConfigSnapshot, config_cache
+from app.core.timeutil import SP_TZ
+from app.db.session import SessionLocal
+from app.jornada import compute_jornada_from_pontos
+from app.models import BancoHorasDia, BancoHorasSaldo, JornadaDia, Ponto, User, UserRole, ponto_data_local
+from app.schemas import BancoHorasDiaOut
+
+logger = logging.getLogger(__name__)
+
+EXTRATO_PADRAO_DIAS = 31
+EXTRATO_MAX_DIAS = 366
+# Longest tail a read computes on the fly; a longer one is written to the ledger first.
+PENDENTES_MAX_DIAS = 7
+
+
+def ultimo_dia_fechado() -> date:
+    """Yesterday in São Paulo: the current day only enters the bank once it is over."""
+    return datetime.now(tz=SP_TZ).date() - timedelta(days=1)
+
+
+def periodo_extrato(start: str | None, end: str | None) -> tuple[date, date]:
+    """Statement period; defaults to the last 31 closed days and never goes past the last closed day."""
+    try:
+        fim = date.fromisoformat(end) if end else ultimo_dia_fechado()
+        inicio = date.fromisoformat(start) if start else fim - timedelta(days=EXTRATO_PADRAO_DIAS - 1)
+    except ValueError:
+        raise ValueError("Data inválida. Use YYYY-MM-DD")
+    if end and inicio > fim:
+        raise ValueError("Período inválido: início depois do fim")
+    if (fim - inicio).days >= EXTRATO_MAX_DIAS:
+        raise ValueError(f"Período máximo do extrato: {EXTRATO_MAX_DIAS} dias")
+    return inicio, min(fim, ultimo_dia_fechado())
+
+
+def esperado_segundos(cfg: ConfigSnapshot, dia: date) -> int:
+    return cfg.carga_diaria_minutos * 60 if dia.weekday() in cfg.dias_semana else 0
+
+
+def fmt_saldo_hhmm(total_seconds: int) -> str:
+    sinal = "-" if total_seconds < 0 else ""
+    total_seconds = abs(int(total_seconds))
+    return f"{sinal}{total_seconds // 3600:02d}:{(total_seconds % 3600) // 60:02d}"
+
+
+def saldo_ate(db: Session, user_id: int, ate: date) -> int:
+    """Balance through `ate` (inclusive): the last checkpoint on or before it plus the ledger days after it."""
+    checkpoint = db.execute(
+        select(BancoHorasSaldo.ate_data, BancoHorasSaldo.saldo_segundos)
+        .where(BancoHorasSaldo.user_id == user_id, BancoHorasSaldo.ate_data <= ate)
+        .order_by(BancoHorasSaldo.ate_data.desc())
+        .limit(1)
+    ).first()
+    tail = select(func.coalesce(func.sum(BancoHorasDia.saldo_segundos), 0)).where(
+        BancoHorasDia.user_id == user_id, BancoHorasDia.data_local <= ate
+    )
+    if checkpoint is None:
+        return int(db.execute(tail).scalar_one())
+    tail = tail.where(BancoHorasDia.data_local > checkpoint.ate_data)
+    return checkpoint.saldo_segundos + int(db.execute(tail).scalar_one())
+
+
+def _trabalhado_por_dia(db: Session, user_id: int, inicio: date, ate: date) -> dict[date, int]:
+    trabalhado = dict(
+        db.execute(
+            select(JornadaDia.data_local, JornadaDia.total_trabalhado_segundos).where(
+                JornadaDia.user_id == user_id, JornadaDia.data_local >= inicio, JornadaDia.data_local <= ate
+            )
+        ).all()
+    )
+    # jornada_dia not rebuilt yet (e.g. a database upgraded without rebuild-jornada): compute those days from the pontos.
+    sem_jornada = (
+        select(Ponto)
+        .where(Ponto.user_id == user_id, Ponto.data_local >= inicio, Ponto.data_local <= ate)
+        .where(
+            ~select(JornadaDia.data_local)
+            .where(JornadaDia.user_id == Ponto.user_id, JornadaDia.data_local == Ponto.data_local)
+            .exists()
+        )
+        .order_by(Ponto.registrado_em)
+    )
+    pontos_por_dia: dict[date, list[Ponto]] = {}
+    for p in db.execute(sem_jornada).scalars():
+        pontos_por_dia.setdefault(p.data_local, []).append(p)
+    for dia, pontos in pontos_por_dia.items():
+        trabalhado[dia] = compute_jornada_from_pontos(dia.isoformat(), pontos)[0]
+    return trabalhado
+
+
+def _calcular_dias(db: Session, user_id: int, cfg: ConfigSnapshot, inicio: date, ate: date) -> list[dict]:
+    trabalhado = _trabalhado_por_dia(db, user_id, inicio, ate)
+    dias: list[dict] = []
+    dia = inicio
+    while dia <= ate:
+        trabalhado_s = trabalhado.get(dia, 0)
+        esperado_s = esperado_segundos(cfg, dia)
+        dias.append(
+            {
+                "user_id": user_id,
+                "data_local": dia,
+                "trabalhado_segundos": trabalhado_s,
+                "esperado_segundos": esperado_s,
+                "saldo_segundos": trabalhado_s - esperado_s,
+            }
+        )
+        dia += timedelta(days=1)
+    return dias
+
+
+def _checkpoints(user_id: int, dias: list[dict], saldo: int) -> list[dict]:
+    """Month-end checkpoint rows for consecutive `dias`, starting from the balance before the first of them."""
+    checkpoints: list[dict] = []
+    for d in dias:
+        saldo += d["saldo_segundos"]
+        if (d["data_local"] + timedelta(days=1)).day == 1:
+            checkpoints.append({"user_id": user_id, "ate_data": d["data_local"], "saldo_segundos": saldo})
+    return checkpoints
+
+
+def _ultimo_no_livro(db: Session, user_id: int) -> date | None:
+    return db.execute(select(func.max(BancoHorasDia.data_local)).where(BancoHorasDia.user_id == user_id)).scalar()
+
+
+def _primeiro_pendente(db: Session, user_id: int, ultimo: date | None) -> date | None:
+    if ultimo is not None:
+        return ultimo + timedelta(days=1)
+    # The bank starts on the employee's first ponto, not on the account's creation.
+    return db.execute(select(func.min(Ponto.data_local)).where(Ponto.user_id == user_id)).scalar()
+
+
+def _ultimo_dia_do_banco(db: Session, user_id: int, ate: date) -> date:
+    """`ate`, or the last day of a deactivated employee: no hours are expected after they leave."""
+    desativado_em = db.execute(select(User.deactivated_at).where(User.id == user_id)).scalar()
+    if desativado_em is None:
+        return ate
+    dia = ponto_data_local(desativado_em)
+    # The deactivation day only counts if the employee punched on it.
+    trabalhou = db.execute(
+        select(Ponto.id).where(Ponto.user_id == user_id, Ponto.data_local == dia).limit(1)
+    ).first()
+    return min(ate, dia if trabalhou else dia - timedelta(days=1))
+
+
+def dias_pendentes(db: Session, user_id: int, cfg: ConfigSnapshot, ate: date) -> list[dict]:
+    """Days after the ledger up to `ate`, computed without writing them (with the current workload).
+
+    A tail longer than `PENDENTES_MAX_DIAS` (no punches and no daily job for a while) is closed first, so a read never
+    recomputes more than a week and the next ones find it in the ledger.
+    """
+    ate = _ultimo_dia_do_banco(db, user_id, ate)
+    inicio = _primeiro_pendente(db, user_id, _ultimo_no_livro(db, user_id))
+    if inicio is None or inicio > ate:
+        return []
+    if (ate - inicio).days >= PENDENTES_MAX_DIAS:
+        fechar_banco_horas(db, user_id, cfg, ate)
+        return []
+    return _calcular_dias(db, user_id, cfg, inicio, ate)
+
+
+def fechar_banco_horas(db: Session, user_id: int, cfg: ConfigSnapshot, ate: date | None = None) -> int:
+    """Write the ledger days (and month-end checkpoints) missing up to `ate`; commits, returns the days written."""
+    ate = _ultimo_dia_do_banco(db, user_id, ate or ultimo_dia_fechado())
+    ultimo = _ultimo_no_livro(db, user_id)
+    inicio = _primeiro_pendente(db, user_id, ultimo)
+    if inicio is None or inicio > ate:
+        return 0
+
+    dias = _calcular_dias(db, user_id, cfg, inicio, ate)
+    checkpoints = _checkpoints(user_id, dias, saldo_ate(db, user_id, ultimo) if ultimo is not None else 0)
+    try:
+        db.execute(insert(BancoHorasDia), dias)
+        if checkpoints:
+            db.execute(insert(BancoHorasSaldo), checkpoints)
+        db.commit()
+    except IntegrityError:
+        # Another worker closed the same days first; its rows came from the same jornada_dia.
+        db.rollback()
+        return 0
+    return len(dias)
+
+
+def fechar_banco_horas_funcionarios(
+    db: Session, cfg: ConfigSnapshot, user_id: int | None = None
+) -> tuple[int, int]:
+    """Close the ledger of every employee (or one); deactivated ones stop at their last day. Returns (employees, days)."""
+    q = select(User.id).where(User.role == UserRole.employee)
+    if user_id is not None:
+        q = q.where(User.id == user_id)
+    user_ids = db.execute(q.order_by(User.id)).scalars().all()
+    return len(user_ids), sum(fechar_banco_horas(db, uid, cfg) for uid in user_ids)
+
+
+def _fechar_background(user_id: int) -> None:
+    db = SessionLocal()
+    try:
+        fechar_banco_horas(db, user_id, config_cache.get(db))
+    except Exception:
+        logger.exception("Fechamento do banco de horas falhou (user_id=%s)", user_id)
+    finally:
+        db.close()
+
+
+def schedule_fechamento(background_tasks: BackgroundTasks, user_id: int) -> None:
+    # After the first punch of a day, so the days before it get written outside the punch's transaction.
+    background_tasks.add_task(_fechar_background, user_id)
+
+
+def ajustar_banco_horas(db: Session, user_id: int, date_str: str, trabalhado_segundos: int) -> None:
+    """Apply a recomputed day to a closed ledger (its row and the checkpoints after it); the caller commits."""
+    dia = date.fromisoformat(date_str)
+    if dia > ultimo_dia_fechado():
+        # Not closed yet: closing will read the day from jornada_dia.
+        return
+    row = db.get(BancoHorasDia, (user_id, dia))
+    if row is None:
+        primeiro = db.execute(
+            select(func.min(BancoHorasDia.data_local)).where(BancoHorasDia.user_id == user_id)
+        ).scalar()
+        if primeiro is not None and dia < primeiro:
+            _antecipar_inicio(db, user_id, dia, primeiro, trabalhado_segundos)
+        return
+    diferenca = trabalhado_segundos - row.trabalhado_segundos
+    if not diferenca:
+        return
+    row.trabalhado_segundos = trabalhado_segundos
+    row.saldo_segundos += diferenca
+    db.execute(
+        update(BancoHorasSaldo)
+        .where(BancoHorasSaldo.user_id == user_id, BancoHorasSaldo.ate_data >= dia)
+        .values(saldo_segundos=BancoHorasSaldo.saldo_segundos + diferenca)
+    )
+
+
+def _antecipar_inicio(db: Session, user_id: int, dia: date, primeiro: date, trabalhado_segundos: int) -> None:
+    # A ponto before the first ledger day moves the start back: insert the days up to the old start and add their
+    # balance to the existing checkpoints, leaving the closed days (and their frozen esperado) as they are.
+    dias = _calcular_dias(db, user_id, config_cache.get(db), dia, primeiro - timedelta(days=1))
+    dias[0]["trabalhado_segundos"] = trabalhado_segundos
+    dias[0]["saldo_segundos"] = trabalhado_segundos - dias[0]["esperado_segundos"]
+    db.execute(
+        update(BancoHorasSaldo)
+        .where(BancoHorasSaldo.user_id == user_id)
+        .values(saldo_segundos=BancoHorasSaldo.saldo_segundos + sum(d["saldo_segundos"] for d in dias))
+    )
+    checkpoints = _checkpoints(user_id, dias, 0)
+    db.execute(insert(BancoHorasDia), dias)
+    if checkpoints:
+        db.execute(insert(BancoHorasSaldo), checkpoints)
+
+
+def limpar_banco_horas(db: Session, user_id: int | None = None) -> None:
+    dias_q = delete(BancoHorasDia)
+    saldos_q = delete(BancoHorasSaldo)
+    if user_id is not None:
+        dias_q = dias_q.where(BancoHorasDia.user_id == user_id)
+        saldos_q = saldos_q.where(BancoHorasSaldo.user_id == user_id)
+    db.execute(dias_q)
+    db.execute(saldos_q)
+
+
+def extrato_banco_horas(
+    db: Session, user_id: int, cfg: ConfigSnapshot, inicio: date, fim: date
+) -> tuple[int, int, list[BancoHorasDiaOut]]:
+    """Return (current balance, balance before `inicio`, days from `inicio` to `fim` with the running balance).
+
+    Days not in the ledger yet are computed on the fly; only a tail longer than `PENDENTES_MAX_DIAS` gets written.
+    """
+    ate = ultimo_dia_fechado()
+    pendentes = dias_pendentes(db, user_id, cfg, ate)
+    saldo = saldo_ate(db, user_id, ate) + sum(d["saldo_segundos"] for d in pendentes)
+    acumulado = saldo_anterior = saldo_ate(db, user_id, inicio - timedelta(days=1)) + sum(
+        d["saldo_segundos"] for d in pendentes if d["data_local"] < inicio
+    )
+
+    linhas = db.execute(
+        select(
+            BancoHorasDia.data_local,
+            BancoHorasDia.trabalhado_segundos,
+            BancoHorasDia.esperado_segundos,
+            BancoHorasDia.saldo_segundos,
+        )
+        .where(BancoHorasDia.user_id == user_id, BancoHorasDia.data_local >= inicio, BancoHorasDia.data_local <= fim)
+        .order_by(BancoHorasDia.data_local)
+    ).all()
+    linhas += [
+        (d["data_local"], d["trabalhado_segundos"], d["esperado_segundos"], d["saldo_segundos"])
+        for d in pendentes
+        if inicio <= d["data_local"] <= fim
+    ]
+
+    dias: list[BancoHorasDiaOut] = []
+    for data_local, trabalhado_s, esperado_s, saldo_dia in linhas:
+        acumulado += saldo_dia
+        dias.append(
+            BancoHorasDiaOut(
+                data=data_local.isoformat(),
+                trabalhado_segundos=trabalhado_s,
+                esperado_segundos=esperado_s,
+                saldo_segundos=saldo_dia,
+                saldo_hhmm=fmt_saldo_hhmm(saldo_dia),
+                acumulado_segundos=acumulado,
+                acumulado_hhmm=fmt_saldo_hhmm(acumulado),
+            )
+        )
+    return saldo, saldo_anterior, dias
@@ -0,0 +1,146 @@
+import argparse
+
+from app.banco_horas import fechar_banco_horas_funcionarios, limpar_banco_horas
+from app.core.config_cache import config_cache
+from app.db.migrations import LATEST_VERSION, backfill_pontos_data_local, get_schema_version, run_migrations
+from app.db.session import SessionLocal, engine
+from app.distancia import claim_distancia_job, create_distancia_job, job_status, run_distancia_job
+from app.idempotency import purge_expired
+from app.jornada import rebuild_jornada_dia
+from app.models import DistanciaRecomputeJob
+
+
+def _migrate(args: argparse.Namespace) -> None:
+    before = get_schema_version(engine)
+    run_migrations(engine)
+    print(f"schema_version: {before} -> {LATEST_VERSION}")
+
+
+def _rebuild_jornada(args: argparse.Namespace) -> None:
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        total = rebuild_jornada_dia(db, user_id=args.user_id)
+    finally:
+        db.close()
+    print(f"jornada_dia: {total} dias recalculados")
+
+
+def _rebuild_banco_horas(args: argparse.Namespace) -> None:
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        limpar_banco_horas(db, user_id=args.user_id)
+        db.commit()
+        funcionarios, total = fechar_banco_horas_funcionarios(db, config_cache.get(db), user_id=args.user_id)
+    finally:
+        db.close()
+    print(f"banco_horas: {total} dias recalculados para {funcionarios} funcionário(s)")
+
+
+def _fechar_banco_horas(args: argparse.Namespace) -> None:
+    run_migrations(engine)
+    # Closing reads the days by data_local: fill the pontos a worker on the previous release wrote without it.
+    with engine.begin() as conn:
+        backfill_pontos_data_local(conn)
+    db = SessionLocal()
+    try:
+        funcionarios, total = fechar_banco_horas_funcionarios(db, config_cache.get(db))
+    finally:
+        db.close()
+    print(f"banco_horas: {total} dias fechados para {funcionarios} funcionário(s)")
+
+
+def _recompute_distancia(args: argparse.Namespace) -> None:
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        if args.job_id is not None:
+            job_id = args.job_id
+            if not claim_distancia_job(db, job_id):
+                job = db.get(DistanciaRecomputeJob, job_id)
+                if not job:
+                    raise SystemExit(f"Job {job_id} não encontrado")
+                raise SystemExit(f"Job {job_id} não pode ser retomado: {job_status(job)}")
+        else:
+            job = create_distancia_job(db, local_id=args.local_id)
+            if not job:
+                raise SystemExit("Local de trabalho não encontrado")
+            job_id = job.id
+            print(f"job {job_id}: {job.total} pontos")
+        job = run_distancia_job(
+            db,
+            job_id,
+            batch_size=args.batch_size,
+            on_progress=lambda j: print(f"job {j.id}: {j.processed}/{j.total}"),
+        )
+        if not job:
+            raise SystemExit(f"Job {job_id} não encontrado")
+    finally:
+        db.close()
+    print(f"job {job.id}: {job.status}")
+
+
+def _purge_idempotency(args: argparse.Namespace) -> None:
+    run_migrations(engine)
+    db = SessionLocal()
+    try:
+        total = purge_expired(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"idempotency_keys: {total} chaves expiradas removidas")
+
+
+def _backfill_data_local(args: argparse.Namespace) -> None:
+    run_migrations(engine)
+    with engine.begin() as conn:
+        total = backfill_pontos_data_local(conn, batch_size=args.batch_size)
+    print(f"pontos: {total} com data_local preenchida")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate", help="Aplica as migrações pendentes do banco")
+    migrate.set_defaults(func=_migrate)
+
+    rebuild = subparsers.add_parser("rebuild-jornada", help="Recalcula a tabela jornada_dia a partir dos pontos")
+    rebuild.add_argument("--user-id", type=int, default=None)
+    rebuild.set_defaults(func=_rebuild_jornada)
+
+    banco = subparsers.add_parser(
+        "rebuild-banco-horas", help="Recalcula o banco de horas com a carga horária atual"
+    )
+    banco.add_argument("--user-id", type=int, default=None)
+    banco.set_defaults(func=_rebuild_banco_horas)
+
+    fechar = subparsers.add_parser(
+        "fechar-banco-horas", help="Grava no banco de horas os dias já encerrados (rodar diariamente)"
+    )
+    fechar.set_defaults(func=_fechar_banco_horas)
+
+    recompute = subparsers.add_parser(
+        "recompute-distancia", help="Recalcula distancia_m dos pontos após mudar o local de trabalho"
+    )
+    recompute.add_argument("--local-id", type=int, default=None, help="Local (padrão: config-local)")
+    recompute.add_argument("--job-id", type=int, default=None, help="Retoma um recálculo interrompido")
+    recompute.add_argument("--batch-size", type=int, default=50_000)
+    recompute.set_defaults(func=_recompute_distancia)
+
+    backfill = subparsers.add_parser(
+        "backfill-data-local", help="Preenche data_local dos pontos gravados durante a troca de versão"
+    )
+    backfill.add_argument("--batch-size", type=int, default=10_000)
+    backfill.set_defaults(func=_backfill_data_local)
+
+    purge = subparsers.add_parser("purge-idempotency", help="Remove as Idempotency-Key expiradas")
+    purge.add_argument("--batch-size", type=int, default=1000)
+    purge.set_defaults(func=_purge_idempotency)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
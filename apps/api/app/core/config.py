@@ -16,10 +16,57 @@ class Settings(BaseSettings):
 
     database_url: str = f"sqlite:///{DEFAULT_DB_PATH}"
 
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size: int = -20000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_temp_store: str = "MEMORY"
+
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_pre_ping: bool = True
+    db_pool_recycle_seconds: int = 1800
+    db_pool_timeout_seconds: int = 30
+
     jwt_secret_key: str = "change-me"
     jwt_algorithm: str = "HS256"
     jwt_access_token_minutes: int = 60 * 24
 
+    secret_pepper: str = "change-me"
+
+    # KDF threads an employee import may hold at once (0 = half of kdf_workers); logins keep the others.
+    password_hash_workers: int = 0
+
+    kdf_workers: int = 0
+    kdf_queue_size: int = 16
+    kdf_retry_after_seconds: int = 2
+
+    config_cache_revalidate_seconds: float = 5.0
+
+    # Warm requests do no auth query; a deactivation made on another worker is seen within this many seconds.
+    principal_cache_ttl_seconds: float = 5.0
+    principal_cache_max_entries: int = 4096
+
+    punch_state_cache_max_entries: int = 8192
+
+    ponto_batch_max_age_hours: int = 72
+
+    idempotency_ttl_hours: int = 24
+    idempotency_purge_interval_seconds: float = 300.0
+
+    geofence_grid_cell_m: float = 1000.0
+
+    # Off by default: the API is public, and the metrics expose routes, volumes and pool sizes.
+    metrics_enabled: bool = False
+    # When set, /metrics requires "Authorization: Bearer <token>".
+    metrics_token: str = ""
+
+    # Development/diagnostics only: per-request statement log, N+1 warnings and Server-Timing headers.
+    sql_profile_enabled: bool = False
+    sql_profile_slow_ms: float = 0.0
+    sql_profile_repeat_threshold: int = 3
+
     admin_email: str = "admin@local.com"
     admin_password: str = "admin"
 
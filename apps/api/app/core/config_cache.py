@@ -0,0 +1,135 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import BancoHorasConfig, ConfigLocal, JornadaValidationConfig, PontoCorrectionConfig
+
+DEFAULT_CORRECTION_WINDOW_DAYS = 30
+DEFAULT_CARGA_DIARIA_MINUTOS = 480
+DEFAULT_DIAS_SEMANA = frozenset({0, 1, 2, 3, 4})
+
+
+@dataclass(frozen=True)
+class LocalConfig:
+    local_lat: float
+    local_lng: float
+    raio_m: int
+    updated_at: datetime
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    local: LocalConfig | None
+    correction_window_days: int
+    correction_updated_at: datetime | None
+    intervalo_exige_4_batidas_blocking: bool
+    jornada_validation_updated_at: datetime | None
+    carga_diaria_minutos: int
+    dias_semana: frozenset[int]
+    banco_horas_updated_at: datetime | None
+
+    @property
+    def stamp(self) -> tuple:
+        return (
+            self.local.updated_at if self.local else None,
+            self.correction_updated_at,
+            self.jornada_validation_updated_at,
+            self.banco_horas_updated_at,
+        )
+
+
+def parse_dias_semana(value: str) -> frozenset[int]:
+    return frozenset(int(d) for d in value.split(",") if d.strip())
+
+
+def _read_stamp(db: Session) -> tuple:
+    row = db.execute(
+        select(
+            select(ConfigLocal.updated_at).where(ConfigLocal.id == 1).scalar_subquery(),
+            select(PontoCorrectionConfig.updated_at).where(PontoCorrectionConfig.id == 1).scalar_subquery(),
+            select(JornadaValidationConfig.updated_at).where(JornadaValidationConfig.id == 1).scalar_subquery(),
+            select(BancoHorasConfig.updated_at).where(BancoHorasConfig.id == 1).scalar_subquery(),
+        )
+    ).one()
+    return tuple(row)
+
+
+def _load_snapshot(db: Session) -> ConfigSnapshot:
+    local = db.get(ConfigLocal, 1)
+    correction = db.get(PontoCorrectionConfig, 1)
+    jornada = db.get(JornadaValidationConfig, 1)
+    banco_horas = db.get(BancoHorasConfig, 1)
+    return ConfigSnapshot(
+        local=(
+            LocalConfig(
+                local_lat=local.local_lat,
+                local_lng=local.local_lng,
+                raio_m=local.raio_m,
+                updated_at=local.updated_at,
+            )
+            if local
+            else None
+        ),
+        correction_window_days=int(correction.window_days) if correction else DEFAULT_CORRECTION_WINDOW_DAYS,
+        correction_updated_at=correction.updated_at if correction else None,
+        intervalo_exige_4_batidas_blocking=bool(jornada.intervalo_exige_4_batidas_blocking) if jornada else False,
+        jornada_validation_updated_at=jornada.updated_at if jornada else None,
+        carga_diaria_minutos=int(banco_horas.carga_diaria_minutos) if banco_horas else DEFAULT_CARGA_DIARIA_MINUTOS,
+        dias_semana=parse_dias_semana(banco_horas.dias_semana) if banco_horas else DEFAULT_DIAS_SEMANA,
+        banco_horas_updated_at=banco_horas.updated_at if banco_horas else None,
+    )
+
+
+class ConfigCache:
+    def __init__(self, revalidate_seconds: float) -> None:
+        self.revalidate_seconds = revalidate_seconds
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+        self._snapshot: ConfigSnapshot | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> ConfigSnapshot:
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshot
+            checked_at = self._checked_at
+        if snapshot is not None and now - checked_at < self.revalidate_seconds:
+            self.hits += 1
+            return snapshot
+
+        if snapshot is not None:
+            # Another worker may have saved a new config: compare the updated_at stamps in one query.
+            self.revalidations += 1
+            if _read_stamp(db) == snapshot.stamp:
+                with self._lock:
+                    self._checked_at = now
+                return snapshot
+
+        snapshot = _load_snapshot(db)
+        self.loads += 1
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = now
+        return snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self) -> dict:
+        return {
+            "revalidate_seconds": self.revalidate_seconds,
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "loads": self.loads,
+        }
+
+
+config_cache = ConfigCache(revalidate_seconds=settings.config_cache_revalidate_seconds)
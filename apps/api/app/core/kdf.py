@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TypeVar
+
+from app.core.config import settings
+from app.core.metrics import current_request_stats
+
+T = TypeVar("T")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class KdfBusy(Exception):
+    pass
+
+
+# Password hashing runs on a fixed number of threads (hashlib's pbkdf2 releases the GIL) and work beyond
+# workers + queue_size is rejected, so a login burst cannot take over the request threadpool.
+class KdfExecutor:
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = workers
+        self.queue_size = queue_size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kdf")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.latency_seconds_sum = 0.0
+        self.wait_seconds_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+
+    def _timed(self, fn: Callable[..., T], args: tuple, enqueued_at: float) -> T:
+        started = time.perf_counter()
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.latency_seconds_sum += elapsed
+                self.wait_seconds_sum += started - enqueued_at
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    if elapsed <= bound:
+                        self.latency_buckets[i] += 1
+
+    def run(self, fn: Callable[..., T], *args) -> T:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise KdfBusy()
+        with self._lock:
+            self.in_flight += 1
+        enqueued_at = time.perf_counter()
+        try:
+            return self._pool.submit(self._timed, fn, args, enqueued_at).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+            stats = current_request_stats()
+            if stats is not None:
+                stats.kdf_seconds += time.perf_counter() - enqueued_at
+
+    def map(self, fn: Callable[..., T], items: list, max_parallel: int) -> list[T]:
+        """`fn` over `items` (bulk hashing) holding at most `max_parallel` slots, so logins keep the remaining ones.
+
+        Takes whatever free slots there are up to the cap, and raises KdfBusy only when there is none.
+        """
+        slots = 0
+        while slots < max(1, max_parallel) and self._slots.acquire(blocking=False):
+            slots += 1
+        if not slots:
+            with self._lock:
+                self.rejected += 1
+            raise KdfBusy()
+        with self._lock:
+            self.in_flight += slots
+        started = time.perf_counter()
+        try:
+            # A sliding window of `slots` items on the shared threads, in order, each timed like a single call.
+            results: list[T] = []
+            window: deque[Future] = deque()
+            for item in items:
+                if len(window) == slots:
+                    results.append(window.popleft().result())
+                window.append(self._pool.submit(self._timed, fn, (item,), time.perf_counter()))
+            while window:
+                results.append(window.popleft().result())
+            return results
+        finally:
+            with self._lock:
+                self.in_flight -= slots
+            for _ in range(slots):
+                self._slots.release()
+            stats = current_request_stats()
+            if stats is not None:
+                stats.kdf_seconds += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self.in_flight,
+                "running": self.running,
+                "queued": max(0, self.in_flight - self.running),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "latency_seconds_sum": self.latency_seconds_sum,
+                "wait_seconds_sum": self.wait_seconds_sum,
+                "latency_buckets": dict(zip(LATENCY_BUCKETS, self.latency_buckets)),
+            }
+
+
+kdf_executor = KdfExecutor(
+    workers=settings.kdf_workers or os.cpu_count() or 1,
+    queue_size=settings.kdf_queue_size,
+)
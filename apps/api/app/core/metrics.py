@@ -0,0 +1,208 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names: tuple[str, ...], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_family(name: str, kind: str, help_text: str, labelnames: tuple[str, ...], samples: dict[tuple, float]) -> list[str]:
+    """Render a metric family whose values are read from elsewhere at scrape time."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines += [f"{name}{format_labels(labelnames, k)} {format_value(v)}" for k, v in samples.items()]
+    return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{format_labels(self.labelnames, k)} {format_value(v)}" for k, v in values]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets=HTTP_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # Per label set: [count per bucket (last one is +Inf), sum]
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            snapshot = sorted((k, (list(v[0]), v[1])) for k, v in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labelvalues, (counts, total) in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = format_labels(self.labelnames + ("le",), labelvalues + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+http_requests = Counter(
+    "pontofacil_http_requests_total", "Requisições HTTP por rota, método e status.", ("route", "method", "status")
+)
+http_duration = Histogram(
+    "pontofacil_http_request_duration_seconds", "Latência das requisições HTTP.", ("route", "method", "status")
+)
+db_statements = Counter("pontofacil_db_statements_total", "Comandos SQL executados por rota.", ("route",))
+db_statement_seconds = Counter("pontofacil_db_statement_seconds_total", "Tempo em comandos SQL por rota.", ("route",))
+pool_wait = Histogram(
+    "pontofacil_db_pool_acquire_seconds", "Espera para obter uma conexão do pool.", buckets=POOL_WAIT_BUCKETS
+)
+punch_results = Counter(
+    "pontofacil_punch_total", "Batidas de ponto aceitas e recusadas por motivo.", ("endpoint", "result")
+)
+
+REGISTRY = [http_requests, http_duration, db_statements, db_statement_seconds, pool_wait, punch_results]
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    kdf_seconds: float = 0.0
+    # (statement, seconds) for every statement; only kept while the SQL profiler is on.
+    statement_log: list[tuple[str, float]] | None = None
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("pontofacil_request_stats", default=None)
+
+
+def current_request_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+
+def bind_request_stats(stats: RequestStats):
+    return _request_stats.set(stats)
+
+
+def unbind_request_stats(token) -> None:
+    _request_stats.reset(token)
+
+
+class MetricsMiddleware:
+    # Plain ASGI rather than BaseHTTPMiddleware: no extra task or body buffering per request.
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_stats.reset(token)
+            # The route template, not the raw path, so ids in URLs don't create a series each.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            http_requests.inc(route, method, status)
+            http_duration.observe(elapsed, route, method, status)
+            if stats.statements:
+                db_statements.inc(route, amount=stats.statements)
+                db_statement_seconds.inc(route, amount=stats.db_seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("pontofacil_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info["pontofacil_query_started"].pop()
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+        if stats.statement_log is not None:
+            stats.statement_log.append((statement, elapsed))
+
+
+def _handle_error(context) -> None:
+    started = context.connection.info.get("pontofacil_query_started") if context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine) -> None:
+    # Metrics and the SQL profiler share these listeners; install them once.
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    # The pool has no "before checkout" event, so the wait is timed around the engine's own acquire call.
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            pool_wait.observe(time.perf_counter() - started)
+
+    engine.raw_connection = timed_raw_connection
@@ -0,0 +1,108 @@
+import logging
+import re
+import time
+from collections import defaultdict
+
+from starlette.datastructures import MutableHeaders
+
+from app.core.metrics import RequestStats, bind_request_stats, current_request_stats, unbind_request_stats
+
+logger = logging.getLogger(__name__)
+
+_PYFORMAT_PARAM = re.compile(r"%\([^)]*\)s")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Slow-request logs show at most this many statement shapes, most expensive first.
+_LOGGED_SHAPES = 10
+
+
+def statement_shape(statement: str) -> str:
+    """Return the statement with placeholders and expanded IN lists collapsed."""
+    shape = _PYFORMAT_PARAM.sub("?", statement)
+    shape = _PARAM_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+def summarize(statement_log: list[tuple[str, float]]) -> list[tuple[str, int, float]]:
+    """Return (shape, count, seconds) per statement shape, most expensive first."""
+    counts: dict[str, int] = defaultdict(int)
+    seconds: dict[str, float] = defaultdict(float)
+    for statement, elapsed in statement_log:
+        shape = statement_shape(statement)
+        counts[shape] += 1
+        seconds[shape] += elapsed
+    return sorted(((s, counts[s], seconds[s]) for s in counts), key=lambda item: item[2], reverse=True)
+
+
+def server_timing(stats: RequestStats, elapsed: float, repeated: int) -> str:
+    app_seconds = max(0.0, elapsed - stats.db_seconds - stats.kdf_seconds)
+    desc = f"{stats.statements} queries" + (f", {repeated} repeated" if repeated else "")
+    return (
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{desc}", '
+        f"kdf;dur={stats.kdf_seconds * 1000:.1f}, "
+        f"app;dur={app_seconds * 1000:.1f}"
+    )
+
+
+class SqlProfilerMiddleware:
+    # Opt-in (PONTOFACIL_SQL_PROFILE_ENABLED): keeps every statement of the request in memory.
+    def __init__(self, app, slow_ms: float, repeat_threshold: int) -> None:
+        self.app = app
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+
+    def _repeated(self, shapes: list[tuple[str, int, float]]) -> list[tuple[str, int, float]]:
+        return [item for item in shapes if item[1] >= self.repeat_threshold]
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Inside MetricsMiddleware the request already has stats; reuse them so statements are timed once.
+        stats = current_request_stats()
+        token = None
+        if stats is None:
+            stats = RequestStats()
+            token = bind_request_stats(stats)
+        stats.statement_log = []
+        started = time.perf_counter()
+
+        async def send_wrapper(message) -> None:
+            if message["type"] == "http.response.start":
+                repeated = self._repeated(summarize(stats.statement_log))
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(stats, time.perf_counter() - started, len(repeated)))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            if token is not None:
+                unbind_request_stats(token)
+            self._report(scope, stats, elapsed)
+
+    def _report(self, scope, stats: RequestStats, elapsed: float) -> None:
+        shapes = summarize(stats.statement_log)
+        route = getattr(scope.get("route"), "path", scope["path"])
+        for shape, count, seconds in self._repeated(shapes):
+            logger.warning(
+                "Possível N+1 em %s %s: %dx (%.1f ms) %s", scope["method"], route, count, seconds * 1000, shape
+            )
+
+        if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+            lines = [
+                f"  {count}x {seconds * 1000:.1f} ms {shape[:300]}" for shape, count, seconds in shapes[:_LOGGED_SHAPES]
+            ]
+            logger.warning(
+                "Requisição lenta: %s %s %.1f ms (db %.1f ms em %d comandos, kdf %.1f ms)\n%s",
+                scope["method"],
+                route,
+                elapsed * 1000,
+                stats.db_seconds * 1000,
+                stats.statements,
+                stats.kdf_seconds * 1000,
+                "\n".join(lines),
+            )
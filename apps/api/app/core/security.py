@@ -1,3 +1,5 @@
+import hashlib
+import hmac
 from datetime import datetime, timedelta
 
 from jose import jwt
@@ -16,6 +18,33 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
+def _pepper_hmac(purpose: str, value: str) -> str:
+    msg = f"{purpose}:{value}".encode("utf-8")
+    return hmac.new(settings.secret_pepper.encode("utf-8"), msg, hashlib.sha256).hexdigest()
+
+
+def pairing_code_lookup_id(code: str) -> str:
+    return _pepper_hmac("pairing-code", code)
+
+
+DEVICE_SECRET_SCHEME = "hmac-sha256$"
+
+
+def hash_device_secret(secret: str) -> str:
+    return DEVICE_SECRET_SCHEME + _pepper_hmac("device-secret", secret)
+
+
+def verify_device_secret(secret: str, secret_hash: str) -> bool:
+    # Device secrets are random 256-bit tokens, so a peppered HMAC is enough; pbkdf2 is kept for old hashes.
+    if secret_hash.startswith(DEVICE_SECRET_SCHEME):
+        return hmac.compare_digest(hash_device_secret(secret), secret_hash)
+    return verify_password(secret, secret_hash)
+
+
+def device_secret_needs_upgrade(secret_hash: str) -> bool:
+    return not secret_hash.startswith(DEVICE_SECRET_SCHEME)
+
+
 def create_access_token(*, subject: str, role: str) -> str:
     expire = datetime.utcnow() + timedelta(minutes=settings.jwt_access_token_minutes)
     to_encode = {
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# Timestamps are stored as naive UTC; days, periods and everything shown to users are in São Paulo time.
+SP_TZ = ZoneInfo("America/Sao_Paulo")
+
+
+def utc_naive_to_sp(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc).astimezone(SP_TZ)
+
+
+def to_utc_naive(dt: datetime) -> datetime:
+    """An aware datetime as stored in the database."""
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def sp_date_of(dt: datetime) -> str:
+    return utc_naive_to_sp(dt).date().isoformat()
+
+
+def sp_date_to_utc_naive_start(date_str: str) -> datetime:
+    return to_utc_naive(datetime.fromisoformat(date_str).replace(tzinfo=SP_TZ))
+
+
+def sp_date_to_utc_naive_end_exclusive(date_str: str) -> datetime:
+    return to_utc_naive((datetime.fromisoformat(date_str) + timedelta(days=1)).replace(tzinfo=SP_TZ))
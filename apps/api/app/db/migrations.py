@@ -0,0 +1,260 @@
+import logging
+from collections.abc import Callable
+
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.db.base import Base
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant shared by every worker for pg_advisory_xact_lock.
+_PG_MIGRATION_LOCK_KEY = 7_264_031_001
+
+
+def _add_column_if_missing(conn: Connection, table: str, column: str, ddl: str) -> None:
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def _create_model_index(conn: Connection, table: str, index_name: str) -> None:
+    for index in Base.metadata.tables[table].indexes:
+        if index.name == index_name:
+            index.create(conn, checkfirst=True)
+            return
+    raise LookupError(f"Index {index_name} is not declared on {table}")
+
+
+def _m001_baseline(conn: Connection) -> None:
+    # Fresh databases get every table from the models; older ones get the columns that used to be
+    # added by ALTER TABLE on startup.
+    Base.metadata.create_all(bind=conn)
+    _add_column_if_missing(conn, "employee_profiles", "genero", "VARCHAR(16)")
+    _add_column_if_missing(conn, "users", "auth_generation", "INTEGER NOT NULL DEFAULT 0")
+    _add_column_if_missing(conn, "device_pairing_codes", "code_lookup", "VARCHAR(64)")
+    _create_model_index(conn, "device_pairing_codes", "ix_device_pairing_codes_code_lookup")
+
+
+def _m002_hot_path_indexes(conn: Connection) -> None:
+    _create_model_index(conn, "pontos", "ix_pontos_user_id_registrado_em")
+    _create_model_index(conn, "employee_devices", "ix_employee_devices_employee_user_id_revoked_at")
+    _create_model_index(conn, "device_pairing_codes", "ix_device_pairing_codes_consumed_at_expires_at")
+
+
+def _m003_locais(conn: Connection) -> None:
+    Base.metadata.tables["locais"].create(conn, checkfirst=True)
+    Base.metadata.tables["local_funcionarios"].create(conn, checkfirst=True)
+    _add_column_if_missing(conn, "pontos", "local_id", "INTEGER REFERENCES locais(id)")
+    _create_model_index(conn, "pontos", "ix_pontos_local_id")
+    _create_model_index(conn, "local_funcionarios", "ix_local_funcionarios_user_id")
+
+
+def _m004_distancia_recompute_jobs(conn: Connection) -> None:
+    Base.metadata.tables["distancia_recompute_jobs"].create(conn, checkfirst=True)
+
+
+def _m005_audit_motivo_search(conn: Connection) -> None:
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        sqlite_version = conn.dialect.dbapi.sqlite_version_info
+        if sqlite_version < (3, 34, 0):
+            # No trigram tokenizer: the audit search keeps using LIKE.
+            return
+        tokenize = "trigram remove_diacritics 1" if sqlite_version >= (3, 45, 0) else "trigram"
+        conn.execute(
+            text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS ponto_admin_audit_fts USING fts5("
+                f"motivo, content='ponto_admin_audit', content_rowid='id', tokenize='{tokenize}')"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TRIGGER IF NOT EXISTS ponto_admin_audit_fts_ai AFTER INSERT ON ponto_admin_audit BEGIN "
+                "INSERT INTO ponto_admin_audit_fts(rowid, motivo) VALUES (new.id, new.motivo); END"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TRIGGER IF NOT EXISTS ponto_admin_audit_fts_ad AFTER DELETE ON ponto_admin_audit BEGIN "
+                "INSERT INTO ponto_admin_audit_fts(ponto_admin_audit_fts, rowid, motivo) "
+                "VALUES ('delete', old.id, old.motivo); END"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TRIGGER IF NOT EXISTS ponto_admin_audit_fts_au AFTER UPDATE OF motivo ON ponto_admin_audit BEGIN "
+                "INSERT INTO ponto_admin_audit_fts(ponto_admin_audit_fts, rowid, motivo) "
+                "VALUES ('delete', old.id, old.motivo); "
+                "INSERT INTO ponto_admin_audit_fts(rowid, motivo) VALUES (new.id, new.motivo); END"
+            )
+        )
+        conn.execute(text("INSERT INTO ponto_admin_audit_fts(ponto_admin_audit_fts) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        # unaccent() is only STABLE; index expressions need an IMMUTABLE wrapper with a fixed dictionary.
+        conn.execute(
+            text(
+                "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+                "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+                "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_ponto_admin_audit_motivo_trgm "
+                "ON ponto_admin_audit USING gin (f_unaccent(motivo) gin_trgm_ops)"
+            )
+        )
+
+
+def _m006_employee_auth_policy_id_sequence(conn: Connection) -> None:
+    # The id used to be declared with default=1, so Postgres created it without a sequence.
+    # SQLite's INTEGER PRIMARY KEY already auto-assigns.
+    if conn.dialect.name != "postgresql":
+        return
+    conn.execute(text("CREATE SEQUENCE IF NOT EXISTS employee_auth_policy_id_seq OWNED BY employee_auth_policy.id"))
+    conn.execute(
+        text(
+            "SELECT setval('employee_auth_policy_id_seq', "
+            "COALESCE((SELECT MAX(id) FROM employee_auth_policy), 0) + 1, false)"
+        )
+    )
+    conn.execute(
+        text("ALTER TABLE employee_auth_policy ALTER COLUMN id SET DEFAULT nextval('employee_auth_policy_id_seq')")
+    )
+
+
+def _m007_idempotency_keys(conn: Connection) -> None:
+    Base.metadata.tables["idempotency_keys"].create(conn, checkfirst=True)
+
+
+def _m008_jornada_dia_version(conn: Connection) -> None:
+    _add_column_if_missing(conn, "jornada_dia", "version", "INTEGER NOT NULL DEFAULT 0")
+
+
+def backfill_pontos_data_local(conn: Connection, batch_size: int = 10_000) -> int:
+    """Fill pontos.data_local where it is missing; returns the number of rows updated."""
+    if conn.dialect.name == "postgresql":
+        # The server's tz database converts each timestamp with the offset in force at that instant.
+        result = conn.execute(
+            text(
+                "UPDATE pontos SET data_local = "
+                "((registrado_em AT TIME ZONE 'UTC') AT TIME ZONE 'America/Sao_Paulo')::date "
+                "WHERE data_local IS NULL"
+            )
+        )
+        return result.rowcount
+
+    pontos = Base.metadata.tables["pontos"]
+    write = update(pontos).where(pontos.c.id == bindparam("b_id")).values(data_local=bindparam("b_data_local"))
+    updated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(pontos.c.id, pontos.c.registrado_em)
+            .where(pontos.c.id > last_id, pontos.c.data_local.is_(None))
+            .order_by(pontos.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        conn.execute(
+            write, [{"b_id": id_, "b_data_local": app.models.ponto_data_local(at)} for id_, at in rows]
+        )
+        updated += len(rows)
+        last_id = rows[-1][0]
+
+
+def _m009_pontos_data_local(conn: Connection) -> None:
+    _add_column_if_missing(conn, "pontos", "data_local", "DATE")
+    backfill_pontos_data_local(conn)
+    _create_model_index(conn, "pontos", "ix_pontos_user_id_data_local")
+
+
+def _m010_banco_horas(conn: Connection) -> None:
+    for table in ("banco_horas_config", "banco_horas_dia", "banco_horas_saldo"):
+        Base.metadata.tables[table].create(conn, checkfirst=True)
+
+
+def _m011_users_deactivated_at(conn: Connection) -> None:
+    _add_column_if_missing(conn, "users", "deactivated_at", "TIMESTAMP")
+    # Employees deactivated before the column existed: their last ponto (or the account's creation) ends the bank.
+    conn.execute(
+        text(
+            "UPDATE users SET deactivated_at = COALESCE("
+            "(SELECT MAX(p.registrado_em) FROM pontos p WHERE p.user_id = users.id), created_at) "
+            "WHERE is_active = :inativo AND deactivated_at IS NULL"
+        ),
+        {"inativo": False},
+    )
+
+
+def _m012_pontos_sem_data_local(conn: Connection) -> None:
+    _create_model_index(conn, "pontos", "ix_pontos_sem_data_local")
+    # Rows inserted by workers still on the release before migration 9 while it rolled out.
+    backfill_pontos_data_local(conn)
+
+
+MIGRATIONS: list[tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline", _m001_baseline),
+    (2, "hot_path_indexes", _m002_hot_path_indexes),
+    (3, "locais", _m003_locais),
+    (4, "distancia_recompute_jobs", _m004_distancia_recompute_jobs),
+    (5, "audit_motivo_search", _m005_audit_motivo_search),
+    (6, "employee_auth_policy_id_sequence", _m006_employee_auth_policy_id_sequence),
+    (7, "idempotency_keys", _m007_idempotency_keys),
+    (8, "jornada_dia_version", _m008_jornada_dia_version),
+    (9, "pontos_data_local", _m009_pontos_data_local),
+    (10, "banco_horas", _m010_banco_horas),
+    (11, "users_deactivated_at", _m011_users_deactivated_at),
+    (12, "pontos_sem_data_local", _m012_pontos_sem_data_local),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(engine: Engine) -> int:
+    with engine.connect() as conn:
+        try:
+            version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+        except Exception:
+            conn.rollback()
+            return 0
+        return int(version or 0)
+
+
+def _acquire_migration_lock(conn: Connection) -> None:
+    dialect = conn.dialect.name
+    if dialect == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_MIGRATION_LOCK_KEY})
+    elif dialect == "sqlite":
+        # Takes the database write lock up front; other workers wait on busy_timeout.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def run_migrations(engine: Engine) -> int:
+    if get_schema_version(engine) >= LATEST_VERSION:
+        return LATEST_VERSION
+
+    with engine.begin() as conn:
+        _acquire_migration_lock(conn)
+        conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS schema_version ("
+                "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+            )
+        )
+        current = int(conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0)
+        for version, name, step in MIGRATIONS:
+            if version <= current:
+                continue
+            logger.info("Applying schema migration %s (%s)", version, name)
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, name, applied_at) VALUES (:version, :name, CURRENT_TIMESTAMP)"),
+                {"version": version, "name": name},
+            )
+    return LATEST_VERSION
@@ -1,12 +1,59 @@
-from sqlalchemy import create_engine
+import unicodedata
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
 
 
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if settings.database_url.startswith("sqlite") else {},
-)
+def _apply_sqlite_pragmas(dbapi_connection, _connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA cache_size={int(settings.sqlite_cache_size)}")
+        cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cursor.execute(f"PRAGMA temp_store={settings.sqlite_temp_store}")
+    finally:
+        cursor.close()
+
+
+def _sqlite_unaccent(value: str | None) -> str | None:
+    if value is None:
+        return None
+    return "".join(c for c in unicodedata.normalize("NFKD", value) if not unicodedata.combining(c))
+
+
+def _register_sqlite_functions(dbapi_connection, _connection_record) -> None:
+    # Same name as the Postgres wrapper over unaccent(), so accent-insensitive queries are written once.
+    dbapi_connection.create_function("f_unaccent", 1, _sqlite_unaccent, deterministic=True)
+
+
+def create_db_engine(database_url: str) -> Engine:
+    if database_url.startswith("sqlite"):
+        sqlite_engine = create_engine(
+            database_url,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": settings.sqlite_busy_timeout_ms / 1000,
+            },
+        )
+        event.listen(sqlite_engine, "connect", _apply_sqlite_pragmas)
+        event.listen(sqlite_engine, "connect", _register_sqlite_functions)
+        return sqlite_engine
+
+    return create_engine(
+        database_url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_timeout=settings.db_pool_timeout_seconds,
+    )
+
+
+engine = create_db_engine(settings.database_url)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,157 @@
+import math
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+
+from app.geofence import EARTH_RADIUS_M
+from app.models import ConfigLocal, DistanciaRecomputeJob, Local, Ponto, PontoAdminAudit, PontoAdminAuditAction
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# A running job commits its checkpoint (and updated_at) after every chunk; one that has not done so for this long was
+# interrupted by a restart or a crash of the process running it.
+JOB_HEARTBEAT_TIMEOUT = timedelta(minutes=5)
+
+
+def haversine_distance_m_array(lat: "np.ndarray", lng: "np.ndarray", ref_lat: float, ref_lng: float) -> "np.ndarray":
+    # numpy is imported on first use: only the recompute job needs it, and it is a large share of worker boot time.
+    import numpy as np
+
+    phi1 = np.radians(lat)
+    phi2 = math.radians(ref_lat)
+    dphi = np.radians(ref_lat - lat)
+    dlambda = np.radians(ref_lng - lng)
+
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * math.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def _job_scope(job: DistanciaRecomputeJob) -> list:
+    # Pontos without a distance were never geofenced (no config at the time, or entered by the admin) and stay as they are.
+    # Pontos the admin entered or corrected keep the distance typed in: it was never measured from the site.
+    do_admin = (
+        select(PontoAdminAudit.id)
+        .where(
+            PontoAdminAudit.ponto_id == Ponto.id,
+            PontoAdminAudit.action.in_((PontoAdminAuditAction.create, PontoAdminAuditAction.update)),
+        )
+        .exists()
+    )
+    if job.local_id is None:
+        return [Ponto.local_id.is_(None), Ponto.distancia_m.is_not(None), ~do_admin]
+    return [Ponto.local_id == job.local_id, Ponto.distancia_m.is_not(None), ~do_admin]
+
+
+def create_distancia_job(db: Session, local_id: int | None = None) -> DistanciaRecomputeJob | None:
+    if local_id is None:
+        config = db.get(ConfigLocal, 1)
+        if not config:
+            return None
+        ref_lat, ref_lng = config.local_lat, config.local_lng
+    else:
+        local = db.get(Local, local_id)
+        if not local:
+            return None
+        ref_lat, ref_lng = local.lat, local.lng
+
+    now = datetime.utcnow()
+    job = DistanciaRecomputeJob(
+        local_id=local_id,
+        ref_lat=ref_lat,
+        ref_lng=ref_lng,
+        status="pending",
+        created_at=now,
+        updated_at=now,
+    )
+    job.total = db.execute(select(func.count(Ponto.id)).where(*_job_scope(job))).scalar() or 0
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def job_status(job: DistanciaRecomputeJob, now: datetime | None = None) -> str:
+    """The stored status, except that an interrupted pending/running job is reported as "paused" (resumable)."""
+    now = now or datetime.utcnow()
+    if job.status in ("pending", "running") and job.updated_at < now - JOB_HEARTBEAT_TIMEOUT:
+        return "paused"
+    return job.status
+
+
+def claim_distancia_job(db: Session, job_id: int) -> bool:
+    """Atomically mark a paused or failed job as running; False when it is running elsewhere or already done."""
+    now = datetime.utcnow()
+    jobs = DistanciaRecomputeJob.__table__
+    interrompido = (jobs.c.status.in_(("pending", "running"))) & (jobs.c.updated_at < now - JOB_HEARTBEAT_TIMEOUT)
+    result = db.execute(
+        update(jobs)
+        .where(jobs.c.id == job_id, jobs.c.status.in_(("paused", "failed")) | interrompido)
+        .values(status="running", error=None, updated_at=now)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def run_distancia_job(
+    db: Session,
+    job_id: int,
+    batch_size: int = 50_000,
+    on_progress: Callable[[DistanciaRecomputeJob], None] | None = None,
+) -> DistanciaRecomputeJob | None:
+    job = db.get(DistanciaRecomputeJob, job_id)
+    if not job or job.status == "done":
+        return job
+
+    job.status = "running"
+    job.error = None
+    job.updated_at = datetime.utcnow()
+    db.commit()
+
+    import numpy as np
+
+    scope = _job_scope(job)
+    # Core statements on the session's connection: the ORM bulk paths cost more per row than the math itself.
+    pontos = Ponto.__table__
+    write = update(pontos).where(pontos.c.id == bindparam("b_id")).values(distancia_m=bindparam("b_distancia_m"))
+    try:
+        while True:
+            # Keyset on Ponto.id with the checkpoint committed per chunk, so a restarted job continues where it stopped.
+            conn = db.connection()
+            rows = conn.execute(
+                select(Ponto.id, Ponto.lat, Ponto.lng)
+                .where(*scope, Ponto.id > job.last_ponto_id)
+                .order_by(Ponto.id)
+                .limit(batch_size)
+            ).fetchall()
+            if not rows:
+                break
+
+            ids, lats, lngs = zip(*rows)
+            distancias = haversine_distance_m_array(
+                np.array(lats, dtype=np.float64), np.array(lngs, dtype=np.float64), job.ref_lat, job.ref_lng
+            ).tolist()
+            conn.execute(write, [{"b_id": i, "b_distancia_m": d} for i, d in zip(ids, distancias)])
+
+            job.last_ponto_id = ids[-1]
+            job.processed += len(ids)
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            if on_progress:
+                on_progress(job)
+    except Exception as exc:
+        db.rollback()
+        job.status = "failed"
+        job.error = str(exc)[:500]
+        job.updated_at = datetime.utcnow()
+        db.commit()
+        raise
+
+    job.status = "done"
+    job.updated_at = datetime.utcnow()
+    job.finished_at = job.updated_at
+    db.commit()
+    return job
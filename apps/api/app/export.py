@@ -0,0 +1,175 @@
+import csv
+import io
+import zipfile
+from collections.abc import Iterable, Iterator
+from xml.sax.saxutils import escape
+
+
+class _ChunkSink(io.RawIOBase):
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# A spreadsheet opening the CSV evaluates a cell that starts with one of these as a formula.
+_CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_cell(value):
+    # Text such as a name typed by the admin; the leading quote makes the spreadsheet show it as text.
+    if isinstance(value, str) and value.startswith(_CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def iter_csv(header: list[str], rows: Iterable[list], chunk_rows: int = 1000) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    # BOM so Excel opens the UTF-8 file with the right encoding.
+    buf.write("\ufeff")
+    writer.writerow(header)
+    pending = 0
+    for row in rows:
+        writer.writerow([_csv_cell(v) for v in row])
+        pending += 1
+        if pending >= chunk_rows:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate(0)
+            pending = 0
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+# Excel's rows per worksheet, header included; longer exports continue on another sheet.
+XLSX_MAX_ROWS = 1_048_576
+
+_XLSX_SHEET_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+
+
+def _xlsx_content_types(sheets: int) -> str:
+    overrides = "".join(
+        f'<Override PartName="/xl/worksheets/sheet{n}.xml" ContentType="{_XLSX_SHEET_TYPE}"/>'
+        for n in range(1, sheets + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        f"{overrides}</Types>"
+    )
+
+
+def _xlsx_workbook_rels(sheets: int) -> str:
+    rels = "".join(
+        f'<Relationship Id="rId{n}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{n}.xml"/>'
+        for n in range(1, sheets + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        f"{rels}</Relationships>"
+    )
+
+
+def _xlsx_sheet_name(sheet_name: str, n: int) -> str:
+    # Sheet names are limited to 31 characters.
+    return sheet_name[:31] if n == 1 else f"{sheet_name[:25]} ({n})"
+
+
+def _xlsx_workbook(sheet_name: str, sheets: int) -> str:
+    entries = "".join(
+        f'<sheet name="{escape(_xlsx_sheet_name(sheet_name, n))}" sheetId="{n}" r:id="rId{n}"/>'
+        for n in range(1, sheets + 1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f"<sheets>{entries}</sheets>"
+        "</workbook>"
+    )
+
+
+def _xlsx_row(values: list) -> str:
+    cells = []
+    for v in values:
+        if v is None:
+            cells.append("<c/>")
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            cells.append(f"<c><v>{v}</v></c>")
+        else:
+            cells.append(f'<c t="inlineStr"><is><t>{escape(str(v))}</t></is></c>')
+    return "<row>" + "".join(cells) + "</row>"
+
+
+def iter_xlsx(
+    header: list[str],
+    rows: Iterable[list],
+    sheet_name: str = "Pontos",
+    chunk_rows: int = 1000,
+    max_rows: int = XLSX_MAX_ROWS,
+) -> Iterator[bytes]:
+    # zipfile falls back to data descriptors on an unseekable sink, so the workbook is produced incrementally.
+    # The sheet count is only known at the end, so the parts that list the sheets go after them in the zip.
+    sink = _ChunkSink()
+    header_xml = _xlsx_row(header).encode("utf-8")
+    rows = iter(rows)
+    row = next(rows, None)
+    sheets = 0
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        while True:
+            sheets += 1
+            with zf.open(f"xl/worksheets/sheet{sheets}.xml", mode="w", force_zip64=True) as sheet:
+                sheet.write(
+                    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                )
+                sheet.write(header_xml)
+                written = 1
+                pending: list[str] = []
+                while row is not None and written < max_rows:
+                    pending.append(_xlsx_row(row))
+                    written += 1
+                    if len(pending) >= chunk_rows:
+                        sheet.write("".join(pending).encode("utf-8"))
+                        pending.clear()
+                        data = sink.drain()
+                        if data:
+                            yield data
+                    row = next(rows, None)
+                if pending:
+                    sheet.write("".join(pending).encode("utf-8"))
+                sheet.write(b"</sheetData></worksheet>")
+            if row is None:
+                break
+        zf.writestr("[Content_Types].xml", _xlsx_content_types(sheets))
+        zf.writestr("_rels/.rels", _XLSX_ROOT_RELS)
+        zf.writestr("xl/workbook.xml", _xlsx_workbook(sheet_name, sheets))
+        zf.writestr("xl/_rels/workbook.xml.rels", _xlsx_workbook_rels(sheets))
+    yield sink.drain()
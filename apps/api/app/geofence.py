@@ -0,0 +1,174 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.config_cache import config_cache
+from app.models import Local, LocalFuncionario
+
+EARTH_RADIUS_M = 6371000.0
+_METERS_PER_DEGREE = 111_320.0
+# Sites whose radius spans more cells than this are checked on every lookup instead of being gridded.
+_MAX_CELLS_PER_SITE = 1024
+
+
+def haversine_distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lng2 - lng1)
+
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+@dataclass(frozen=True)
+class Site:
+    id: int
+    lat: float
+    lng: float
+    raio_m: int
+
+
+@dataclass(frozen=True)
+class GeofenceResult:
+    allowed: bool
+    local_id: int | None = None
+    distancia_m: float | None = None
+    raio_m: int | None = None
+
+
+class SiteGridIndex:
+    def __init__(self, sites: list[Site], assignments: dict[int, frozenset[int]], cell_m: float) -> None:
+        self.sites = {s.id: s for s in sites}
+        self.assignments = assignments
+        self._cell_deg = cell_m / _METERS_PER_DEGREE
+        self._cells: dict[tuple[int, int], list[Site]] = {}
+        self._large: list[Site] = []
+        for site in sites:
+            # Store the site in every cell its bounding box touches, so a lookup only reads one cell.
+            lat_span = site.raio_m / _METERS_PER_DEGREE
+            lng_span = site.raio_m / (_METERS_PER_DEGREE * max(math.cos(math.radians(site.lat)), 0.01))
+            lat0, lat1 = self._cell(site.lat - lat_span), self._cell(site.lat + lat_span)
+            lng0, lng1 = self._cell(site.lng - lng_span), self._cell(site.lng + lng_span)
+            if (lat1 - lat0 + 1) * (lng1 - lng0 + 1) > _MAX_CELLS_PER_SITE:
+                self._large.append(site)
+                continue
+            for i in range(lat0, lat1 + 1):
+                for j in range(lng0, lng1 + 1):
+                    self._cells.setdefault((i, j), []).append(site)
+
+    def _cell(self, degrees: float) -> int:
+        return math.floor(degrees / self._cell_deg)
+
+    def __len__(self) -> int:
+        return len(self.sites)
+
+    def candidates(self, user_id: int, lat: float, lng: float) -> list[Site]:
+        # Assignments may only point at inactive or deleted sites; the employee then falls back to every site.
+        assigned = [self.sites[i] for i in self.assignments.get(user_id, ()) if i in self.sites]
+        if assigned:
+            return assigned
+        return self._cells.get((self._cell(lat), self._cell(lng)), []) + self._large
+
+    def match(self, user_id: int, lat: float, lng: float) -> GeofenceResult:
+        inside: tuple[float, Site] | None = None
+        closest: tuple[float, Site] | None = None
+        for site in self.candidates(user_id, lat, lng):
+            distancia_m = haversine_distance_m(lat, lng, site.lat, site.lng)
+            if distancia_m <= site.raio_m and (inside is None or distancia_m < inside[0]):
+                inside = (distancia_m, site)
+            if closest is None or distancia_m < closest[0]:
+                closest = (distancia_m, site)
+
+        if inside:
+            return GeofenceResult(allowed=True, local_id=inside[1].id, distancia_m=inside[0], raio_m=inside[1].raio_m)
+        if closest:
+            return GeofenceResult(allowed=False, distancia_m=closest[0], raio_m=closest[1].raio_m)
+        return GeofenceResult(allowed=False)
+
+
+def _read_stamp(db: Session) -> tuple:
+    return tuple(db.execute(select(func.count(Local.id), func.max(Local.updated_at))).one())
+
+
+def _load_index(db: Session) -> SiteGridIndex:
+    sites = [
+        Site(id=r.id, lat=r.lat, lng=r.lng, raio_m=r.raio_m)
+        for r in db.query(Local).filter(Local.is_active.is_(True)).all()
+    ]
+    assignments: dict[int, set[int]] = {}
+    for local_id, user_id in db.query(LocalFuncionario.local_id, LocalFuncionario.user_id).all():
+        assignments.setdefault(user_id, set()).add(local_id)
+    return SiteGridIndex(
+        sites,
+        {user_id: frozenset(ids) for user_id, ids in assignments.items()},
+        cell_m=settings.geofence_grid_cell_m,
+    )
+
+
+class SiteIndexCache:
+    def __init__(self, revalidate_seconds: float) -> None:
+        self.revalidate_seconds = revalidate_seconds
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+        self._index: SiteGridIndex | None = None
+        self._stamp: tuple | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> SiteGridIndex:
+        now = time.monotonic()
+        with self._lock:
+            index = self._index
+            stamp = self._stamp
+            checked_at = self._checked_at
+        if index is not None and now - checked_at < self.revalidate_seconds:
+            self.hits += 1
+            return index
+
+        # Every change to a site or to its assignments moves locais.updated_at forward.
+        current = _read_stamp(db)
+        if index is not None:
+            self.revalidations += 1
+        if index is None or current != stamp:
+            index = _load_index(db)
+            self.loads += 1
+        with self._lock:
+            self._index = index
+            self._stamp = current
+            self._checked_at = now
+        return index
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+
+    def stats(self) -> dict:
+        return {
+            "revalidate_seconds": self.revalidate_seconds,
+            "hits": self.hits,
+            "revalidations": self.revalidations,
+            "loads": self.loads,
+        }
+
+
+site_index_cache = SiteIndexCache(revalidate_seconds=settings.config_cache_revalidate_seconds)
+
+
+def check_geofence(db: Session, user_id: int, lat: float, lng: float) -> GeofenceResult:
+    index = site_index_cache.get(db)
+    if len(index):
+        return index.match(user_id, lat, lng)
+
+    # Without any active site the single ConfigLocal point still applies.
+    config = config_cache.get(db).local
+    if not config:
+        return GeofenceResult(allowed=True)
+    distancia_m = haversine_distance_m(lat, lng, config.local_lat, config.local_lng)
+    return GeofenceResult(allowed=distancia_m <= config.raio_m, distancia_m=distancia_m, raio_m=config.raio_m)
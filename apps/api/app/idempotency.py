@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from fastapi import BackgroundTasks, HTTPException, Response
+from pydantic import BaseModel
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 128
+PURGE_BATCH_SIZE = 1000
+
+_purge_lock = threading.Lock()
+_next_purge_at = 0.0
+
+
+def request_hash(scope: str, payload: BaseModel | None) -> str:
+    body = payload.model_dump_json() if payload is not None else ""
+    return hashlib.sha256(f"{scope}\n{body}".encode("utf-8")).hexdigest()
+
+
+def find_replay(db: Session, user_id: int, key: str | None, fingerprint: str) -> Response | None:
+    if key is None:
+        return None
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_KEY_HEADER} inválida (1 a {MAX_KEY_LENGTH} caracteres)")
+
+    row = db.execute(
+        select(IdempotencyKey).where(IdempotencyKey.user_id == user_id).where(IdempotencyKey.key == key)
+    ).scalar_one_or_none()
+    if row is None:
+        return None
+    if row.expires_at <= datetime.utcnow():
+        # Not purged yet: drop it so this request can claim the key again.
+        db.delete(row)
+        db.flush()
+        return None
+    if row.request_hash != fingerprint:
+        raise HTTPException(status_code=422, detail=f"{IDEMPOTENCY_KEY_HEADER} já usada em outra requisição")
+    return Response(
+        content=row.response_json,
+        status_code=row.status_code,
+        media_type="application/json",
+        headers={REPLAYED_HEADER: "true"},
+    )
+
+
+def commit_with_key(
+    db: Session, user_id: int, key: str | None, fingerprint: str, response_json: str, status_code: int = 200
+) -> Response | None:
+    """Commit the request together with its key; return the first response instead if a concurrent retry won."""
+    if key is None:
+        db.commit()
+        return None
+
+    db.add(
+        IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            request_hash=fingerprint,
+            status_code=status_code,
+            response_json=response_json,
+            expires_at=datetime.utcnow() + timedelta(hours=settings.idempotency_ttl_hours),
+        )
+    )
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        replay = find_replay(db, user_id, key, fingerprint)
+        if replay is None:
+            raise
+        return replay
+    return None
+
+
+def purge_expired(db: Session, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    # Small batches keep each delete's lock window short on busy punch tables.
+    total = 0
+    while True:
+        ids = db.execute(
+            select(IdempotencyKey.id).where(IdempotencyKey.expires_at <= datetime.utcnow()).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return total
+        db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+        db.commit()
+        total += len(ids)
+
+
+def _purge_background() -> None:
+    db = SessionLocal()
+    try:
+        purge_expired(db)
+    except Exception:
+        logger.exception("Limpeza de Idempotency-Key expiradas falhou")
+    finally:
+        db.close()
+
+
+def schedule_purge(background_tasks: BackgroundTasks) -> None:
+    global _next_purge_at
+    now = time.monotonic()
+    with _purge_lock:
+        if now < _next_purge_at:
+            return
+        _next_purge_at = now + settings.idempotency_purge_interval_seconds
+    background_tasks.add_task(_purge_background)
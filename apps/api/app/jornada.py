@@ -0,0 +1,230 @@
+import json
+from datetime import date, datetime
+
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from app.core.timeutil import sp_date_of, utc_naive_to_sp
+from app.models import JornadaDia, Ponto
+from app.schemas import JornadaSegmentOut
+
+
+def fmt_hhmm(total_seconds: int) -> str:
+    total_seconds = max(0, int(total_seconds))
+    h = total_seconds // 3600
+    m = (total_seconds % 3600) // 60
+    return f"{h:02d}:{m:02d}"
+
+
+def compute_jornada_from_pontos(date_str: str, pontos: list[Ponto]) -> tuple[int, list[JornadaSegmentOut], list[str]]:
+    alertas: list[str] = []
+    segmentos: list[JornadaSegmentOut] = []
+    total_trabalhado_segundos = 0
+
+    pontos_sorted = sorted(pontos, key=lambda p: p.registrado_em)
+
+    has_intervalo = any(p.tipo.value in ("intervalo_inicio", "intervalo_fim") for p in pontos_sorted)
+
+    work_start: datetime | None = None
+    break_start: datetime | None = None
+    intervalo_segundos_atual = 0
+
+    for p in pontos_sorted:
+        ts = p.registrado_em
+        tipo = p.tipo.value
+
+        if tipo == "entrada":
+            if work_start is not None:
+                alertas.append("Entrada duplicada (já havia uma entrada aberta)")
+                continue
+            if break_start is not None:
+                alertas.append("Entrada com intervalo aberto (sequência inválida)")
+                break_start = None
+            work_start = ts
+            continue
+
+        if tipo == "intervalo_inicio":
+            if work_start is None:
+                alertas.append("Início de intervalo sem entrada")
+                continue
+            if break_start is not None:
+                alertas.append("Início de intervalo duplicado (intervalo já estava aberto)")
+                continue
+            break_start = ts
+            continue
+
+        if tipo == "intervalo_fim":
+            if break_start is None:
+                alertas.append("Fim de intervalo sem início de intervalo")
+                continue
+            if ts <= break_start:
+                alertas.append("Fim de intervalo anterior ao início (horário inválido)")
+                break_start = None
+                continue
+
+            segundos = int((ts - break_start).total_seconds())
+            intervalo_segundos_atual += max(0, segundos)
+            segmentos.append(
+                JornadaSegmentOut(
+                    tipo="intervalo",
+                    inicio=utc_naive_to_sp(break_start),
+                    fim=utc_naive_to_sp(ts),
+                    segundos=segundos,
+                )
+            )
+            break_start = None
+            continue
+
+        if tipo == "saida":
+            if work_start is None:
+                alertas.append("Saída sem entrada")
+                continue
+            if break_start is not None:
+                alertas.append("Saída com intervalo aberto (intervalo não finalizado)")
+                break_start = None
+
+            if ts <= work_start:
+                alertas.append("Saída anterior à entrada (horário inválido)")
+                work_start = None
+                intervalo_segundos_atual = 0
+                continue
+
+            segundos_brutos = int((ts - work_start).total_seconds())
+            segundos_trabalho = max(0, segundos_brutos - intervalo_segundos_atual)
+
+            segmentos.append(
+                JornadaSegmentOut(
+                    tipo="trabalho",
+                    inicio=utc_naive_to_sp(work_start),
+                    fim=utc_naive_to_sp(ts),
+                    segundos=segundos_trabalho,
+                )
+            )
+            total_trabalhado_segundos += segundos_trabalho
+
+            work_start = None
+            break_start = None
+            intervalo_segundos_atual = 0
+            continue
+
+        alertas.append(f"Tipo de ponto desconhecido: {tipo}")
+
+    if break_start is not None:
+        alertas.append("Intervalo iniciado e não finalizado")
+    if work_start is not None:
+        alertas.append("Entrada registrada, mas sem saída")
+
+    if not pontos_sorted:
+        alertas.append("Nenhum ponto registrado no dia")
+
+    if has_intervalo and len(pontos_sorted) != 4:
+        alertas.append("Intervalo exige exatamente 4 batidas no dia (entrada, intervalo início, intervalo fim, saída)")
+
+    return total_trabalhado_segundos, segmentos, alertas
+
+
+def _has_intervalo(pontos: list[Ponto]) -> bool:
+    return any(p.tipo.value in ("intervalo_inicio", "intervalo_fim") for p in pontos)
+
+
+def _fill_jornada_dia(row: JornadaDia, date_str: str, pontos: list[Ponto]) -> None:
+    total_s, segmentos, alertas = compute_jornada_from_pontos(date_str, pontos)
+    row.total_trabalhado_segundos = total_s
+    row.segmentos_json = json.dumps([s.model_dump(mode="json") for s in segmentos], ensure_ascii=False)
+    row.alertas_json = json.dumps(alertas, ensure_ascii=False)
+    row.batidas = len(pontos)
+    row.has_intervalo = _has_intervalo(pontos)
+    row.updated_at = datetime.utcnow()
+
+
+def _query_pontos_do_dia(db: Session, user_id: int, date_str: str) -> list[Ponto]:
+    return (
+        db.query(Ponto)
+        .filter(Ponto.user_id == user_id)
+        .filter(Ponto.data_local == date.fromisoformat(date_str))
+        .order_by(Ponto.registrado_em)
+        .all()
+    )
+
+
+def recompute_jornada_dia(
+    db: Session, user_id: int, date_str: str, known_version: int | None = None, check_version: bool = False
+) -> JornadaDia | None:
+    """Refresh the materialized day from the pontos visible in this session; the caller flushes before and commits after.
+
+    With check_version, known_version is the version the caller read (None: the day had no row) and the flush fails
+    if another worker wrote the day since.
+    """
+    pontos = _query_pontos_do_dia(db, user_id, date_str)
+    key = (user_id, date.fromisoformat(date_str))
+    if check_version and identity_key(JornadaDia, key) not in db.identity_map:
+        if known_version is None:
+            # Insert instead of looking the row up: a row created meanwhile by another worker fails the primary key.
+            row = JornadaDia(user_id=user_id, data_local=key[1])
+        else:
+            # Stand-in for the stored row instead of reading it back: the ORM's UPDATE ... WHERE version = known_version
+            # raises StaleDataError if another worker wrote this day since the caller read it.
+            row = JornadaDia(user_id=user_id, data_local=key[1], version=known_version)
+            make_transient_to_detached(row)
+        db.add(row)
+    else:
+        row = db.get(JornadaDia, key)
+    if not pontos:
+        if row is not None:
+            db.delete(row)
+        return None
+    if row is None:
+        row = JornadaDia(user_id=user_id, data_local=key[1])
+        db.add(row)
+    _fill_jornada_dia(row, date_str, pontos)
+    return row
+
+
+def load_jornada_dia(db: Session, user_id: int, date_str: str) -> tuple[int, list[JornadaSegmentOut], list[str], int, bool]:
+    """Return (total_s, segmentos, alertas, batidas, has_intervalo) for one employee-day."""
+    row = db.get(JornadaDia, (user_id, date.fromisoformat(date_str)))
+    if row is None:
+        # No materialized row: either no pontos that day or the table was not backfilled yet.
+        pontos = _query_pontos_do_dia(db, user_id, date_str)
+        total_s, segmentos, alertas = compute_jornada_from_pontos(date_str, pontos)
+        return total_s, segmentos, alertas, len(pontos), _has_intervalo(pontos)
+
+    segmentos = [JornadaSegmentOut(**s) for s in json.loads(row.segmentos_json)]
+    alertas = json.loads(row.alertas_json)
+    return row.total_trabalhado_segundos, segmentos, alertas, row.batidas, bool(row.has_intervalo)
+
+
+def rebuild_jornada_dia(db: Session, user_id: int | None = None, batch_size: int = 1000) -> int:
+    delete_q = db.query(JornadaDia)
+    pontos_q = db.query(Ponto)
+    if user_id is not None:
+        delete_q = delete_q.filter(JornadaDia.user_id == user_id)
+        pontos_q = pontos_q.filter(Ponto.user_id == user_id)
+    delete_q.delete(synchronize_session=False)
+
+    rebuilt = 0
+    current_key: tuple[int, str] | None = None
+    current_pontos: list[Ponto] = []
+
+    def flush_day() -> None:
+        nonlocal rebuilt
+        if current_key is None:
+            return
+        row = JornadaDia(user_id=current_key[0], data_local=date.fromisoformat(current_key[1]))
+        _fill_jornada_dia(row, current_key[1], current_pontos)
+        db.add(row)
+        rebuilt += 1
+        if rebuilt % batch_size == 0:
+            db.flush()
+
+    for p in pontos_q.order_by(Ponto.user_id, Ponto.registrado_em).yield_per(batch_size):
+        key = (p.user_id, sp_date_of(p.registrado_em))
+        if key != current_key:
+            flush_day()
+            current_key = key
+            current_pontos = []
+        current_pontos.append(p)
+    flush_day()
+
+    db.commit()
+    return rebuilt
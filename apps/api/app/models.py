@@ -1,11 +1,29 @@
 import enum
-from datetime import datetime
-
-from sqlalchemy import Boolean, DateTime, Enum, Float, ForeignKey, Integer, String, Text
-from sqlalchemy.orm import Mapped, mapped_column, relationship
-
+from datetime import date, datetime
+
+from sqlalchemy import (
+    Boolean,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    text,
+)
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+
+from app.core.timeutil import utc_naive_to_sp
 from app.db.base import Base
 
+def ponto_data_local(registrado_em: datetime) -> date:
+    """Return the São Paulo workday of a UTC-naive timestamp (zoneinfo, so historical DST is honoured)."""
+    return utc_naive_to_sp(registrado_em).date()
+
 
 class UserRole(str, enum.Enum):
     admin = "admin"
@@ -20,7 +38,9 @@ class User(Base):
     password_hash: Mapped[str] = mapped_column(String(255))
     role: Mapped[UserRole] = mapped_column(Enum(UserRole), default=UserRole.employee, index=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    auth_generation: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    deactivated_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
     employee_profile: Mapped["EmployeeProfile"] = relationship(back_populates="user", uselist=False)
 
@@ -38,7 +58,7 @@ class EmployeeProfile(Base):
 class EmployeeAuthPolicy(Base):
     __tablename__ = "employee_auth_policy"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True, default=1)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
     employee_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), unique=True, index=True)
     allow_password_login: Mapped[bool] = mapped_column(Boolean, default=True)
     allow_face_login: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -47,6 +67,7 @@ class EmployeeAuthPolicy(Base):
 
 class EmployeeDevice(Base):
     __tablename__ = "employee_devices"
+    __table_args__ = (Index("ix_employee_devices_employee_user_id_revoked_at", "employee_user_id", "revoked_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     employee_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -59,10 +80,12 @@ class EmployeeDevice(Base):
 
 class DevicePairingCode(Base):
     __tablename__ = "device_pairing_codes"
+    __table_args__ = (Index("ix_device_pairing_codes_consumed_at_expires_at", "consumed_at", "expires_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     employee_user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
     code_hash: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    code_lookup: Mapped[str | None] = mapped_column(String(64), nullable=True, unique=True, index=True)
     expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     consumed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -78,6 +101,17 @@ class PontoTipo(str, enum.Enum):
 
 class Ponto(Base):
     __tablename__ = "pontos"
+    __table_args__ = (
+        Index("ix_pontos_user_id_registrado_em", "user_id", "registrado_em"),
+        Index("ix_pontos_user_id_data_local", "user_id", "data_local", "registrado_em"),
+        # Only rows written by a previous release: keeps the startup probe and the backfill from scanning the table.
+        Index(
+            "ix_pontos_sem_data_local",
+            "id",
+            sqlite_where=text("data_local IS NULL"),
+            postgresql_where=text("data_local IS NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), index=True)
@@ -87,6 +121,52 @@ class Ponto(Base):
     lng: Mapped[float] = mapped_column(Float)
     accuracy_m: Mapped[float | None] = mapped_column(Float, nullable=True)
     distancia_m: Mapped[float | None] = mapped_column(Float, nullable=True)
+    local_id: Mapped[int | None] = mapped_column(ForeignKey("locais.id"), nullable=True, index=True)
+    # Workday in São Paulo, kept in step with registrado_em so day lookups and per-day reports stay in SQL.
+    # Nullable only so workers still on the previous release can insert while the migration rolls out.
+    data_local: Mapped[date | None] = mapped_column(Date, nullable=True)
+
+    @validates("registrado_em")
+    def _set_data_local(self, _key: str, registrado_em: datetime) -> datetime:
+        self.data_local = ponto_data_local(registrado_em)
+        return registrado_em
+
+
+class Local(Base):
+    __tablename__ = "locais"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    nome: Mapped[str] = mapped_column(String(255))
+    lat: Mapped[float] = mapped_column(Float)
+    lng: Mapped[float] = mapped_column(Float)
+    raio_m: Mapped[int] = mapped_column(Integer)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class LocalFuncionario(Base):
+    __tablename__ = "local_funcionarios"
+
+    local_id: Mapped[int] = mapped_column(ForeignKey("locais.id"), primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True, index=True)
+
+
+class DistanciaRecomputeJob(Base):
+    __tablename__ = "distancia_recompute_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    local_id: Mapped[int | None] = mapped_column(ForeignKey("locais.id"), nullable=True)
+    ref_lat: Mapped[float] = mapped_column(Float)
+    ref_lng: Mapped[float] = mapped_column(Float)
+    status: Mapped[str] = mapped_column(String(16), default="pending")
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    processed: Mapped[int] = mapped_column(Integer, default=0)
+    last_ponto_id: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
 
 class ConfigLocal(Base):
@@ -136,3 +216,64 @@ class JornadaValidationConfig(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, default=1)
     intervalo_exige_4_batidas_blocking: Mapped[bool] = mapped_column(Boolean, default=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class BancoHorasConfig(Base):
+    __tablename__ = "banco_horas_config"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, default=1)
+    carga_diaria_minutos: Mapped[int] = mapped_column(Integer, default=480)
+    # Weekdays with expected work, Monday=0 (date.weekday()), comma separated.
+    dias_semana: Mapped[str] = mapped_column(String(16), default="0,1,2,3,4")
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class BancoHorasDia(Base):
+    __tablename__ = "banco_horas_dia"
+
+    # One row per closed day from the employee's first ponto on, including days without pontos.
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    data_local: Mapped[date] = mapped_column(Date, primary_key=True)
+    trabalhado_segundos: Mapped[int] = mapped_column(Integer, default=0)
+    # Frozen when the day is closed, so a later workload change does not rewrite history.
+    esperado_segundos: Mapped[int] = mapped_column(Integer, default=0)
+    saldo_segundos: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class BancoHorasSaldo(Base):
+    __tablename__ = "banco_horas_saldo"
+
+    # Accumulated balance up to and including ate_data (the last day of each closed month).
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    ate_data: Mapped[date] = mapped_column(Date, primary_key=True)
+    saldo_segundos: Mapped[int] = mapped_column(Integer, default=0)
+
+
+class JornadaDia(Base):
+    __tablename__ = "jornada_dia"
+
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), primary_key=True)
+    data_local: Mapped[date] = mapped_column(Date, primary_key=True)
+    total_trabalhado_segundos: Mapped[int] = mapped_column(Integer, default=0)
+    segmentos_json: Mapped[str] = mapped_column(Text, default="[]")
+    alertas_json: Mapped[str] = mapped_column(Text, default="[]")
+    batidas: Mapped[int] = mapped_column(Integer, default=0)
+    has_intervalo: Mapped[bool] = mapped_column(Boolean, default=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Bumped by every ORM write, so a worker's cached punch state can tell when another worker changed the day.
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+    __mapper_args__ = {"version_id_col": version}
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_id_key"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
+    key: Mapped[str] = mapped_column(String(128))
+    request_hash: Mapped[str] = mapped_column(String(64))
+    status_code: Mapped[int] = mapped_column(Integer)
+    response_json: Mapped[str] = mapped_column(Text)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
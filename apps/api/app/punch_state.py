@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import JornadaDia, Ponto
+
+
+@dataclass(frozen=True)
+class PunchState:
+    last_tipo: str | None
+    last_at: datetime | None
+    batidas: int
+    # jornada_dia.version this state was read at; None while the day has no row.
+    version: int | None
+
+
+class PunchStateCache:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._entries: OrderedDict[tuple[int, str], PunchState] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, date_str: str) -> PunchState | None:
+        with self._lock:
+            state = self._entries.get((user_id, date_str))
+            if state is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((user_id, date_str))
+            self.hits += 1
+            return state
+
+    def put(self, user_id: int, date_str: str, state: PunchState) -> None:
+        with self._lock:
+            self._entries[(user_id, date_str)] = state
+            self._entries.move_to_end((user_id, date_str))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int, date_str: str) -> None:
+        with self._lock:
+            self._entries.pop((user_id, date_str), None)
+
+    def mark_stale(self, user_id: int, date_str: str) -> None:
+        with self._lock:
+            self.stale += 1
+            self._entries.pop((user_id, date_str), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+punch_state_cache = PunchStateCache(max_entries=settings.punch_state_cache_max_entries)
+
+
+def load_punch_state(db: Session, user_id: int, date_str: str) -> PunchState:
+    pontos = db.execute(
+        select(Ponto.tipo, Ponto.registrado_em)
+        .where(Ponto.user_id == user_id)
+        .where(Ponto.data_local == date.fromisoformat(date_str))
+        .order_by(Ponto.registrado_em)
+    ).all()
+    version = db.execute(
+        select(JornadaDia.version)
+        .where(JornadaDia.user_id == user_id)
+        .where(JornadaDia.data_local == date.fromisoformat(date_str))
+    ).scalar_one_or_none()
+    last = pontos[-1] if pontos else None
+    return PunchState(
+        last_tipo=last.tipo.value if last else None,
+        last_at=last.registrado_em if last else None,
+        batidas=len(pontos),
+        version=version,
+    )
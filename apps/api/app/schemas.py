@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Literal
+from typing import Annotated, Literal
 
 from pydantic import BaseModel, EmailStr, Field
 
@@ -37,6 +37,20 @@ class EmployeeOut(BaseModel):
     is_active: bool
 
 
+class EmployeeImportRowResult(BaseModel):
+    linha: int
+    email: str | None = None
+    ok: bool
+    detail: str | None = None
+    id: int | None = None
+
+
+class EmployeeImportOut(BaseModel):
+    created: int
+    rejected: int
+    results: list[EmployeeImportRowResult]
+
+
 class EmployeeUpdate(BaseModel):
     email: EmailStr
     nome: str = Field(min_length=1)
@@ -93,6 +107,46 @@ class ConfigLocalOut(BaseModel):
     updated_at: datetime
 
 
+class LocalUpsert(BaseModel):
+    nome: str = Field(min_length=1, max_length=255)
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
+    raio_m: int = Field(gt=0)
+    is_active: bool = True
+
+
+class LocalOut(BaseModel):
+    id: int
+    nome: str
+    lat: float
+    lng: float
+    raio_m: int
+    is_active: bool
+    user_ids: list[int]
+    updated_at: datetime
+
+
+class LocalFuncionariosSet(BaseModel):
+    user_ids: list[int]
+
+
+class DistanciaRecomputeCreate(BaseModel):
+    local_id: int | None = None
+
+
+class DistanciaRecomputeJobOut(BaseModel):
+    id: int
+    local_id: int | None
+    status: str
+    total: int
+    processed: int
+    last_ponto_id: int
+    error: str | None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: datetime | None
+
+
 class PontoCorrectionConfigOut(BaseModel):
     window_days: int
     updated_at: datetime
@@ -111,6 +165,18 @@ class JornadaValidationConfigUpsert(BaseModel):
     intervalo_exige_4_batidas_blocking: bool
 
 
+class BancoHorasConfigOut(BaseModel):
+    carga_diaria_minutos: int
+    dias_semana: list[int]
+    updated_at: datetime
+
+
+class BancoHorasConfigUpsert(BaseModel):
+    carga_diaria_minutos: int = Field(ge=0, le=1440)
+    # 0 = segunda ... 6 = domingo
+    dias_semana: list[Annotated[int, Field(ge=0, le=6)]]
+
+
 PontoTipo = Literal["entrada", "saida", "intervalo_inicio", "intervalo_fim"]
 
 
@@ -128,6 +194,18 @@ class PontoAutoCreate(BaseModel):
     accuracy_m: float | None = None
 
 
+class PontoBatchItem(BaseModel):
+    tipo: PontoTipo | None = None
+    registrado_em: datetime
+    lat: float
+    lng: float
+    accuracy_m: float | None = None
+
+
+class PontoBatchCreate(BaseModel):
+    items: list[PontoBatchItem] = Field(min_length=1, max_length=200)
+
+
 class PontoOut(BaseModel):
     id: int
     tipo: PontoTipo
@@ -136,6 +214,21 @@ class PontoOut(BaseModel):
     lng: float
     accuracy_m: float | None
     distancia_m: float | None
+    local_id: int | None = None
+
+
+class PontoBatchItemResult(BaseModel):
+    index: int
+    ok: bool
+    status_code: int
+    detail: str | None = None
+    ponto: PontoOut | None = None
+
+
+class PontoBatchOut(BaseModel):
+    accepted: int
+    rejected: int
+    results: list[PontoBatchItemResult]
 
 
 class PontoAdminOut(PontoOut):
@@ -216,3 +309,43 @@ class JornadaDiaAdminOut(JornadaDiaOut):
     user_id: int
     email: EmailStr
     nome: str
+
+
+class JornadaMesFuncionarioOut(BaseModel):
+    user_id: int
+    email: EmailStr
+    nome: str
+    total_trabalhado_segundos: int
+    total_trabalhado_hhmm: str
+    dias: list[JornadaDiaOut]
+
+
+class JornadaMesOut(BaseModel):
+    month: str
+    funcionarios: list[JornadaMesFuncionarioOut]
+
+
+class BancoHorasDiaOut(BaseModel):
+    data: str
+    trabalhado_segundos: int
+    esperado_segundos: int
+    saldo_segundos: int
+    saldo_hhmm: str
+    acumulado_segundos: int
+    acumulado_hhmm: str
+
+
+class BancoHorasOut(BaseModel):
+    ate: str
+    saldo_segundos: int
+    saldo_hhmm: str
+    inicio: str
+    fim: str
+    saldo_anterior_segundos: int
+    dias: list[BancoHorasDiaOut]
+
+
+class BancoHorasAdminOut(BancoHorasOut):
+    user_id: int
+    email: EmailStr
+    nome: str
@@ -0,0 +1,541 @@
+"""Focused benchmarks run by `python -m benchmarks.run --cases ...` after the load test.
+
+Each case gets the running server and the seeded dataset, prints one summary and returns the numbers that go into
+the report under "cases".
+"""
+
+import http.client
+import json
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+SP_TZ = ZoneInfo("America/Sao_Paulo")
+
+
+@dataclass(frozen=True)
+class CaseContext:
+    port: int
+    dataset: object
+    settings: object
+    args: object
+
+    def rng(self, salt: int) -> random.Random:
+        return random.Random(self.args.seed * 1_000 + salt)
+
+
+def geofence(ctx: CaseContext) -> dict:
+    """Grid index against a linear haversine scan, with `--geofence-sites` random sites."""
+    from app.geofence import Site, SiteGridIndex, haversine_distance_m
+
+    rng = ctx.rng(12)
+    # Spread over roughly the state of São Paulo, with the radii the admin usually sets.
+    sites = [
+        Site(i, rng.uniform(-25, -20), rng.uniform(-53, -44), rng.randint(100, 500))
+        for i in range(1, ctx.args.geofence_sites + 1)
+    ]
+    started = time.perf_counter()
+    index = SiteGridIndex(sites, {}, cell_m=ctx.settings.geofence_grid_cell_m)
+    build_s = time.perf_counter() - started
+
+    # 70% of the punches near a site, the rest anywhere in the box.
+    points = []
+    for _ in range(20_000):
+        if rng.random() < 0.7:
+            site = rng.choice(sites)
+            points.append((site.lat + rng.uniform(-0.003, 0.003), site.lng + rng.uniform(-0.003, 0.003)))
+        else:
+            points.append((rng.uniform(-25, -20), rng.uniform(-53, -44)))
+
+    started = time.perf_counter()
+    grid = [index.match(0, lat, lng).local_id for lat, lng in points]
+    grid_s = time.perf_counter() - started
+
+    def linear(lat: float, lng: float) -> int | None:
+        best: tuple[float, int] | None = None
+        for site in sites:
+            d = haversine_distance_m(lat, lng, site.lat, site.lng)
+            if d <= site.raio_m and (best is None or d < best[0]):
+                best = (d, site.id)
+        return best[1] if best else None
+
+    # The scan is slow enough that a sample gives a stable rate.
+    sample = points[:500]
+    started = time.perf_counter()
+    scanned = [linear(lat, lng) for lat, lng in sample]
+    linear_s = time.perf_counter() - started
+
+    result = {
+        "sites": len(sites),
+        "build_ms": round(build_s * 1000, 1),
+        "grid_lookups_per_s": round(len(points) / grid_s),
+        "linear_lookups_per_s": round(len(sample) / linear_s),
+        "same_result": grid[: len(sample)] == scanned,
+    }
+    print(
+        f"geofence: {result['sites']} locais, índice em {result['build_ms']} ms, "
+        f"grade {result['grid_lookups_per_s']:,} consultas/s, varredura {result['linear_lookups_per_s']:,} consultas/s, "
+        f"mesmo resultado: {result['same_result']}"
+    )
+    return result
+
+
+def _get(conn: http.client.HTTPConnection, path: str, headers: dict) -> bytes:
+    conn.request("GET", path, headers=headers)
+    response = conn.getresponse()
+    body = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{path}: status {response.status}")
+    return body
+
+
+def lists(ctx: CaseContext) -> dict:
+    """One 500-row page of each list endpoint: median latency of 40 requests and peak allocation of one."""
+    employee = ctx.dataset.employees[2]
+    conn = http.client.HTTPConnection("127.0.0.1", ctx.port, timeout=60)
+    try:
+        conn.request(
+            "POST",
+            "/auth/device-login",
+            body=json.dumps({"device_id": employee.device_id, "device_secret": employee.device_secret}),
+            headers={"Content-Type": "application/json"},
+        )
+        employee_token = json.loads(conn.getresponse().read())["access_token"]
+        admin = {"Authorization": f"Bearer {_admin_token(ctx)}"}
+        me = {"Authorization": f"Bearer {employee_token}", "X-Device-Id": employee.device_id}
+        routes = {
+            "GET /admin/pontos": (f"/admin/pontos?user_id={employee.user_id}&limit=500", admin),
+            "GET /pontos/me": ("/pontos/me?limit=500", me),
+            "GET /admin/pontos/audit": ("/admin/pontos/audit?limit=500", admin),
+            "GET /admin/funcionarios": ("/admin/funcionarios?limit=500", admin),
+        }
+        result = {}
+        for route, (path, headers) in routes.items():
+            body = json.loads(_get(conn, path, headers))
+            rows = len(body["items"] if isinstance(body, dict) else body)
+            timings = []
+            for _ in range(40):
+                started = time.perf_counter()
+                _get(conn, path, headers)
+                timings.append(time.perf_counter() - started)
+            # Process-wide, so the server thread's allocations are in it; the client only keeps the raw bytes.
+            tracemalloc.start()
+            _get(conn, path, headers)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            median = statistics.median(timings)
+            result[route] = {
+                "rows": rows,
+                "median_ms": round(median * 1000, 1),
+                "rows_per_s": round(rows / median),
+                "peak_alloc_kib": round(peak / 1024),
+            }
+            r = result[route]
+            print(
+                f"lists {route:<24} {rows:>4} linhas  mediana {r['median_ms']:>6} ms  {r['rows_per_s']:>7,} linhas/s  "
+                f"pico de alocação {r['peak_alloc_kib']:>5,} KiB"
+            )
+    finally:
+        conn.close()
+    return result
+
+
+def _median_ms(fn, repeats: int) -> tuple[float, object]:
+    timings, value = [], None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        value = fn()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 1), value
+
+
+def month(ctx: CaseContext) -> dict:
+    """Last month's pontos per employee and day: GROUP BY data_local against bucketing a UTC range in Python."""
+    from sqlalchemy import func, select
+
+    from app.db.session import SessionLocal
+    from app.models import Ponto
+
+    today = datetime.now(tz=SP_TZ).date()
+    first = (today.replace(day=1) - timedelta(days=1)).replace(day=1)
+    after = today.replace(day=1)
+
+    def utc(day: date) -> datetime:
+        return datetime.combine(day, dtime(0, 0), tzinfo=SP_TZ).astimezone(timezone.utc).replace(tzinfo=None)
+
+    db = SessionLocal()
+    try:
+        def python_buckets() -> dict:
+            # What the month view did before data_local: every row converted to São Paulo time.
+            groups: dict = defaultdict(int)
+            rows = db.execute(
+                select(Ponto.user_id, Ponto.registrado_em).where(
+                    Ponto.registrado_em >= utc(first), Ponto.registrado_em < utc(after)
+                )
+            )
+            for user_id, registrado_em in rows:
+                groups[(user_id, registrado_em.replace(tzinfo=timezone.utc).astimezone(SP_TZ).date())] += 1
+            return dict(groups)
+
+        def grouped() -> dict:
+            rows = db.execute(
+                select(Ponto.user_id, Ponto.data_local, func.count())
+                .where(Ponto.data_local >= first, Ponto.data_local < after)
+                .group_by(Ponto.user_id, Ponto.data_local)
+            )
+            return {(user_id, day): n for user_id, day, n in rows}
+
+        python_ms, python_groups = _median_ms(python_buckets, 7)
+        grouped_ms, grouped_groups = _median_ms(grouped, 7)
+    finally:
+        db.close()
+
+    headers = {"Authorization": f"Bearer {_admin_token(ctx)}"}
+    conn = http.client.HTTPConnection("127.0.0.1", ctx.port, timeout=120)
+    try:
+        path = f"/admin/jornada/mes?month={first:%Y-%m}"
+        all_ms, _ = _median_ms(lambda: _get(conn, path, headers), 3)
+        user_path = f"{path}&user_id={ctx.dataset.employees[3].user_id}"
+        user_ms, _ = _median_ms(lambda: _get(conn, user_path, headers), 21)
+    finally:
+        conn.close()
+
+    result = {
+        "month": f"{first:%Y-%m}",
+        "groups": len(grouped_groups),
+        "python_buckets_ms": python_ms,
+        "group_by_ms": grouped_ms,
+        "same_groups": python_groups == grouped_groups,
+        "jornada_mes_ms": all_ms,
+        "jornada_mes_user_ms": user_ms,
+    }
+    print(
+        f"month {result['month']}: {result['groups']:,} grupos funcionário/dia; Python {python_ms} ms, "
+        f"GROUP BY {grouped_ms} ms (iguais: {result['same_groups']}); GET /admin/jornada/mes {all_ms} ms, "
+        f"um funcionário {user_ms} ms"
+    )
+    return result
+
+
+def concurrency(ctx: CaseContext) -> dict:
+    """`--writers` threads inserting pontos while `--readers` list them, through the engine profile of the backend."""
+    from sqlalchemy import func, select
+
+    from app.db.session import SessionLocal, engine
+    from app.models import Ponto, PontoTipo
+
+    user_id = ctx.dataset.employees[1].user_id
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + ctx.args.concurrency_seconds
+
+    def count(key: str) -> None:
+        with lock:
+            counts[key] += 1
+
+    def writer() -> None:
+        while time.monotonic() < deadline:
+            db = SessionLocal()
+            try:
+                db.add(Ponto(user_id=user_id, tipo=PontoTipo.entrada, registrado_em=datetime.utcnow(), lat=0.0, lng=0.0))
+                db.commit()
+                count("writes")
+            except Exception:
+                # "database is locked" on SQLite, pool timeouts elsewhere: what the profile is meant to avoid.
+                count("errors")
+            finally:
+                db.close()
+
+    def reader() -> None:
+        while time.monotonic() < deadline:
+            db = SessionLocal()
+            try:
+                db.execute(
+                    select(Ponto.id, Ponto.tipo, Ponto.registrado_em)
+                    .where(Ponto.user_id == user_id)
+                    .order_by(Ponto.registrado_em.desc())
+                    .limit(200)
+                ).all()
+                db.execute(select(func.count(Ponto.id))).scalar_one()
+                count("reads")
+            except Exception:
+                count("errors")
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=writer) for _ in range(ctx.args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(ctx.args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    seconds = ctx.args.concurrency_seconds
+    result = {
+        "database": engine.dialect.name,
+        "writers": ctx.args.writers,
+        "readers": ctx.args.readers,
+        "seconds": seconds,
+        "writes_per_s": round(counts["writes"] / seconds, 1),
+        "reads_per_s": round(counts["reads"] / seconds, 1),
+        "errors": counts["errors"],
+    }
+    print(
+        f"concurrency: {result['writers']} escritores + {result['readers']} leitores por {seconds}s "
+        f"({result['database']}): {result['writes_per_s']} escritas/s, {result['reads_per_s']} leituras/s, "
+        f"{result['errors']} erros"
+    )
+    return result
+
+
+def _rss_anon_kb() -> int | None:
+    # Anonymous memory only: SQLite's mmap of the database file would otherwise grow with every row read.
+    try:
+        with open("/proc/self/status", encoding="ascii") as status:
+            for line in status:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class _PeakRss:
+    """Highest RssAnon seen while the block runs (Linux only; None elsewhere)."""
+
+    def __init__(self) -> None:
+        self.baseline = _rss_anon_kb()
+        self.peak = self.baseline
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self) -> None:
+        while not self._stop.wait(0.01):
+            current = _rss_anon_kb()
+            if current is not None and current > self.peak:
+                self.peak = current
+
+    def __enter__(self) -> "_PeakRss":
+        if self.baseline is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    @property
+    def growth_mb(self) -> float | None:
+        return None if self.baseline is None else round((self.peak - self.baseline) / 1024, 1)
+
+
+def _admin_token(ctx: CaseContext) -> str:
+    conn = http.client.HTTPConnection("127.0.0.1", ctx.port, timeout=60)
+    try:
+        body = json.dumps({"email": ctx.settings.admin_email, "password": ctx.settings.admin_password})
+        conn.request("POST", "/auth/login", body=body, headers={"Content-Type": "application/json"})
+        return json.loads(conn.getresponse().read())["access_token"]
+    finally:
+        conn.close()
+
+
+def _seed_export_rows(user_id: int, rows: int, first_day: date, spacing_s: int) -> None:
+    from sqlalchemy import insert
+
+    from app.db.session import SessionLocal
+    from app.models import Ponto, PontoTipo, ponto_data_local
+
+    tipos = list(PontoTipo)
+    start = datetime.combine(first_day, dtime(0, 0), tzinfo=SP_TZ).astimezone(timezone.utc).replace(tzinfo=None)
+    db = SessionLocal()
+    try:
+        # Chunk by chunk, so the seeding itself does not hold a million dicts.
+        for offset in range(0, rows, 10_000):
+            chunk = []
+            for i in range(offset, min(offset + 10_000, rows)):
+                registrado_em = start + timedelta(seconds=i * spacing_s)
+                chunk.append(
+                    {
+                        "user_id": user_id,
+                        "tipo": tipos[i % len(tipos)],
+                        "registrado_em": registrado_em,
+                        "data_local": ponto_data_local(registrado_em),
+                        "lat": -23.5505,
+                        "lng": -46.6333,
+                        "accuracy_m": 5.0,
+                        "distancia_m": 10.0,
+                    }
+                )
+            db.execute(insert(Ponto), chunk)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _stream_export(port: int, token: str, path: str) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=600)
+    try:
+        with _PeakRss() as rss:
+            started = time.perf_counter()
+            conn.request("GET", path, headers={"Authorization": f"Bearer {token}"})
+            response = conn.getresponse()
+            size, first_chunk_s = 0, None
+            # Read and drop, like a client saving to disk: the body must never be held in memory here.
+            while chunk := response.read(64 * 1024):
+                if first_chunk_s is None:
+                    first_chunk_s = time.perf_counter() - started
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+        if response.status != 200:
+            raise RuntimeError(f"{path}: status {response.status}")
+    finally:
+        conn.close()
+    return {
+        "mb": round(size / 1e6, 1),
+        "seconds": round(elapsed, 2),
+        "first_chunk_ms": round((first_chunk_s or elapsed) * 1000, 1),
+        "rss_growth_mb": rss.growth_mb,
+    }
+
+
+def export(ctx: CaseContext) -> dict:
+    """Stream `--export-rows` pontos as CSV and XLSX; memory must not grow with the row count."""
+    from sqlalchemy import func, select
+
+    from app.db.session import SessionLocal
+    from app.models import Ponto
+
+    user_id = ctx.dataset.employees[0].user_id
+    rows = ctx.args.export_rows
+    # 30 s apart, far before the seeded history, so a date range selects an exact share of them.
+    first_day, spacing_s = date(2000, 1, 1), 30
+    started = time.perf_counter()
+    _seed_export_rows(user_id, rows, first_day, spacing_s)
+    print(f"export: {rows:,} pontos semeados em {time.perf_counter() - started:.1f}s")
+
+    # About a tenth of the rows: if memory grew with the export, the full run would show ~10x the growth.
+    tenth_end = first_day + timedelta(days=max(1, rows // 10 // (86400 // spacing_s)) - 1)
+    db = SessionLocal()
+    try:
+        count = db.execute(select(func.count()).where(Ponto.user_id == user_id)).scalar_one()
+        tenth_count = db.execute(
+            select(func.count()).where(Ponto.user_id == user_id, Ponto.data_local <= tenth_end)
+        ).scalar_one()
+    finally:
+        db.close()
+
+    token = _admin_token(ctx)
+    result: dict = {"rows": count, "tenth_rows": tenth_count}
+    for fmt in ("csv", "xlsx"):
+        tenth = _stream_export(ctx.port, token, f"/admin/pontos/export?format={fmt}&user_id={user_id}&end={tenth_end}")
+        full = _stream_export(ctx.port, token, f"/admin/pontos/export?format={fmt}&user_id={user_id}")
+        full["rows_per_s"] = round(count / full["seconds"])
+        result[fmt] = {"full": full, "tenth": tenth}
+        print(
+            f"export {fmt}: {count:,} linhas, {full['mb']} MB em {full['seconds']}s ({full['rows_per_s']:,} linhas/s), "
+            f"primeiro bloco {full['first_chunk_ms']} ms; RssAnon +{full['rss_growth_mb']} MB "
+            f"(com {tenth_count:,} linhas: +{tenth['rss_growth_mb']} MB)"
+        )
+    return result
+
+
+def pairing(ctx: CaseContext) -> dict:
+    """`POST /pair-device` with 10, 1k and 10k live pairing codes: the keyed lookup must keep the cost flat."""
+    import secrets
+
+    from sqlalchemy import func, insert, select
+
+    from app.core.security import hash_password, pairing_code_lookup_id
+    from app.db.session import SessionLocal
+    from app.models import DevicePairingCode
+
+    conn = http.client.HTTPConnection("127.0.0.1", ctx.port, timeout=60)
+    headers = {"Authorization": f"Bearer {_admin_token(ctx)}", "Content-Type": "application/json"}
+    # A new employee: each pairing revokes the previous device, which would break the seeded ones.
+    conn.request(
+        "POST",
+        "/admin/funcionarios",
+        body=json.dumps({"email": "pareamento.bench@teste.com", "password": "1234", "nome": "Pareamento", "genero": "mulher"}),
+        headers=headers,
+    )
+    response = conn.getresponse()
+    body = json.loads(response.read())
+    if response.status != 200:
+        raise RuntimeError(f"/admin/funcionarios: status {response.status}")
+    user_id = body["id"]
+
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    repeats = 11
+    result: dict = {}
+    db = SessionLocal()
+    try:
+        for live in (10, 1_000, 10_000):
+            current = db.execute(
+                select(func.count()).where(
+                    DevicePairingCode.consumed_at.is_(None), DevicePairingCode.expires_at > datetime.utcnow()
+                )
+            ).scalar_one()
+            # Codes that are never redeemed: they only have to be live and indexed, so their hash is a placeholder.
+            filler = [secrets.token_urlsafe(9) for _ in range(max(0, live - current))]
+            if filler:
+                db.execute(
+                    insert(DevicePairingCode),
+                    [
+                        {
+                            "employee_user_id": user_id,
+                            "code_hash": f"bench${code}",
+                            "code_lookup": pairing_code_lookup_id(code),
+                            "expires_at": expires_at,
+                        }
+                        for code in filler
+                    ],
+                )
+            codes = [secrets.token_urlsafe(9) for _ in range(repeats)]
+            db.execute(
+                insert(DevicePairingCode),
+                [
+                    {
+                        "employee_user_id": user_id,
+                        "code_hash": hash_password(code),
+                        "code_lookup": pairing_code_lookup_id(code),
+                        "expires_at": expires_at,
+                    }
+                    for code in codes
+                ],
+            )
+            db.commit()
+
+            timings = []
+            for i, code in enumerate(codes):
+                payload = json.dumps({"code": code, "device_id": f"bench-pair-{live}-{i}"})
+                started = time.perf_counter()
+                conn.request("POST", "/pair-device", body=payload, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                timings.append(time.perf_counter() - started)
+                if response.status != 200:
+                    raise RuntimeError(f"/pair-device: status {response.status}")
+            result[str(live)] = {"median_ms": round(statistics.median(timings) * 1000, 1)}
+            print(f"pairing: {live:>6,} códigos ativos, POST /pair-device mediana {result[str(live)]['median_ms']} ms")
+    finally:
+        db.close()
+        conn.close()
+    return result
+
+
+# Run in this order; cases that add rows to the database go last so they do not change the others.
+CASES = {
+    "geofence": geofence,
+    "lists": lists,
+    "month": month,
+    "concurrency": concurrency,
+    "pairing": pairing,
+    "export": export,
+}
@@ -0,0 +1,340 @@
+import argparse
+import http.client
+import json
+import os
+import platform
+import queue
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+API_DIR = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# The app's first tap of the day (auto picks entrada), then the other three punches.
+_DAY_TIPOS = [None, "intervalo_inicio", "intervalo_fim", "saida"]
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, route: str, status: int, seconds: float) -> None:
+        with self._lock:
+            self.latencies[route].append(seconds)
+            self.statuses[route][status] += 1
+
+
+class Client:
+    """One keep-alive connection per virtual user, like a phone or a browser tab."""
+
+    def __init__(self, port: int, recorder: Recorder | None) -> None:
+        self._conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        self._recorder = recorder
+        self.token: str | None = None
+        self.device_id: str | None = None
+
+    def request(self, route: str, method: str, path: str, body: dict | None = None, headers: dict | None = None):
+        all_headers = {"Content-Type": "application/json", **(headers or {})}
+        if self.token:
+            all_headers["Authorization"] = f"Bearer {self.token}"
+        if self.device_id:
+            all_headers["X-Device-Id"] = self.device_id
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        started = time.perf_counter()
+        self._conn.request(method, path, body=payload, headers=all_headers)
+        response = self._conn.getresponse()
+        data = response.read()
+        elapsed = time.perf_counter() - started
+        if self._recorder is not None:
+            self._recorder.add(route, response.status, elapsed)
+        is_json = (response.getheader("Content-Type") or "").startswith("application/json")
+        return response, (json.loads(data) if data and is_json else None)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    # Nearest-rank: always an observed latency, stable across runs with the same request count.
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _employee_day(port: int, recorder: Recorder, employee, rng: random.Random, today: str, site: tuple[float, float]) -> None:
+    client = Client(port, recorder)
+    try:
+        response, body = client.request(
+            "POST /auth/device-login",
+            "POST",
+            "/auth/device-login",
+            {"device_id": employee.device_id, "device_secret": employee.device_secret},
+        )
+        if response.status != 200:
+            return
+        client.token = body["access_token"]
+        client.device_id = employee.device_id
+        for tipo in _DAY_TIPOS:
+            punch = {
+                "lat": site[0] + rng.uniform(-0.0005, 0.0005),
+                "lng": site[1] + rng.uniform(-0.0005, 0.0005),
+                "accuracy_m": rng.uniform(3, 30),
+            }
+            headers = {"Idempotency-Key": uuid.UUID(int=rng.getrandbits(128)).hex}
+            if tipo is None:
+                client.request("POST /pontos/auto", "POST", "/pontos/auto", punch, headers)
+            else:
+                # /pontos/auto waits 15s between punches, even with a new Idempotency-Key; the rest of the day
+                # is compressed into seconds, so it is punched with the explicit tipo.
+                client.request("POST /pontos", "POST", "/pontos", {**punch, "tipo": tipo}, headers)
+            client.request("GET /pontos/jornada", "GET", f"/pontos/jornada?date={today}")
+    finally:
+        client.close()
+
+
+def _admin_session(port: int, recorder: Recorder, iterations: int, user_ids: list[int], rng: random.Random, settings) -> None:
+    from app.api.pagination import NEXT_CURSOR_HEADER
+
+    client = Client(port, recorder)
+    try:
+        _, body = client.request(
+            "POST /auth/login", "POST", "/auth/login", {"email": settings.admin_email, "password": settings.admin_password}
+        )
+        client.token = body["access_token"]
+        for i in range(iterations):
+            user_id = rng.choice(user_ids)
+            response, _ = client.request("GET /admin/pontos", "GET", f"/admin/pontos?user_id={user_id}&limit=50")
+            cursor = response.getheader(NEXT_CURSOR_HEADER)
+            if cursor:
+                client.request("GET /admin/pontos", "GET", f"/admin/pontos?user_id={user_id}&limit=50&cursor={cursor}")
+            _, page = client.request("GET /admin/pontos/audit", "GET", "/admin/pontos/audit?limit=50")
+            if page and page.get("next_cursor"):
+                client.request("GET /admin/pontos/audit", "GET", f"/admin/pontos/audit?limit=50&cursor={page['next_cursor']}")
+            if i % 3 == 0:
+                client.request("GET /admin/pontos/audit?motivo_contains", "GET", "/admin/pontos/audit?limit=50&motivo_contains=atestado")
+    finally:
+        client.close()
+
+
+def _run_pool(jobs: list, concurrency: int) -> float:
+    pending: queue.Queue = queue.Queue()
+    for job in jobs:
+        pending.put(job)
+    errors: list[BaseException] = []
+
+    def worker() -> None:
+        while True:
+            try:
+                job = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                job()
+            except BaseException as exc:  # noqa: BLE001 - reported after the run
+                errors.append(exc)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(concurrency, len(jobs)) or 1)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    if errors:
+        raise RuntimeError(f"{len(errors)} virtual users failed; first error: {errors[0]!r}") from errors[0]
+    return wall
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(app) -> tuple[object, threading.Thread, int]:
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline or not thread.is_alive():
+            raise SystemExit("A API não subiu para o benchmark")
+        time.sleep(0.05)
+    return server, thread, port
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=API_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _summarize(recorder: Recorder, wall_seconds: float) -> dict:
+    routes = {}
+    for route in sorted(recorder.latencies):
+        values = sorted(recorder.latencies[route])
+        statuses = recorder.statuses[route]
+        routes[route] = {
+            "count": len(values),
+            "errors": sum(n for status, n in statuses.items() if status >= 400),
+            "statuses": {str(status): n for status, n in sorted(statuses.items())},
+            "rps": round(len(values) / wall_seconds, 2),
+            "mean_ms": round(sum(values) / len(values) * 1000, 2),
+            "p50_ms": round(_percentile(values, 50) * 1000, 2),
+            "p95_ms": round(_percentile(values, 95) * 1000, 2),
+            "p99_ms": round(_percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+    return routes
+
+
+def _print_report(report: dict, baseline: dict | None) -> None:
+    print(f"\n{'rota':<40} {'n':>6} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for route, r in report["routes"].items():
+        line = f"{route:<40} {r['count']:>6} {r['errors']:>5} {r['rps']:>8.1f} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+        before = (baseline or {}).get("routes", {}).get(route)
+        if before:
+            deltas = [
+                f"{key[:-3]} {((r[key] - before[key]) / before[key] * 100 if before[key] else 0):+.0f}%"
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+            ]
+            line += "   (" + ", ".join(deltas) + ")"
+        print(line)
+    print(f"\nwall {report['run']['wall_seconds']:.2f}s, {report['run']['requests']} requisições")
+
+
+def _case_list(value: str) -> list[str]:
+    from benchmarks.cases import CASES
+
+    names = list(CASES) if value == "all" else [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"casos desconhecidos: {', '.join(unknown)} (disponíveis: {', '.join(CASES)})")
+    return names
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Benchmark das rotas quentes da API")
+    parser.add_argument("--database-url", default=os.environ.get("PONTOFACIL_BENCH_DATABASE_URL"),
+                        help="Postgres dedicado e vazio (padrão: SQLite temporário)")
+    parser.add_argument("--employees", type=int, default=500, help="Funcionários semeados")
+    parser.add_argument("--days", type=int, default=60, help="Dias de histórico de pontos por funcionário")
+    parser.add_argument("--audits", type=int, default=20_000, help="Linhas de auditoria semeadas")
+    parser.add_argument("--virtual-employees", type=int, default=200, help="Funcionários que fazem o dia completo no teste")
+    parser.add_argument("--concurrency", type=int, default=32, help="Usuários virtuais simultâneos")
+    parser.add_argument("--admins", type=int, default=4, help="Sessões de admin navegando em paralelo")
+    parser.add_argument("--admin-iterations", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", type=Path, default=None, help="Arquivo JSON (padrão: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="JSON de uma rodada anterior para comparar")
+    parser.add_argument("--cases", type=_case_list, default=[],
+                        help="Casos focados depois da carga, separados por vírgula, ou 'all' (padrão: nenhum)")
+    parser.add_argument("--geofence-sites", type=int, default=10_000, help="Locais no caso geofence")
+    parser.add_argument("--writers", type=int, default=4, help="Threads gravando no caso concurrency")
+    parser.add_argument("--readers", type=int, default=4, help="Threads lendo no caso concurrency")
+    parser.add_argument("--concurrency-seconds", type=float, default=5.0, help="Duração do caso concurrency")
+    parser.add_argument("--export-rows", type=int, default=1_000_000, help="Pontos exportados no caso export")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    if not args.database_url:
+        tmpdir = tempfile.TemporaryDirectory(prefix="pontofacil-bench-")
+        args.database_url = f"sqlite:///{Path(tmpdir.name, 'bench.db').as_posix()}"
+    # Settings are read at import time, so the database has to be chosen before anything from app is imported.
+    os.environ["PONTOFACIL_DATABASE_URL"] = args.database_url
+    sys.path.insert(0, str(API_DIR))
+
+    from app.core.config import settings
+    from app.db.session import SessionLocal, engine
+    from benchmarks.seed import SITE_LAT, SITE_LNG, seed
+    import main as api_main
+
+    rng = random.Random(args.seed)
+    server, thread, port = _start_server(api_main.app)
+    try:
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            dataset = seed(db, args.employees, args.days, args.audits, rng)
+            print(f"seed: {len(dataset.employees)} funcionários, {dataset.pontos} pontos, {dataset.audits} auditorias "
+                  f"em {time.perf_counter() - started:.1f}s ({engine.dialect.name})")
+        finally:
+            db.close()
+
+        today = datetime.now(tz=ZoneInfo("America/Sao_Paulo")).date().isoformat()
+        site = (SITE_LAT, SITE_LNG)
+        user_ids = [e.user_id for e in dataset.employees]
+
+        # Warm-up (not recorded): imports, pools, caches and the first KDF call happen here, not in the numbers.
+        warm = dataset.employees[-1]
+        _employee_day(port, Recorder(), warm, random.Random(0), today, site)
+        _admin_session(port, Recorder(), 1, user_ids, random.Random(0), settings)
+
+        recorder = Recorder()
+        jobs = [
+            (lambda e=e, r=random.Random(args.seed + i): _employee_day(port, recorder, e, r, today, site))
+            for i, e in enumerate(dataset.employees[: min(args.virtual_employees, len(dataset.employees) - 1)])
+        ]
+        jobs += [
+            (lambda r=random.Random(args.seed * 31 + i): _admin_session(port, recorder, args.admin_iterations, user_ids, r, settings))
+            for i in range(args.admins)
+        ]
+        # Interleave employees and admins deterministically so the mix is the same every run.
+        random.Random(args.seed).shuffle(jobs)
+        wall = _run_pool(jobs, args.concurrency)
+
+        from benchmarks.cases import CASES, CaseContext
+
+        context = CaseContext(port=port, dataset=dataset, settings=settings, args=args)
+        cases = {name: CASES[name](context) for name in CASES if name in args.cases}
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        if tmpdir is not None:
+            engine.dispose()
+            tmpdir.cleanup()
+
+    commit = _git_commit()
+    report = {
+        "run": {
+            "commit": commit,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "database": engine.dialect.name,
+            "params": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items() if k != "database_url"},
+            "wall_seconds": round(wall, 3),
+            "requests": sum(len(v) for v in recorder.latencies.values()),
+        },
+        "routes": _summarize(recorder, wall),
+        "cases": cases,
+    }
+
+    output = args.output or RESULTS_DIR / f"{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    _print_report(report, baseline)
+    print(f"resultado: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.security import hash_device_secret, hash_password
+from app.jornada import rebuild_jornada_dia
+from app.models import (
+    ConfigLocal,
+    EmployeeAuthPolicy,
+    EmployeeDevice,
+    EmployeeProfile,
+    Ponto,
+    PontoAdminAudit,
+    PontoAdminAuditAction,
+    PontoTipo,
+    User,
+    UserRole,
+    ponto_data_local,
+)
+
+SP_TZ = ZoneInfo("America/Sao_Paulo")
+
+SITE_LAT = -23.5505
+SITE_LNG = -46.6333
+SITE_RAIO_M = 300
+
+_MOTIVOS = [
+    "Esqueceu de bater a entrada",
+    "Celular sem bateria na saída",
+    "Ajuste de intervalo combinado com a gerência",
+    "Batida duplicada por instabilidade na rede",
+    "Treinamento externo",
+    "Consulta médica com atestado",
+    "Horário corrigido a pedido do funcionário",
+]
+
+_DAY_SCHEDULE = [
+    (PontoTipo.entrada, time(8, 0)),
+    (PontoTipo.intervalo_inicio, time(12, 0)),
+    (PontoTipo.intervalo_fim, time(13, 0)),
+    (PontoTipo.saida, time(17, 0)),
+]
+
+
+@dataclass(frozen=True)
+class SeededEmployee:
+    user_id: int
+    device_id: str
+    device_secret: str
+
+
+@dataclass(frozen=True)
+class Dataset:
+    employees: list[SeededEmployee]
+    pontos: int
+    audits: int
+
+
+def _sp_to_utc_naive(day, at: time, jitter_s: int) -> datetime:
+    local = datetime.combine(day, at, tzinfo=SP_TZ) + timedelta(seconds=jitter_s)
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def seed(db: Session, employees: int, days: int, audits: int, rng: random.Random) -> Dataset:
+    if db.execute(select(func.count(User.id)).where(User.role == UserRole.employee)).scalar():
+        raise SystemExit("O banco do benchmark precisa estar vazio (sem funcionários)")
+
+    admin_id = db.execute(select(User.id).where(User.role == UserRole.admin)).scalar_one()
+    db.merge(ConfigLocal(id=1, local_lat=SITE_LAT, local_lng=SITE_LNG, raio_m=SITE_RAIO_M))
+
+    # One pbkdf2 hash shared by every employee: seeding measures nothing, so it should not spend minutes hashing.
+    password_hash = hash_password("bench-password")
+    user_ids = db.execute(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [
+            {"email": f"bench{i:05d}@bench.example.com", "password_hash": password_hash, "role": UserRole.employee}
+            for i in range(employees)
+        ],
+    ).scalars().all()
+    db.execute(
+        insert(EmployeeProfile),
+        [{"user_id": uid, "nome": f"Funcionário {i:05d}", "genero": rng.choice(["homem", "mulher"])} for i, uid in enumerate(user_ids)],
+    )
+    db.execute(
+        insert(EmployeeAuthPolicy),
+        [{"employee_user_id": uid, "allow_password_login": True, "allow_face_login": True} for uid in user_ids],
+    )
+
+    seeded = []
+    for i, uid in enumerate(user_ids):
+        secret = f"bench-secret-{i:05d}-{rng.getrandbits(64):016x}"
+        seeded.append(SeededEmployee(user_id=uid, device_id=f"bench-device-{i:05d}", device_secret=secret))
+    db.execute(
+        insert(EmployeeDevice),
+        [
+            {"employee_user_id": e.user_id, "device_id": e.device_id, "device_secret_hash": hash_device_secret(e.device_secret)}
+            for e in seeded
+        ],
+    )
+
+    # History stops yesterday, so today's punches start from an empty day.
+    today = datetime.now(tz=SP_TZ).date()
+    ponto_rows = []
+    for uid in user_ids:
+        for back in range(1, days + 1):
+            day = today - timedelta(days=back)
+            for tipo, at in _DAY_SCHEDULE:
+                registrado_em = _sp_to_utc_naive(day, at, rng.randint(-600, 600))
+                ponto_rows.append(
+                    {
+                        "user_id": uid,
+                        "tipo": tipo,
+                        "registrado_em": registrado_em,
+                        # Core inserts skip the model's validator, so the workday is set here.
+                        "data_local": ponto_data_local(registrado_em),
+                        "lat": SITE_LAT + rng.uniform(-0.001, 0.001),
+                        "lng": SITE_LNG + rng.uniform(-0.001, 0.001),
+                        "accuracy_m": rng.uniform(3, 30),
+                        "distancia_m": rng.uniform(0, 150),
+                    }
+                )
+    for start in range(0, len(ponto_rows), 10_000):
+        db.execute(insert(Ponto), ponto_rows[start : start + 10_000])
+
+    audit_rows = [
+        {
+            "action": rng.choice(list(PontoAdminAuditAction)),
+            "ponto_id": None,
+            "employee_user_id": rng.choice(user_ids),
+            "admin_user_id": admin_id,
+            "motivo": rng.choice(_MOTIVOS),
+            "before_json": None,
+            "after_json": None,
+            "created_at": datetime.utcnow() - timedelta(seconds=rng.randint(0, days * 86400)),
+        }
+        for _ in range(audits)
+    ]
+    for start in range(0, len(audit_rows), 10_000):
+        db.execute(insert(PontoAdminAudit), audit_rows[start : start + 10_000])
+    db.commit()
+
+    rebuild_jornada_dia(db)
+    return Dataset(employees=seeded, pontos=len(ponto_rows), audits=len(audit_rows))
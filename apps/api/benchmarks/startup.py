@@ -0,0 +1,89 @@
+import argparse
+import http.client
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parents[1]
+
+_STARTUP_LINE = re.compile(r"Startup: .*")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _time_to_first_request(database_url: str, workers: int, timeout: float) -> tuple[float, str]:
+    """Start uvicorn in a new process and return seconds until /health answers, plus its startup log line."""
+    port = _free_port()
+    env = dict(os.environ, PONTOFACIL_DATABASE_URL=database_url)
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers)],
+        cwd=API_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(f"A API encerrou durante a inicialização:\n{process.stdout.read()}")
+            if time.perf_counter() - started > timeout:
+                raise SystemExit("A API não respondeu /health a tempo")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                conn.request("GET", "/health")
+                if conn.getresponse().status == 200:
+                    elapsed = time.perf_counter() - started
+                    break
+            except OSError:
+                time.sleep(0.005)
+    finally:
+        process.terminate()
+        output = process.communicate(timeout=30)[0]
+    match = _STARTUP_LINE.search(output)
+    return elapsed, match.group(0) if match else ""
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.startup", description="Tempo até a primeira requisição de um worker da API"
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1, help="Workers do uvicorn (>1 testa a corrida no banco novo)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="pontofacil-startup-") as tmpdir:
+        existing_url = f"sqlite:///{Path(tmpdir, 'existing.db').as_posix()}"
+        # First boot migrates and creates the admin; the "existing" runs then measure a normal restart.
+        _time_to_first_request(existing_url, 1, args.timeout)
+
+        for label, make_url in (
+            ("banco novo", lambda i: f"sqlite:///{Path(tmpdir, f'fresh-{i}.db').as_posix()}"),
+            ("banco existente", lambda i: existing_url),
+        ):
+            times = []
+            for i in range(args.runs):
+                elapsed, startup_line = _time_to_first_request(make_url(i), args.workers, args.timeout)
+                times.append(elapsed)
+            print(
+                f"{label:<16} mediana {statistics.median(times) * 1000:>6.0f} ms  "
+                f"min {min(times) * 1000:>6.0f} ms  máx {max(times) * 1000:>6.0f} ms"
+            )
+            if startup_line:
+                print(f"  última: {startup_line}")
+
+
+if __name__ == "__main__":
+    main()
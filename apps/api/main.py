@@ -1,16 +1,30 @@
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+import time
+
+# Taken before the heavy imports below so the startup log can report how long they took.
+_import_started = time.perf_counter()
+
+import logging
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.api.routers import admin, auth, pontos, public
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.api.routers import admin, auth, metrics, pontos, public
 from app.core.config import settings
+from app.core.kdf import KdfBusy
+from app.core.metrics import MetricsMiddleware, instrument_engine
+from app.core.profiler import SqlProfilerMiddleware
 from app.core.security import hash_password
-from app.db.base import Base
+from app.db.migrations import LATEST_VERSION, backfill_pontos_data_local, run_migrations
 from app.db.session import engine, SessionLocal
 from app.models import User, UserRole
 
-from sqlalchemy import text
+# uvicorn only configures its own loggers; the startup breakdown should show up without extra logging setup.
+logger = logging.getLogger("uvicorn.error")
 
 app = FastAPI(title="PontoFacil API")
 
@@ -25,12 +39,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+if settings.sql_profile_enabled:
+    app.add_middleware(
+        SqlProfilerMiddleware,
+        slow_ms=settings.sql_profile_slow_ms,
+        repeat_threshold=settings.sql_profile_repeat_threshold,
+    )
+if settings.metrics_enabled:
+    # Added last so it wraps CORS too and times the whole request.
+    app.add_middleware(MetricsMiddleware)
+if settings.metrics_enabled or settings.sql_profile_enabled:
+    instrument_engine(engine)
+
 app.include_router(public.router)
 app.include_router(auth.router)
 app.include_router(admin.router)
 app.include_router(pontos.router)
+if settings.metrics_enabled:
+    app.include_router(metrics.router)
+    if not settings.metrics_token:
+        logger.warning("GET /metrics está público: defina PONTOFACIL_METRICS_TOKEN")
+
+
+@app.exception_handler(KdfBusy)
+async def kdf_busy_handler(request: Request, exc: KdfBusy) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servidor ocupado. Tente novamente em instantes."},
+        headers={"Retry-After": str(settings.kdf_retry_after_seconds)},
+    )
 
 
 @app.get("/")
@@ -39,8 +79,7 @@ def root():
 
 
 def ensure_admin(db: Session) -> None:
-    user = db.query(User).filter(User.email == settings.admin_email).first()
-    if user:
+    if db.query(User.id).filter(User.email == settings.admin_email).first():
         return
 
     admin_user = User(
@@ -50,19 +89,59 @@ def ensure_admin(db: Session) -> None:
         is_active=True,
     )
     db.add(admin_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # Workers boot together on a fresh database; the unique email lets exactly one of them create the admin.
+        db.rollback()
+
+
+def startup_probe() -> tuple[int, bool, bool]:
+    """Return the schema version, whether the admin user exists and whether pontos lack data_local, in one round trip."""
+    with engine.connect() as conn:
+        try:
+            row = conn.execute(
+                text(
+                    "SELECT (SELECT MAX(version) FROM schema_version), "
+                    "EXISTS (SELECT 1 FROM users WHERE email = :email), "
+                    "EXISTS (SELECT 1 FROM pontos WHERE data_local IS NULL)"
+                ),
+                {"email": settings.admin_email},
+            ).one()
+        except Exception:
+            # Fresh database (neither table exists yet) or one from before data_local: migrations cover both.
+            conn.rollback()
+            return 0, False, False
+    return int(row[0] or 0), bool(row[1]), bool(row[2])
 
 
 @app.on_event("startup")
 def on_startup() -> None:
-    Base.metadata.create_all(bind=engine)
-    try:
+    started = time.perf_counter()
+    version, admin_exists, sem_data_local = startup_probe()
+    probed = time.perf_counter()
+    if version < LATEST_VERSION:
+        run_migrations(engine)
+    if sem_data_local:
+        # A worker on the previous release wrote pontos after the last backfill; the day queries only see data_local.
         with engine.begin() as conn:
-            conn.execute(text("ALTER TABLE employee_profiles ADD COLUMN genero VARCHAR(16)"))
-    except Exception:
-        pass
-    db = SessionLocal()
-    try:
-        ensure_admin(db)
-    finally:
-        db.close()
+            logger.info("Startup: filled data_local on %s pontos", backfill_pontos_data_local(conn))
+    migrated = time.perf_counter()
+    if not admin_exists:
+        with SessionLocal() as db:
+            ensure_admin(db)
+    finished = time.perf_counter()
+
+    logger.info(
+        "Startup: imports %.0f ms, probe %.0f ms, migrations %.0f ms (schema %s -> %s), admin %.0f ms, total %.0f ms",
+        (_imports_done - _import_started) * 1000,
+        (probed - started) * 1000,
+        (migrated - probed) * 1000,
+        version,
+        LATEST_VERSION,
+        (finished - migrated) * 1000,
+        (finished - _import_started) * 1000,
+    )
+
+
+_imports_done = time.perf_counter()
@@ -0,0 +1,48 @@
+import itertools
+import os
+import tempfile
+
+import pytest
+
+# Settings are read at import time, so the test database has to be chosen before the app is imported.
+_DB_DIR = tempfile.mkdtemp(prefix="pontofacil-tests-")
+os.environ["PONTOFACIL_DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import main  # noqa: E402
+
+_employee_ids = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    r = client.post("/auth/login", json={"email": "admin@local.com", "password": "admin"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+@pytest.fixture
+def employee(client, admin_headers):
+    """A new employee with a paired device: (user_id, request headers)."""
+    i = next(_employee_ids)
+    e = client.post(
+        "/admin/funcionarios",
+        headers=admin_headers,
+        json={"email": f"func{i}@teste.com", "password": "1234", "nome": f"Funcionário {i}", "genero": "homem"},
+    ).json()
+    client.put(
+        f"/admin/funcionarios/{e['id']}/auth-policy",
+        headers=admin_headers,
+        json={"allow_password_login": True, "allow_face_login": True},
+    )
+    code = client.post(f"/admin/funcionarios/{e['id']}/device-pairing-code", headers=admin_headers).json()["code"]
+    device_id = f"device-{i}"
+    secret = client.post("/pair-device", json={"code": code, "device_id": device_id}).json()["device_secret"]
+    token = client.post("/auth/device-login", json={"device_id": device_id, "device_secret": secret}).json()["access_token"]
+    return e["id"], {"Authorization": f"Bearer {token}", "X-Device-Id": device_id}
@@ -0,0 +1,46 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app import audit_search
+
+SP_TZ = ZoneInfo("America/Sao_Paulo")
+
+
+def _motivos(client, admin_headers, user_id: int, termo: str) -> list[str]:
+    r = client.get("/admin/pontos/audit", headers=admin_headers, params={"user_id": user_id, "motivo_contains": termo})
+    assert r.status_code == 200
+    return sorted(item["motivo"] for item in r.json()["items"])
+
+
+def test_like_fallback_matches_percent_literally(client, admin_headers, employee, monkeypatch):
+    user_id, _headers = employee
+    today = datetime.now(tz=SP_TZ).date().isoformat()
+    for tipo, at, motivo in (("entrada", "08:00", "reajuste de 5% no horário"), ("saida", "09:00", "50 minutos de atraso")):
+        r = client.post(
+            "/admin/pontos",
+            headers=admin_headers,
+            json={"user_id": user_id, "tipo": tipo, "date": today, "time": at, "motivo": motivo, "lat": 0, "lng": 0},
+        )
+        assert r.status_code == 200
+
+    # Too short for the index: always the LIKE fallback.
+    assert _motivos(client, admin_headers, user_id, "5%") == ["reajuste de 5% no horário"]
+    monkeypatch.setattr(audit_search, "_backend", "like")
+    assert _motivos(client, admin_headers, user_id, "e 5%") == ["reajuste de 5% no horário"]
+    assert _motivos(client, admin_headers, user_id, "_") == []
+
+
+def test_search_ignores_accents_on_every_path(client, admin_headers, employee, monkeypatch):
+    user_id, _headers = employee
+    today = datetime.now(tz=SP_TZ).date().isoformat()
+    r = client.post(
+        "/admin/pontos",
+        headers=admin_headers,
+        json={"user_id": user_id, "tipo": "entrada", "date": today, "time": "08:00", "motivo": "Visita em São Paulo", "lat": 0, "lng": 0},
+    )
+    assert r.status_code == 200
+
+    for backend in (None, "like"):
+        monkeypatch.setattr(audit_search, "_backend", backend)
+        for termo in ("são", "sao", "SAO", "sã", "sa"):
+            assert _motivos(client, admin_headers, user_id, termo) == ["Visita em São Paulo"], (backend, termo)
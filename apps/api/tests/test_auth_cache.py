@@ -0,0 +1,45 @@
+from sqlalchemy import event
+
+from app.api.deps import bump_auth_generation
+from app.core.principal_cache import principal_cache
+from app.db.session import SessionLocal, engine
+from app.models import User
+
+
+def _deactivate_elsewhere(user_id: int) -> None:
+    # Another worker's admin write: the row and generation change, this worker's cache is not touched.
+    db = SessionLocal()
+    try:
+        db.get(User, user_id).is_active = False
+        bump_auth_generation(db, user_id)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_warm_request_does_not_query_the_database(client, employee):
+    _user_id, headers = employee
+    assert client.get("/me", headers=headers).status_code == 200
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/me", headers=headers).status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert statements == []
+
+
+def test_deactivation_on_another_worker_applies_after_the_ttl(client, employee):
+    user_id, headers = employee
+    assert client.get("/me", headers=headers).status_code == 200
+
+    _deactivate_elsewhere(user_id)
+    # Within the TTL the cached entry is still trusted.
+    assert client.get("/me", headers=headers).status_code == 200
+
+    principal_cache._entries[user_id].expires_at = 0.0
+    revalidations = principal_cache.stats()["revalidations"]
+    assert client.get("/me", headers=headers).status_code == 401
+    assert principal_cache.stats()["revalidations"] == revalidations + 1
@@ -0,0 +1,135 @@
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, select
+
+from app.banco_horas import fechar_banco_horas_funcionarios
+from app.core.config_cache import config_cache
+from app.db.session import SessionLocal
+from app.models import BancoHorasDia, Ponto, PontoTipo, User
+
+SP_TZ = ZoneInfo("America/Sao_Paulo")
+
+TODOS_OS_DIAS = {"carga_diaria_minutos": 480, "dias_semana": [0, 1, 2, 3, 4, 5, 6]}
+
+
+def _utc(day, at: time) -> datetime:
+    return datetime.combine(day, at, tzinfo=SP_TZ).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _add_day(user_id: int, day, entrada: time, saida: time) -> None:
+    """Insert a day's pontos without touching jornada_dia, like a database upgraded before rebuild-jornada."""
+    db = SessionLocal()
+    try:
+        db.add(Ponto(user_id=user_id, tipo=PontoTipo.entrada, registrado_em=_utc(day, entrada), lat=0.0, lng=0.0))
+        db.add(Ponto(user_id=user_id, tipo=PontoTipo.saida, registrado_em=_utc(day, saida), lat=0.0, lng=0.0))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _dias_no_livro(user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return db.execute(select(func.count()).where(BancoHorasDia.user_id == user_id)).scalar_one()
+    finally:
+        db.close()
+
+
+def test_saldo_counts_days_missing_from_jornada_dia(client, admin_headers, employee):
+    user_id, headers = employee
+    assert client.put("/admin/banco-horas-config", headers=admin_headers, json=TODOS_OS_DIAS).status_code == 200
+    today = datetime.now(tz=SP_TZ).date()
+    _add_day(user_id, today - timedelta(days=3), time(8), time(17))
+
+    r = client.get("/pontos/banco-horas", headers=headers)
+    assert r.status_code == 200
+    body = r.json()
+    # +1h on the day worked, then two absences of 8h.
+    assert body["saldo_segundos"] == 3600 - 2 * 28800
+    assert body["dias"][0]["trabalhado_segundos"] == 9 * 3600
+    # Reading the statement does not close the ledger.
+    assert _dias_no_livro(user_id) == 0
+
+
+def test_first_punch_of_the_day_closes_the_ledger(client, admin_headers, employee):
+    user_id, headers = employee
+    assert client.put("/admin/banco-horas-config", headers=admin_headers, json=TODOS_OS_DIAS).status_code == 200
+    today = datetime.now(tz=SP_TZ).date()
+    _add_day(user_id, today - timedelta(days=2), time(8), time(16))
+    antes = client.get("/pontos/banco-horas", headers=headers).json()
+
+    r = client.post("/pontos", headers=headers, json={"tipo": "entrada", "lat": 0.0, "lng": 0.0})
+    assert r.status_code == 200
+    assert _dias_no_livro(user_id) == 2
+    depois = client.get("/pontos/banco-horas", headers=headers).json()
+    assert depois["saldo_segundos"] == antes["saldo_segundos"] == -28800
+    assert depois["dias"] == antes["dias"]
+
+
+def test_deactivated_employee_bank_stops_at_the_last_day(client, admin_headers, employee):
+    user_id, _headers = employee
+    assert client.put("/admin/banco-horas-config", headers=admin_headers, json=TODOS_OS_DIAS).status_code == 200
+    today = datetime.now(tz=SP_TZ).date()
+    _add_day(user_id, today - timedelta(days=12), time(8), time(16))
+    assert client.delete(f"/admin/funcionarios/{user_id}", headers=admin_headers).status_code == 200
+    db = SessionLocal()
+    try:
+        db.get(User, user_id).deactivated_at = _utc(today - timedelta(days=10), time(9))
+        db.commit()
+    finally:
+        db.close()
+
+    antes = client.get("/admin/banco-horas", headers=admin_headers, params={"user_id": user_id}).json()
+    db = SessionLocal()
+    try:
+        fechar_banco_horas_funcionarios(db, config_cache.get(db))
+    finally:
+        db.close()
+    depois = client.get("/admin/banco-horas", headers=admin_headers, params={"user_id": user_id}).json()
+    # The worked day and one absence; the deactivation day had no ponto and nothing after it is charged.
+    assert _dias_no_livro(user_id) == 2
+    assert antes["saldo_segundos"] == depois["saldo_segundos"] == -28800
+
+
+def test_long_pending_tail_is_written_by_the_read(client, admin_headers, employee):
+    user_id, headers = employee
+    assert client.put("/admin/banco-horas-config", headers=admin_headers, json=TODOS_OS_DIAS).status_code == 200
+    today = datetime.now(tz=SP_TZ).date()
+    _add_day(user_id, today - timedelta(days=20), time(8), time(16))
+
+    body = client.get("/pontos/banco-horas", headers=headers).json()
+    assert body["saldo_segundos"] == -19 * 28800
+    assert _dias_no_livro(user_id) == 20
+    assert client.get("/pontos/banco-horas", headers=headers).json() == body
+
+
+def test_ponto_before_the_ledger_keeps_the_closed_days(client, admin_headers, employee):
+    user_id, headers = employee
+    assert client.put("/admin/banco-horas-config", headers=admin_headers, json=TODOS_OS_DIAS).status_code == 200
+    assert client.put("/admin/pontos-correction-config", headers=admin_headers, json={"window_days": 365}).status_code == 200
+    today = datetime.now(tz=SP_TZ).date()
+    _add_day(user_id, today - timedelta(days=3), time(8), time(16))
+    db = SessionLocal()
+    try:
+        fechar_banco_horas_funcionarios(db, config_cache.get(db), user_id=user_id)
+    finally:
+        db.close()
+
+    meio_periodo = {"carga_diaria_minutos": 240, "dias_semana": [0, 1, 2, 3, 4, 5, 6]}
+    assert client.put("/admin/banco-horas-config", headers=admin_headers, json=meio_periodo).status_code == 200
+    early = today - timedelta(days=35)
+    for tipo, at in (("entrada", "08:00"), ("saida", "12:00")):
+        r = client.post(
+            "/admin/pontos",
+            headers=admin_headers,
+            json={"user_id": user_id, "tipo": tipo, "date": str(early), "time": at, "motivo": "retroativo", "lat": 0, "lng": 0},
+        )
+        assert r.status_code == 200
+
+    assert _dias_no_livro(user_id) == 35
+    body = client.get("/pontos/banco-horas", headers=headers, params={"start": str(early)}).json()
+    # The closed days keep the 8h they were closed with; the inserted ones use the current 4h.
+    assert [d["esperado_segundos"] for d in body["dias"][-3:]] == [28800] * 3
+    assert body["dias"][0]["saldo_segundos"] == 0
+    assert body["saldo_segundos"] == body["dias"][-1]["acumulado_segundos"] == -31 * 14400 - 2 * 28800
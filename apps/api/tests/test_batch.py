@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+SP_TZ = ZoneInfo("America/Sao_Paulo")
+
+
+def _item(day, at: str, tipo: str | None = None) -> dict:
+    item = {"registrado_em": f"{day}T{at}:00", "lat": 0.0, "lng": 0.0}
+    if tipo:
+        item["tipo"] = tipo
+    return item
+
+
+def test_batch_validates_each_item_in_order(client, employee):
+    _user_id, headers = employee
+    ontem = datetime.now(tz=SP_TZ).date() - timedelta(days=1)
+    items = [
+        _item(ontem, "08:00"),
+        _item(ontem, "12:00"),
+        # Out of sequence: intervalo_fim is expected.
+        _item(ontem, "12:30", "entrada"),
+        # Older than PONTOFACIL_PONTO_BATCH_MAX_AGE_HOURS.
+        _item(ontem - timedelta(days=10), "08:00"),
+        # Before the last accepted punch of the day.
+        _item(ontem, "11:00", "intervalo_fim"),
+        _item(ontem, "13:00", "intervalo_fim"),
+        _item(ontem, "17:00"),
+    ]
+    r = client.post("/pontos/batch", headers=headers, json={"items": items})
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["accepted"], body["rejected"]) == (4, 3)
+    assert [(i["index"], i["ok"], i["status_code"]) for i in body["results"]] == [
+        (0, True, 200),
+        (1, True, 200),
+        (2, False, 422),
+        (3, False, 422),
+        (4, False, 422),
+        (5, True, 200),
+        (6, True, 200),
+    ]
+    assert [i["ponto"]["tipo"] for i in body["results"] if i["ok"]] == [
+        "entrada",
+        "intervalo_inicio",
+        "intervalo_fim",
+        "saida",
+    ]
+
+    # The accepted items make up the day's jornada: 08:00-12:00 and 13:00-17:00.
+    jornada = client.get("/pontos/jornada", headers=headers, params={"date": str(ontem)}).json()
+    assert jornada["total_trabalhado_segundos"] == 8 * 3600
+
+
+def test_batch_requires_the_registered_device(client, employee):
+    _user_id, headers = employee
+    ontem = datetime.now(tz=SP_TZ).date() - timedelta(days=1)
+    r = client.post(
+        "/pontos/batch", headers={**headers, "X-Device-Id": "outro-aparelho"}, json={"items": [_item(ontem, "08:00")]}
+    )
+    assert r.status_code == 403
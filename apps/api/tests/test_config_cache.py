@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+from app.core.config_cache import ConfigCache
+from app.db.session import SessionLocal
+from app.models import PontoCorrectionConfig
+
+
+def _save_window(days: int, updated_at: datetime) -> None:
+    # Stands in for another worker saving the config: a separate session, no invalidate() on our cache.
+    db = SessionLocal()
+    try:
+        db.merge(PontoCorrectionConfig(id=1, window_days=days, updated_at=updated_at))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_snapshot_is_served_from_memory_inside_the_window():
+    cache = ConfigCache(revalidate_seconds=3600)
+    db = SessionLocal()
+    try:
+        first = cache.get(db)
+        assert cache.get(db) is first
+        assert (cache.loads, cache.hits, cache.revalidations) == (1, 1, 0)
+    finally:
+        db.close()
+
+
+def test_change_from_another_worker_is_seen_on_revalidation():
+    cache = ConfigCache(revalidate_seconds=0)
+    db = SessionLocal()
+    try:
+        original = cache.get(db).correction_window_days
+
+        # Nothing changed: the stamp matches and the snapshot is kept.
+        unchanged = cache.get(db)
+        assert (cache.loads, cache.revalidations) == (1, 1)
+
+        _save_window(12, datetime.utcnow() + timedelta(seconds=1))
+        db.rollback()
+        changed = cache.get(db)
+        assert changed is not unchanged
+        assert changed.correction_window_days == 12
+        assert (cache.loads, cache.revalidations) == (2, 2)
+    finally:
+        db.close()
+        _save_window(original, datetime.utcnow() + timedelta(seconds=2))
+
+
+def test_invalidate_forces_a_reload():
+    cache = ConfigCache(revalidate_seconds=3600)
+    db = SessionLocal()
+    try:
+        cache.get(db)
+        cache.invalidate()
+        cache.get(db)
+        assert (cache.loads, cache.revalidations) == (2, 0)
+    finally:
+        db.close()
@@ -0,0 +1,39 @@
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import text
+
+import main
+from app.db.session import SessionLocal, engine
+from app.models import Ponto
+
+SP_TZ = ZoneInfo("America/Sao_Paulo")
+
+
+def test_startup_fills_pontos_written_without_data_local(client, admin_headers, employee):
+    user_id, _headers = employee
+    ontem = datetime.now(tz=SP_TZ).date() - timedelta(days=1)
+    # 02:30 UTC is still the previous day (23:30) in São Paulo.
+    registrado_em = datetime.combine(ontem, time(2, 30))
+    with engine.begin() as conn:
+        # What a worker on the release before data_local inserts.
+        conn.execute(
+            text(
+                "INSERT INTO pontos (user_id, tipo, registrado_em, lat, lng) "
+                "VALUES (:user_id, 'entrada', :registrado_em, 0, 0)"
+            ),
+            {"user_id": user_id, "registrado_em": registrado_em},
+        )
+    assert main.startup_probe()[2] is True
+
+    main.on_startup()
+
+    assert main.startup_probe()[2] is False
+    db = SessionLocal()
+    try:
+        ponto = db.query(Ponto).filter(Ponto.user_id == user_id).one()
+        assert ponto.data_local == ontem - timedelta(days=1)
+    finally:
+        db.close()
+    r = client.get("/admin/jornada", headers=admin_headers, params={"user_id": user_id, "date": str(ontem - timedelta(days=1))})
+    assert r.json()["alertas"] == ["Entrada registrada, mas sem saída"]
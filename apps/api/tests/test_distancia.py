@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from app.db.session import SessionLocal
+from app.distancia import claim_distancia_job
+from app.models import DistanciaRecomputeJob, Ponto
+
+SP_TZ = ZoneInfo("America/Sao_Paulo")
+
+
+def _job(status: str, idle: timedelta = timedelta(0)) -> int:
+    db = SessionLocal()
+    try:
+        updated_at = datetime.utcnow() - idle
+        job = DistanciaRecomputeJob(ref_lat=0.0, ref_lng=0.0, status=status, created_at=updated_at, updated_at=updated_at)
+        db.add(job)
+        db.commit()
+        return job.id
+    finally:
+        db.close()
+
+
+def _resume(client, admin_headers, job_id: int):
+    return client.post(f"/admin/pontos/recompute-distancia/{job_id}/resume", headers=admin_headers)
+
+
+def test_resume_refuses_running_and_done_jobs(client, admin_headers):
+    r = _resume(client, admin_headers, _job("running"))
+    assert (r.status_code, r.json()["detail"]) == (409, "Recálculo em andamento")
+    r = _resume(client, admin_headers, _job("done"))
+    assert (r.status_code, r.json()["detail"]) == (409, "Recálculo já concluído")
+    assert _resume(client, admin_headers, 999_999).status_code == 404
+
+
+def test_job_interrupted_by_a_restart_is_resumable(client, admin_headers):
+    job_id = _job("running", idle=timedelta(hours=1))
+    assert client.get(f"/admin/pontos/recompute-distancia/{job_id}", headers=admin_headers).json()["status"] == "paused"
+
+    assert _resume(client, admin_headers, job_id).status_code == 200
+    assert client.get(f"/admin/pontos/recompute-distancia/{job_id}", headers=admin_headers).json()["status"] == "done"
+
+
+def test_only_one_resume_claims_a_failed_job():
+    job_id = _job("failed")
+    db = SessionLocal()
+    try:
+        assert claim_distancia_job(db, job_id)
+        assert not claim_distancia_job(db, job_id)
+    finally:
+        db.close()
+
+
+def test_recompute_keeps_the_distance_of_admin_entered_pontos(client, admin_headers, employee):
+    user_id, headers = employee
+    site = {"local_lat": 0.0, "local_lng": 0.0, "raio_m": 5000}
+    assert client.put("/admin/config-local", headers=admin_headers, json=site).status_code == 200
+    batida = client.post("/pontos", headers=headers, json={"tipo": "entrada", "lat": 0.001, "lng": 0.0}).json()
+    ontem = datetime.now(tz=SP_TZ).date() - timedelta(days=1)
+    manual = client.post(
+        "/admin/pontos",
+        headers=admin_headers,
+        json={
+            "user_id": user_id,
+            "tipo": "entrada",
+            "date": str(ontem),
+            "time": "08:00",
+            "motivo": "esqueceu de bater",
+            "lat": 0.001,
+            "lng": 0.0,
+            "distancia_m": 5.0,
+        },
+    ).json()
+
+    # Moving the site 1 km north: the geofenced punch gets ~1 km, the admin's ponto keeps what was typed.
+    assert client.put("/admin/config-local", headers=admin_headers, json={**site, "local_lat": 0.01}).status_code == 200
+    r = client.post("/admin/pontos/recompute-distancia", headers=admin_headers, json={"local_id": None})
+    assert r.status_code == 200
+
+    db = SessionLocal()
+    try:
+        assert round(db.get(Ponto, batida["id"]).distancia_m) == 1001
+        assert db.get(Ponto, manual["id"]).distancia_m == 5.0
+    finally:
+        db.close()
+    assert client.put("/admin/config-local", headers=admin_headers, json=site).status_code == 200
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from app.core.kdf import KdfExecutor
+from app.core.security import verify_password
+from app.db.session import SessionLocal
+from app.models import User
+
+
+def test_import_creates_every_employee_with_a_valid_hash(client, admin_headers):
+    rows = [
+        {"email": f"importado{i}@teste.com", "password": f"senha{i}", "nome": f"Importado {i}", "genero": "mulher"}
+        for i in range(20)
+    ]
+    r = client.post("/admin/funcionarios/import", headers=admin_headers, json=rows)
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["created"], body["rejected"]) == (20, 0)
+
+    db = SessionLocal()
+    try:
+        for result, row in zip(body["results"], rows):
+            user = db.get(User, result["id"])
+            assert user.email == row["email"]
+            assert verify_password(row["password"], user.password_hash)
+    finally:
+        db.close()
+
+
+def test_import_with_a_bad_row_writes_nothing(client, admin_headers):
+    body = "email;password;nome;genero\nnovo1@teste.com;1234;Novo;homem\nnovo1@teste.com;1234;Repetido;homem\n"
+    r = client.post(
+        "/admin/funcionarios/import", headers={**admin_headers, "Content-Type": "text/csv"}, content=body.encode()
+    )
+    assert r.status_code == 422
+    assert r.json()["results"][1]["detail"] == "E-mail repetido no arquivo"
+    db = SessionLocal()
+    try:
+        assert db.query(User).filter(User.email == "novo1@teste.com").count() == 0
+    finally:
+        db.close()
+
+
+def test_bulk_map_keeps_order_and_its_parallelism_cap():
+    executor = KdfExecutor(workers=4, queue_size=0)
+    running, peak = 0, 0
+    lock = threading.Lock()
+
+    def slow_double(x: int) -> int:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.005)
+        with lock:
+            running -= 1
+        return x * 2
+
+    assert executor.map(slow_double, list(range(12)), max_parallel=2) == [x * 2 for x in range(12)]
+    assert peak == 2
+    # Every slot is given back when the batch ends.
+    assert executor.stats()["in_flight"] == 0
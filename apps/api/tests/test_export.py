@@ -0,0 +1,33 @@
+import csv
+import io
+import re
+import zipfile
+
+from app.export import iter_csv, iter_xlsx
+
+
+def test_csv_neutralizes_formulas_in_text():
+    rows = [[1, "=HYPERLINK(\"http://x\")", "+55 11", "-cmd", "@SUM(A1)", "Maria", -23.55]]
+    body = b"".join(iter_csv(["id", "a", "b", "c", "d", "nome", "lat"], rows)).decode("utf-8-sig")
+    row = list(csv.reader(io.StringIO(body)))[1]
+    assert row == ["1", "'=HYPERLINK(\"http://x\")", "'+55 11", "'-cmd", "'@SUM(A1)", "Maria", "-23.55"]
+
+
+def test_xlsx_continues_on_a_new_sheet_past_the_row_limit():
+    rows = [[i, f"linha {i}"] for i in range(5)]
+    body = b"".join(iter_xlsx(["id", "texto"], rows, max_rows=3))
+    with zipfile.ZipFile(io.BytesIO(body)) as zf:
+        workbook = zf.read("xl/workbook.xml").decode()
+        sheets = [zf.read(f"xl/worksheets/sheet{n}.xml").decode() for n in (1, 2, 3)]
+        assert "xl/worksheets/sheet4.xml" not in zf.namelist()
+        assert zf.read("[Content_Types].xml").decode().count("/xl/worksheets/sheet") == 3
+    assert re.findall(r'<sheet name="([^"]+)"', workbook) == ["Pontos", "Pontos (2)", "Pontos (3)"]
+    # Every sheet repeats the header: 2 + 2 + 1 data rows.
+    assert [s.count("<row>") for s in sheets] == [3, 3, 2]
+    assert all("<t>id</t>" in s for s in sheets)
+
+
+def test_xlsx_exactly_full_sheet_does_not_add_an_empty_one():
+    body = b"".join(iter_xlsx(["id"], [[1], [2]], max_rows=3))
+    with zipfile.ZipFile(io.BytesIO(body)) as zf:
+        assert [n for n in zf.namelist() if n.startswith("xl/worksheets/")] == ["xl/worksheets/sheet1.xml"]
@@ -0,0 +1,17 @@
+from app.geofence import Site, SiteGridIndex
+
+CENTRO = Site(1, -23.5505, -46.6333, 200)
+PAULISTA = Site(2, -23.5614, -46.6559, 200)
+
+
+def test_assigned_employee_only_matches_their_sites():
+    index = SiteGridIndex([CENTRO, PAULISTA], {7: frozenset({1})}, cell_m=500)
+    assert index.match(7, CENTRO.lat, CENTRO.lng).local_id == 1
+    assert not index.match(7, PAULISTA.lat, PAULISTA.lng).allowed
+
+
+def test_assignments_to_inactive_sites_fall_back_to_every_site():
+    # Site 3 was deactivated or deleted, so it is not in the index.
+    index = SiteGridIndex([CENTRO, PAULISTA], {7: frozenset({3})}, cell_m=500)
+    assert index.match(7, PAULISTA.lat, PAULISTA.lng).local_id == 2
+    assert index.candidates(7, CENTRO.lat, CENTRO.lng) == [CENTRO]
@@ -0,0 +1,73 @@
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.timeutil import SP_TZ
+from app.db.session import SessionLocal
+from app.idempotency import IDEMPOTENCY_KEY_HEADER, REPLAYED_HEADER
+from app.models import IdempotencyKey, Ponto
+
+
+def _count_pontos(user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        return db.query(Ponto).filter(Ponto.user_id == user_id).count()
+    finally:
+        db.close()
+
+
+def test_retried_punch_replays_the_first_response(client, employee):
+    user_id, headers = employee
+    headers = {**headers, IDEMPOTENCY_KEY_HEADER: str(uuid.uuid4())}
+    body = {"tipo": "entrada", "lat": 0.0, "lng": 0.0}
+
+    first = client.post("/pontos", headers=headers, json=body)
+    retry = client.post("/pontos", headers=headers, json=body)
+    assert first.status_code == retry.status_code == 200
+    assert REPLAYED_HEADER not in first.headers
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.json() == first.json()
+    assert _count_pontos(user_id) == 1
+
+
+def test_key_reused_with_another_body_is_rejected(client, employee):
+    user_id, headers = employee
+    headers = {**headers, IDEMPOTENCY_KEY_HEADER: str(uuid.uuid4())}
+    assert client.post("/pontos", headers=headers, json={"tipo": "entrada", "lat": 0.0, "lng": 0.0}).status_code == 200
+
+    r = client.post("/pontos", headers=headers, json={"tipo": "intervalo_inicio", "lat": 0.0, "lng": 0.0})
+    assert r.status_code == 422
+    assert _count_pontos(user_id) == 1
+
+
+def test_key_longer_than_the_limit_is_rejected(client, employee):
+    _user_id, headers = employee
+    r = client.post("/pontos", headers={**headers, IDEMPOTENCY_KEY_HEADER: "x" * 129}, json={"tipo": "entrada", "lat": 0.0, "lng": 0.0})
+    assert r.status_code == 422
+
+
+def test_admin_ponto_replays_and_expired_key_is_claimed_again(client, admin_headers, employee):
+    user_id, _headers = employee
+    key = str(uuid.uuid4())
+    headers = {**admin_headers, IDEMPOTENCY_KEY_HEADER: key}
+    ontem = datetime.now(tz=SP_TZ).date() - timedelta(days=1)
+    body = {"user_id": user_id, "tipo": "entrada", "date": ontem.isoformat(), "time": "08:00", "motivo": "Esqueceu de bater"}
+
+    first = client.post("/admin/pontos", headers=headers, json=body)
+    retry = client.post("/admin/pontos", headers=headers, json=body)
+    assert first.status_code == 200
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert retry.json() == first.json()
+    assert _count_pontos(user_id) == 1
+
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update({"expires_at": datetime.utcnow() - timedelta(minutes=1)})
+        db.commit()
+    finally:
+        db.close()
+
+    # Past its TTL the key is a new request again, so the body is processed instead of replayed.
+    again = client.post("/admin/pontos", headers=headers, json={**body, "time": "08:05"})
+    assert again.status_code == 200
+    assert REPLAYED_HEADER not in again.headers
+    assert again.json()["id"] != first.json()["id"]
@@ -0,0 +1,50 @@
+from datetime import datetime, time, timedelta
+
+from app.core.timeutil import SP_TZ, to_utc_naive
+from app.db.session import SessionLocal
+from app.models import Ponto, PontoTipo
+
+
+def _utc(day, at: time) -> datetime:
+    return to_utc_naive(datetime.combine(day, at, tzinfo=SP_TZ))
+
+
+def _add(user_id: int, *pontos: tuple[PontoTipo, datetime]) -> None:
+    db = SessionLocal()
+    try:
+        for tipo, registrado_em in pontos:
+            db.add(Ponto(user_id=user_id, tipo=tipo, registrado_em=registrado_em, lat=0.0, lng=0.0))
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_month_groups_pontos_by_sao_paulo_day(client, admin_headers, employee):
+    user_id, _headers = employee
+    primeiro = (datetime.now(tz=SP_TZ).date().replace(day=1) - timedelta(days=1)).replace(day=1)
+    ultimo = (primeiro + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    _add(
+        user_id,
+        (PontoTipo.entrada, _utc(primeiro + timedelta(days=9), time(8))),
+        (PontoTipo.saida, _utc(primeiro + timedelta(days=9), time(17))),
+        # 23:30 in São Paulo is already the next month in UTC; it belongs to the last day.
+        (PontoTipo.entrada, _utc(ultimo, time(23, 30))),
+        # And 00:30 of the next month is still this month in UTC; it does not belong here.
+        (PontoTipo.saida, _utc(ultimo + timedelta(days=1), time(0, 30))),
+    )
+
+    r = client.get("/admin/jornada/mes", headers=admin_headers, params={"month": f"{primeiro:%Y-%m}", "user_id": user_id})
+    assert r.status_code == 200
+    [funcionario] = r.json()["funcionarios"]
+    assert funcionario["user_id"] == user_id
+    dias = {d["data"]: d for d in funcionario["dias"]}
+    assert len(dias) == ultimo.day
+    assert dias[str(primeiro + timedelta(days=9))]["total_trabalhado_segundos"] == 9 * 3600
+    assert dias[str(ultimo)]["alertas"] == ["Entrada registrada, mas sem saída"]
+    assert funcionario["total_trabalhado_segundos"] == 9 * 3600
+    assert funcionario["total_trabalhado_hhmm"] == "09:00"
+
+
+def test_month_rejects_an_invalid_month(client, admin_headers):
+    for month in ("2024-13", "2024-1", "janeiro"):
+        assert client.get("/admin/jornada/mes", headers=admin_headers, params={"month": month}).status_code == 400
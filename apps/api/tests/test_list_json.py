@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from app.core.timeutil import utc_naive_to_sp
+from app.db.session import SessionLocal
+from app.models import EmployeeProfile, Ponto, PontoTipo, User
+from app.schemas import EmployeeOut, PontoAdminOut, PontoOut
+
+
+def _add_ponto(user_id: int) -> int:
+    db = SessionLocal()
+    try:
+        # Microseconds and a null accuracy: the cases where two encoders are most likely to disagree.
+        row = Ponto(
+            user_id=user_id,
+            tipo=PontoTipo.intervalo_inicio,
+            registrado_em=datetime(2024, 7, 1, 15, 4, 5, 120000),
+            lat=-23.5,
+            lng=-46.6,
+            distancia_m=12.0,
+        )
+        db.add(row)
+        db.commit()
+        return row.id
+    finally:
+        db.close()
+
+
+def test_punch_list_matches_the_created_ponto_response(client, employee):
+    _user_id, headers = employee
+    created = client.post("/pontos", headers=headers, json={"tipo": "entrada", "lat": 0.0, "lng": 0.0, "accuracy_m": 5.5})
+    listed = client.get("/pontos/me", headers=headers)
+    # POST /pontos still answers with PontoOut, so this compares orjson against Pydantic byte for byte.
+    assert listed.text == f"[{created.text}]"
+
+
+def test_lists_match_the_pydantic_models(client, admin_headers, employee):
+    user_id, headers = employee
+    ponto_id = _add_ponto(user_id)
+    db = SessionLocal()
+    try:
+        ponto = db.get(Ponto, ponto_id)
+        user = db.get(User, user_id)
+        profile = db.get(EmployeeProfile, user_id)
+        fields = dict(
+            id=ponto.id,
+            tipo=ponto.tipo,
+            registrado_em=utc_naive_to_sp(ponto.registrado_em),
+            lat=ponto.lat,
+            lng=ponto.lng,
+            accuracy_m=ponto.accuracy_m,
+            distancia_m=ponto.distancia_m,
+            local_id=ponto.local_id,
+        )
+        expected_me = PontoOut(**fields).model_dump(mode="json")
+        expected_admin = PontoAdminOut(**fields, user_id=user.id, email=user.email, nome=profile.nome).model_dump(mode="json")
+        expected_employee = EmployeeOut(
+            id=user.id, email=user.email, nome=profile.nome, genero=profile.genero, is_active=user.is_active
+        ).model_dump(mode="json")
+    finally:
+        db.close()
+
+    assert expected_me["registrado_em"] == "2024-07-01T12:04:05.120000-03:00"
+    assert expected_me["tipo"] == "intervalo_inicio"
+    assert client.get("/pontos/me", headers=headers).json() == [expected_me]
+    assert client.get("/admin/pontos", headers=admin_headers, params={"user_id": user_id}).json() == [expected_admin]
+    employees = client.get("/admin/funcionarios", headers=admin_headers, params={"limit": 500}).json()
+    assert expected_employee in employees
+
@@ -0,0 +1,34 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routers import metrics
+from app.core.config import settings
+
+
+def _metrics_client() -> TestClient:
+    # The main app only mounts /metrics when PONTOFACIL_METRICS_ENABLED is set at import time.
+    app = FastAPI()
+    app.include_router(metrics.router)
+    return TestClient(app)
+
+
+def test_metrics_are_off_by_default(client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_token_is_required_when_set(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "segredo")
+    c = _metrics_client()
+    assert c.get("/metrics").status_code == 401
+    assert c.get("/metrics", headers={"Authorization": "Bearer outro"}).status_code == 401
+    assert c.get("/metrics", headers={"Authorization": "segredo"}).status_code == 401
+
+    r = c.get("/metrics", headers={"Authorization": "Bearer segredo"})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == metrics.CONTENT_TYPE
+    assert "# TYPE pontofacil_cache_lookups_total counter" in r.text
+
+
+def test_metrics_without_token_are_public(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "")
+    assert _metrics_client().get("/metrics").status_code == 200
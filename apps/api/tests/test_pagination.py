@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.db.session import SessionLocal
+from app.models import Ponto, PontoTipo
+
+
+def _add_pontos(user_id: int) -> None:
+    base = datetime.utcnow() - timedelta(days=3)
+    # Two pairs share a timestamp, so the id has to break the tie between pages.
+    instants = [base, base, base + timedelta(hours=1), base + timedelta(hours=2), base + timedelta(hours=2)]
+    db = SessionLocal()
+    try:
+        for i, registrado_em in enumerate(instants):
+            tipo = PontoTipo.entrada if i % 2 == 0 else PontoTipo.saida
+            db.add(Ponto(user_id=user_id, tipo=tipo, registrado_em=registrado_em, lat=0.0, lng=0.0))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _walk(client, url: str, headers: dict, params: dict, limit: int = 2) -> list[int]:
+    ids, cursor = [], None
+    while True:
+        r = client.get(url, headers=headers, params={**params, "limit": limit, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        ids += [item["id"] for item in r.json()]
+        cursor = r.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+
+
+def test_ponto_pages_follow_the_cursor_without_gaps(client, admin_headers, employee):
+    user_id, headers = employee
+    _add_pontos(user_id)
+
+    everything = [p["id"] for p in client.get("/admin/pontos", headers=admin_headers, params={"user_id": user_id}).json()]
+    assert len(everything) == 5
+    assert _walk(client, "/admin/pontos", admin_headers, {"user_id": user_id}) == everything
+    assert _walk(client, "/pontos/me", headers, {}) == everything
+
+
+def test_last_partial_page_has_no_cursor(client, admin_headers, employee):
+    user_id, _headers = employee
+    _add_pontos(user_id)
+    r = client.get("/admin/pontos", headers=admin_headers, params={"user_id": user_id, "limit": 10})
+    assert len(r.json()) == 5
+    assert NEXT_CURSOR_HEADER not in r.headers
+
+
+def test_employee_pages_follow_the_cursor(client, admin_headers, employee):
+    everything = [e["id"] for e in client.get("/admin/funcionarios", headers=admin_headers, params={"limit": 500}).json()]
+    assert everything == sorted(everything, reverse=True)
+    assert _walk(client, "/admin/funcionarios", admin_headers, {}, limit=1) == everything
+
+
+def test_malformed_cursor_is_a_400(client, admin_headers):
+    r = client.get("/admin/funcionarios", headers=admin_headers, params={"cursor": "não-é-cursor"})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Cursor inválido"
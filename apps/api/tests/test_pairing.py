@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from app.api.routers import public
+from app.db.session import SessionLocal
+from app.models import DevicePairingCode, EmployeeDevice
+
+
+def _new_employee(client, admin_headers, email: str) -> int:
+    r = client.post(
+        "/admin/funcionarios",
+        headers=admin_headers,
+        json={"email": email, "password": "1234", "nome": "Pareamento", "genero": "mulher"},
+    )
+    return r.json()["id"]
+
+
+def test_code_consumed_during_verification_does_not_pair(client, admin_headers, monkeypatch):
+    user_id = _new_employee(client, admin_headers, "pareamento-corrida@teste.com")
+    code = client.post(f"/admin/funcionarios/{user_id}/device-pairing-code", headers=admin_headers).json()["code"]
+    run = public.kdf_executor.run
+
+    def consumed_by_another_device(fn, *args):
+        # Another request pairs with the same code while this one is still verifying the hash.
+        db = SessionLocal()
+        try:
+            db.query(DevicePairingCode).filter(DevicePairingCode.employee_user_id == user_id).update(
+                {"consumed_at": datetime.utcnow(), "consumed_by_device_id": "outro-aparelho"}
+            )
+            db.commit()
+        finally:
+            db.close()
+        return run(fn, *args)
+
+    monkeypatch.setattr(public.kdf_executor, "run", consumed_by_another_device)
+    r = client.post("/pair-device", json={"code": code, "device_id": "aparelho-atrasado"})
+    assert r.status_code == 404
+
+    db = SessionLocal()
+    try:
+        assert db.query(EmployeeDevice).filter(EmployeeDevice.employee_user_id == user_id).count() == 0
+    finally:
+        db.close()
+
+
+def test_pairing_code_for_unknown_employee_skips_the_kdf(client, admin_headers, monkeypatch):
+    calls = []
+    monkeypatch.setattr(public.kdf_executor, "run", lambda fn, *args: calls.append(fn))
+    r = client.post("/admin/funcionarios/999999/device-pairing-code", headers=admin_headers)
+    assert r.status_code == 404
+    assert calls == []
@@ -0,0 +1,43 @@
+import logging
+import re
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import RequestStats, instrument_engine
+from app.core.profiler import SqlProfilerMiddleware, server_timing, statement_shape
+
+
+def test_statement_shape_collapses_parameters():
+    assert statement_shape("SELECT * FROM pontos\n WHERE id IN (?, ?, ?)") == "SELECT * FROM pontos WHERE id IN (?)"
+    assert statement_shape("SELECT * FROM users WHERE id = %(id_1)s") == "SELECT * FROM users WHERE id = ?"
+
+
+def test_server_timing_splits_db_kdf_and_app():
+    stats = RequestStats(statements=4, db_seconds=0.010, kdf_seconds=0.020)
+    assert server_timing(stats, 0.050, 1) == 'db;dur=10.0;desc="4 queries, 1 repeated", kdf;dur=20.0, app;dur=20.0'
+    assert server_timing(stats, 0.050, 0).startswith('db;dur=10.0;desc="4 queries", ')
+
+
+def test_profiled_request_gets_server_timing_and_warns_on_repeats(caplog):
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    app = FastAPI()
+
+    @app.get("/n-mais-um")
+    def n_mais_um():
+        with engine.connect() as conn:
+            for i in range(3):
+                conn.execute(text("SELECT :i"), {"i": i})
+        return {"ok": True}
+
+    app.add_middleware(SqlProfilerMiddleware, slow_ms=0.0, repeat_threshold=3)
+    with caplog.at_level(logging.WARNING, logger="app.core.profiler"):
+        r = TestClient(app).get("/n-mais-um")
+
+    assert r.status_code == 200
+    assert re.fullmatch(
+        r'db;dur=[\d.]+;desc="3 queries, 1 repeated", kdf;dur=0\.0, app;dur=[\d.]+', r.headers["Server-Timing"]
+    )
+    assert any("Possível N+1" in record.getMessage() and "3x" in record.getMessage() for record in caplog.records)
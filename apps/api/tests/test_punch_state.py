@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, select
+
+from app.db.session import SessionLocal
+from app.jornada import recompute_jornada_dia
+from app.models import Ponto, PontoTipo
+from app.punch_state import PunchState, punch_state_cache
+
+SP_TZ = ZoneInfo("America/Sao_Paulo")
+
+
+def test_stale_empty_state_does_not_duplicate_entrada(client, employee):
+    user_id, headers = employee
+    today = datetime.now(tz=SP_TZ).date().isoformat()
+
+    # This worker saw the day empty (e.g. a punch rejected by the geofence) and cached that.
+    punch_state_cache.put(user_id, today, PunchState(last_tipo=None, last_at=None, batidas=0, version=None))
+
+    # Another worker records the entrada through its own session.
+    other = SessionLocal()
+    try:
+        other.add(
+            Ponto(
+                user_id=user_id,
+                tipo=PontoTipo.entrada,
+                registrado_em=datetime.now(timezone.utc).replace(tzinfo=None),
+                lat=0.0,
+                lng=0.0,
+            )
+        )
+        other.flush()
+        recompute_jornada_dia(other, user_id, today)
+        other.commit()
+    finally:
+        other.close()
+
+    r = client.post("/pontos", headers=headers, json={"tipo": "entrada", "lat": 0.0, "lng": 0.0})
+    assert r.status_code == 422
+    assert r.json()["detail"] == "A próxima batida deve ser INÍCIO DO INTERVALO"
+
+    db = SessionLocal()
+    try:
+        entradas = db.execute(
+            select(func.count()).where(Ponto.user_id == user_id, Ponto.tipo == PontoTipo.entrada)
+        ).scalar_one()
+    finally:
+        db.close()
+    assert entradas == 1
+
+
+def test_new_idempotency_key_does_not_skip_auto_cooldown(client, employee):
+    _user_id, headers = employee
+    body = {"lat": 0.0, "lng": 0.0}
+
+    first = client.post("/pontos/auto", headers={**headers, "Idempotency-Key": "tap-1"}, json=body)
+    assert first.status_code == 200
+    assert first.json()["tipo"] == "entrada"
+
+    # Double tap: the app sends a fresh key, which must not become an intervalo_inicio.
+    second = client.post("/pontos/auto", headers={**headers, "Idempotency-Key": "tap-2"}, json=body)
+    assert second.status_code == 409
+
+    # Resending the stored key replays the first response.
+    replay = client.post("/pontos/auto", headers={**headers, "Idempotency-Key": "tap-1"}, json=body)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json() == first.json()
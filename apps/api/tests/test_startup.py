@@ -0,0 +1,44 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+import main
+from app.core.config import settings
+from app.db.migrations import LATEST_VERSION, run_migrations
+from app.db.session import SessionLocal
+from app.models import User, UserRole
+
+
+def test_probe_on_a_fresh_database(tmp_path, monkeypatch):
+    fresh = create_engine(f"sqlite:///{tmp_path / 'novo.db'}")
+    monkeypatch.setattr(main, "engine", fresh)
+    assert main.startup_probe() == (0, False, False)
+
+    run_migrations(fresh)
+    assert main.startup_probe() == (LATEST_VERSION, False, False)
+
+
+def test_restart_on_a_current_database_skips_migrations_and_admin(client, monkeypatch):
+    assert main.startup_probe() == (LATEST_VERSION, True, False)
+    calls = []
+    monkeypatch.setattr(main, "run_migrations", lambda engine: calls.append("migrations"))
+    monkeypatch.setattr(main, "ensure_admin", lambda db: calls.append("admin"))
+    main.on_startup()
+    assert calls == []
+
+
+def test_admin_created_by_another_worker_meanwhile_is_not_an_error(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_email", "admin-corrida@teste.com")
+    db = SessionLocal()
+
+    @event.listens_for(db, "before_flush", once=True)
+    def another_worker_wins(session, flush_context, instances):
+        # Both workers saw no admin; the other one commits first.
+        with Session(session.get_bind()) as other:
+            other.add(User(email=settings.admin_email, password_hash="x", role=UserRole.admin, is_active=True))
+            other.commit()
+
+    try:
+        main.ensure_admin(db)
+        assert db.query(User).filter(User.email == settings.admin_email).count() == 1
+    finally:
+        db.close()
@@ -86,6 +86,12 @@ async function ensureDeviceId(): Promise<string> {
   return id;
 }
 
+function newIdempotencyKey(): string {
+  return Array.from(Random.getRandomBytes(16))
+    .map((b) => b.toString(16).padStart(2, "0"))
+    .join("");
+}
+
 function PrimaryButton(props: { title: string; onPress: () => void | Promise<void>; disabled?: boolean }) {
   return (
     <Pressable
@@ -233,16 +239,29 @@ export default function App() {
 
       const loc = await Location.getCurrentPositionAsync({ accuracy: Location.Accuracy.Highest });
 
-      const res = await apiRequest<PontoOut>("/pontos/auto", {
+      // Same key on every attempt: if the first one was recorded, the API replays it instead of punching again.
+      const idempotencyKey = newIdempotencyKey();
+      const body = JSON.stringify({
+        lat: loc.coords.latitude,
+        lng: loc.coords.longitude,
+        accuracy_m: loc.coords.accuracy ?? null,
+      });
+      let res = await apiRequest<PontoOut>("/pontos/auto", {
         method: "POST",
         token,
         deviceId,
-        body: JSON.stringify({
-          lat: loc.coords.latitude,
-          lng: loc.coords.longitude,
-          accuracy_m: loc.coords.accuracy ?? null,
-        }),
+        headers: { "Idempotency-Key": idempotencyKey },
+        body,
       });
+      for (let attempt = 0; attempt < 2 && !res.ok && res.status === undefined; attempt++) {
+        res = await apiRequest<PontoOut>("/pontos/auto", {
+          method: "POST",
+          token,
+          deviceId,
+          headers: { "Idempotency-Key": idempotencyKey },
+          body,
+        });
+      }
 
       if (!res.ok) {
         Alert.alert("Bater ponto", res.error);